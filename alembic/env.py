@@ -1,3 +1,4 @@
+import re
 from logging.config import fileConfig
 
 from sqlalchemy import engine_from_config
@@ -21,10 +22,21 @@ if config.config_file_name is not None:
 # for 'autogenerate' support
 from shared.database import Base
 from models.contas_pagar_receber_model import ContaPagarReceber
+from models.conta_arquivada_model import ContaArquivada
 from models.fornecedor_cliente_model import FornecedorCliente
+from models.resumo_contas_mes_model import ResumoContasMes
+from models.contador_contas_mes_model import ContadorContasMes
+from models.versao_dados_model import VersaoDados
 
 target_metadata = Base.metadata
 
+# as partições de tbl_contas são criadas pela manutenção (shared/particoes.py), não pelos modelos
+PARTICAO_CONTAS = re.compile(r'^tbl_contas_([0-9]{4}|padrao)$')
+
+def incluir_objeto(objeto, nome, tipo, refletido, comparado_com):
+    tabela = nome if tipo == 'table' else getattr(getattr(objeto, 'table', None), 'name', '')
+    return not (refletido and comparado_com is None and PARTICAO_CONTAS.match(tabela))
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -49,6 +61,7 @@ def run_migrations_offline():
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_object=incluir_objeto,
     )
 
     with context.begin_transaction():
@@ -70,7 +83,8 @@ def run_migrations_online():
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata,
+            include_object=incluir_objeto
         )
 
         with context.begin_transaction():
@@ -0,0 +1,28 @@
+"""cria tabela versao dados
+
+Revision ID: 3f9b6d2e8a17
+Revises: e71a4c3b9d20
+Create Date: 2026-10-18 14:37:09.661842
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9b6d2e8a17'
+down_revision = 'e71a4c3b9d20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('tbl_versao_dados',
+    sa.Column('chave', sa.String(length=100), nullable=False),
+    sa.Column('versao', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('chave')
+    )
+
+
+def downgrade():
+    op.drop_table('tbl_versao_dados')
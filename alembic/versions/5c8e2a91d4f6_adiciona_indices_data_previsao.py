@@ -0,0 +1,32 @@
+"""adiciona indices em data_previsao
+
+Revision ID: 5c8e2a91d4f6
+Revises: b3d1f0a7c2e4
+Create Date: 2026-10-18 10:03:27.914520
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5c8e2a91d4f6'
+down_revision = 'b3d1f0a7c2e4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY não bloqueia escritas em tbl_contas, mas não roda dentro de transação
+    with op.get_context().autocommit_block():
+        op.create_index('ix_tbl_contas_data_previsao', 'tbl_contas', ['data_previsao'],
+                        postgresql_concurrently=True)
+        op.create_index('ix_tbl_contas_id_fornecedor_cliente_data_previsao', 'tbl_contas',
+                        ['id_fornecedor_cliente', 'data_previsao'], postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_tbl_contas_id_fornecedor_cliente_data_previsao', table_name='tbl_contas',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_tbl_contas_data_previsao', table_name='tbl_contas',
+                      postgresql_concurrently=True)
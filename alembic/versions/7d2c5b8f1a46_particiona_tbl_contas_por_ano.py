@@ -0,0 +1,97 @@
+"""particiona tbl_contas por ano de data_previsao
+
+Revision ID: 7d2c5b8f1a46
+Revises: c81f5a3e6b92
+Create Date: 2026-10-18 17:48:12.902315
+
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d2c5b8f1a46'
+down_revision = 'c81f5a3e6b92'
+branch_labels = None
+depends_on = None
+
+# além dos anos que já têm contas, cria as partições do ano corrente e dos próximos
+ANOS_A_FRENTE = 2
+
+INDICES = [
+    ('ix_tbl_contas_data_previsao_id', ['data_previsao', 'id'], None),
+    ('ix_tbl_contas_id_fornecedor_cliente_data_previsao', ['id_fornecedor_cliente', 'data_previsao'], None),
+    ('ix_tbl_contas_tipo_data_previsao', ['tipo', 'data_previsao', 'id'], None),
+    ('ix_tbl_contas_valor_id', ['valor', 'id'], None),
+    ('ix_tbl_contas_abertas_data_previsao', ['data_previsao', 'id'], 'esta_baixada IS NOT TRUE'),
+    ('ix_tbl_contas_baixadas_data_baixa', ['data_baixa'], 'esta_baixada IS TRUE'),
+]
+COLUNAS = '"id", "desc", valor, tipo, id_fornecedor_cliente, data_baixa, valor_baixa, esta_baixada, data_previsao'
+
+
+def criar_tabela_contas(nome, *restricoes, **kw):
+    op.create_table(
+        nome,
+        sa.Column('id', sa.Integer(), server_default=sa.text("nextval('tbl_contas_id_seq'::regclass)"), nullable=False),
+        sa.Column('desc', sa.String(length=30), nullable=True),
+        sa.Column('valor', sa.Numeric(), nullable=True),
+        sa.Column('tipo', sa.String(length=30), nullable=True),
+        sa.Column('id_fornecedor_cliente', sa.Integer(), nullable=True),
+        sa.Column('data_baixa', sa.Date(), nullable=True),
+        sa.Column('valor_baixa', sa.Numeric(), nullable=True),
+        sa.Column('esta_baixada', sa.Boolean(), nullable=True),
+        sa.Column('data_previsao', sa.Date(), nullable=False),
+        *restricoes,
+        **kw
+    )
+
+
+def substituir_tabela_contas(nova):
+    """Copia as contas para `nova`, descarta a tbl_contas atual e coloca `nova` no lugar, com
+    a sequência de ids, a chave estrangeira e os índices com os nomes de sempre."""
+    op.execute(f'INSERT INTO {nova} ({COLUNAS}) SELECT {COLUNAS} FROM tbl_contas')
+    op.execute('ALTER SEQUENCE tbl_contas_id_seq OWNED BY NONE')
+    op.drop_table('tbl_contas')
+    op.rename_table(nova, 'tbl_contas')
+    op.execute('ALTER SEQUENCE tbl_contas_id_seq OWNED BY tbl_contas.id')
+    op.execute(f'ALTER TABLE tbl_contas RENAME CONSTRAINT {nova}_pkey TO tbl_contas_pkey')
+    op.create_foreign_key('tbl_contas_id_fornecedor_cliente_fkey', 'tbl_contas', 'tbl_fornecedor_cliente',
+                          ['id_fornecedor_cliente'], ['id'])
+    # no pai particionado o índice é criado em cada partição (e nas que forem criadas depois)
+    for nome, colunas, condicao in INDICES:
+        op.create_index(nome, 'tbl_contas', colunas,
+                        postgresql_where=sa.text(condicao) if condicao is not None else None)
+    op.execute('ANALYZE tbl_contas')
+
+
+def upgrade():
+    # Reescreve a tabela inteira: rodar numa janela sem escritas (o LOCK garante isso durante a cópia).
+    # A chave primária passa a incluir data_previsao, exigência do PostgreSQL para tabelas particionadas;
+    # os ids continuam vindo de tbl_contas_id_seq e seguem únicos.
+    op.execute('LOCK TABLE tbl_contas IN ACCESS EXCLUSIVE MODE')
+    
+    criar_tabela_contas('tbl_contas_particionada',
+                        sa.PrimaryKeyConstraint('id', 'data_previsao', name='tbl_contas_particionada_pkey'),
+                        postgresql_partition_by='RANGE (data_previsao)')
+    
+    anos = {int(ano) for ano, in op.get_bind().execute(
+        sa.text('SELECT DISTINCT extract(year FROM data_previsao) FROM tbl_contas'))}
+    anos.update(range(date.today().year, date.today().year + ANOS_A_FRENTE + 1))
+    for ano in sorted(anos):
+        op.execute(f"CREATE TABLE tbl_contas_{ano} PARTITION OF tbl_contas_particionada "
+                   f"FOR VALUES FROM ('{ano}-01-01') TO ('{ano + 1}-01-01')")
+    # recebe datas sem partição própria até que a manutenção crie a do ano (shared/particoes.py)
+    op.execute('CREATE TABLE tbl_contas_padrao PARTITION OF tbl_contas_particionada DEFAULT')
+    
+    substituir_tabela_contas('tbl_contas_particionada')
+
+
+def downgrade():
+    op.execute('LOCK TABLE tbl_contas IN ACCESS EXCLUSIVE MODE')
+    
+    # partições desanexadas para arquivamento não voltam: só as linhas ainda em tbl_contas são copiadas
+    criar_tabela_contas('tbl_contas_nao_particionada',
+                        sa.PrimaryKeyConstraint('id', name='tbl_contas_nao_particionada_pkey'))
+    substituir_tabela_contas('tbl_contas_nao_particionada')
@@ -0,0 +1,47 @@
+"""adiciona indices para filtros e ordenacao de contas
+
+Revision ID: a4c7e19b2d35
+Revises: 3f9b6d2e8a17
+Create Date: 2026-10-18 16:12:48.305117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c7e19b2d35'
+down_revision = '3f9b6d2e8a17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY não bloqueia escritas em tbl_contas, mas não roda dentro de transação
+    with op.get_context().autocommit_block():
+        # contas em aberto são o conjunto consultado com mais frequência; o predicado é o mesmo usado no filtro
+        op.create_index('ix_tbl_contas_abertas_data_previsao', 'tbl_contas', ['data_previsao', 'id'],
+                        postgresql_where=sa.text('esta_baixada IS NOT TRUE'), postgresql_concurrently=True)
+        op.create_index('ix_tbl_contas_tipo_data_previsao', 'tbl_contas', ['tipo', 'data_previsao', 'id'],
+                        postgresql_concurrently=True)
+        op.create_index('ix_tbl_contas_valor_id', 'tbl_contas', ['valor', 'id'],
+                        postgresql_concurrently=True)
+        # (data_previsao, id) atende as mesmas consultas de (data_previsao) e também a paginação ordenada por data
+        op.create_index('ix_tbl_contas_data_previsao_id', 'tbl_contas', ['data_previsao', 'id'],
+                        postgresql_concurrently=True)
+        op.drop_index('ix_tbl_contas_data_previsao', table_name='tbl_contas',
+                      postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.create_index('ix_tbl_contas_data_previsao', 'tbl_contas', ['data_previsao'],
+                        postgresql_concurrently=True)
+        op.drop_index('ix_tbl_contas_data_previsao_id', table_name='tbl_contas',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_tbl_contas_valor_id', table_name='tbl_contas',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_tbl_contas_tipo_data_previsao', table_name='tbl_contas',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_tbl_contas_abertas_data_previsao', table_name='tbl_contas',
+                      postgresql_concurrently=True)
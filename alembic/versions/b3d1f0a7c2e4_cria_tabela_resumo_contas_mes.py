@@ -0,0 +1,42 @@
+"""cria tabela resumo contas mes
+
+Revision ID: b3d1f0a7c2e4
+Revises: 9ecbc04c9e3f
+Create Date: 2026-10-18 09:12:41.503217
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3d1f0a7c2e4'
+down_revision = '9ecbc04c9e3f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('tbl_resumo_contas_mes',
+    sa.Column('ano', sa.Integer(), nullable=False),
+    sa.Column('mes', sa.Integer(), nullable=False),
+    sa.Column('tipo', sa.String(length=30), nullable=False),
+    sa.Column('qtd', sa.Integer(), nullable=False),
+    sa.Column('valor_total', sa.Numeric(), nullable=False),
+    sa.Column('valor_baixado', sa.Numeric(), nullable=False),
+    sa.PrimaryKeyConstraint('ano', 'mes', 'tipo')
+    )
+    
+    op.execute('''
+        INSERT INTO tbl_resumo_contas_mes (ano, mes, tipo, qtd, valor_total, valor_baixado)
+        SELECT extract(year FROM data_previsao), extract(month FROM data_previsao), tipo,
+               count(*), coalesce(sum(valor), 0),
+               coalesce(sum(CASE WHEN esta_baixada THEN valor_baixa END), 0)
+        FROM tbl_contas
+        WHERE tipo IS NOT NULL
+        GROUP BY 1, 2, 3
+    ''')
+
+
+def downgrade():
+    op.drop_table('tbl_resumo_contas_mes')
@@ -0,0 +1,52 @@
+"""adiciona indices de trigramas para busca por nome e descricao
+
+Revision ID: b6e3f0a92d57
+Revises: e4a9c2d7f318
+Create Date: 2026-10-18 20:12:44.218907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6e3f0a92d57'
+down_revision = 'e4a9c2d7f318'
+branch_labels = None
+depends_on = None
+
+INDICE_FORNECEDORES = 'ix_tbl_fornecedor_cliente_nome_trgm'
+INDICE_CONTAS = 'ix_tbl_contas_desc_trgm'
+
+
+def criar_indice_trgm_particionado(nome, coluna):
+    """Como em e4a9c2d7f318: o índice GIN é criado só no pai (inválido), depois em cada partição
+    sem bloquear escritas, e cada um é anexado ao do pai."""
+    sufixo = nome.removeprefix('ix_tbl_contas_')
+    op.execute(f'CREATE INDEX {nome} ON ONLY tbl_contas USING gin ("{coluna}" gin_trgm_ops)')
+    
+    particoes = [particao for particao, in op.get_bind().execute(sa.text(
+        "SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = 'tbl_contas'::regclass"))]
+    with op.get_context().autocommit_block():
+        for particao in particoes:
+            op.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {particao}_{sufixo} '
+                       f'ON {particao} USING gin ("{coluna}" gin_trgm_ops)')
+    for particao in particoes:
+        op.execute(f'ALTER INDEX {nome} ATTACH PARTITION {particao}_{sufixo}')
+
+
+def upgrade():
+    # pg_trgm vem no pacote contrib do PostgreSQL; criar a extensão exige permissão no banco
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    
+    with op.get_context().autocommit_block():
+        op.create_index(INDICE_FORNECEDORES, 'tbl_fornecedor_cliente', ['nome'], postgresql_using='gin',
+                        postgresql_ops={'nome': 'gin_trgm_ops'}, postgresql_concurrently=True)
+    criar_indice_trgm_particionado(INDICE_CONTAS, 'desc')
+
+
+def downgrade():
+    # a extensão fica: outros objetos do banco podem depender dela
+    op.drop_index(INDICE_CONTAS, table_name='tbl_contas')
+    with op.get_context().autocommit_block():
+        op.drop_index(INDICE_FORNECEDORES, table_name='tbl_fornecedor_cliente', postgresql_concurrently=True)
@@ -0,0 +1,29 @@
+"""adiciona indice parcial de contas baixadas por data_baixa
+
+Revision ID: c81f5a3e6b92
+Revises: a4c7e19b2d35
+Create Date: 2026-10-18 17:05:31.448210
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c81f5a3e6b92'
+down_revision = 'a4c7e19b2d35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # o fluxo de caixa lê as contas baixadas pela data_baixa; o mesmo predicado da consulta
+    with op.get_context().autocommit_block():
+        op.create_index('ix_tbl_contas_baixadas_data_baixa', 'tbl_contas', ['data_baixa'],
+                        postgresql_where=sa.text('esta_baixada IS TRUE'), postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_tbl_contas_baixadas_data_baixa', table_name='tbl_contas',
+                      postgresql_concurrently=True)
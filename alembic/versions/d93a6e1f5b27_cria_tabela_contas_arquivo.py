@@ -0,0 +1,56 @@
+"""cria tabela de contas arquivadas
+
+Revision ID: d93a6e1f5b27
+Revises: b6e3f0a92d57
+Create Date: 2026-10-18 20:58:03.671442
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd93a6e1f5b27'
+down_revision = 'b6e3f0a92d57'
+branch_labels = None
+depends_on = None
+
+INDICES = [
+    ('ix_tbl_contas_arquivo_data_previsao_id', ['data_previsao', 'id']),
+    ('ix_tbl_contas_arquivo_id_fornecedor_cliente_data_previsao', ['id_fornecedor_cliente', 'data_previsao']),
+    ('ix_tbl_contas_arquivo_tipo_data_previsao', ['tipo', 'data_previsao', 'id']),
+    ('ix_tbl_contas_arquivo_valor_id', ['valor', 'id']),
+    ('ix_tbl_contas_arquivo_data_baixa', ['data_baixa']),
+]
+
+
+def upgrade():
+    # os ids vêm de tbl_contas (a conta é movida, não copiada): sem sequência própria
+    op.create_table('tbl_contas_arquivo',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('desc', sa.String(length=30), nullable=True),
+    sa.Column('valor', sa.Numeric(), nullable=True),
+    sa.Column('tipo', sa.String(length=30), nullable=True),
+    sa.Column('data_previsao', sa.Date(), nullable=False),
+    sa.Column('data_baixa', sa.Date(), nullable=True),
+    sa.Column('valor_baixa', sa.Numeric(), nullable=True),
+    sa.Column('esta_baixada', sa.Boolean(), nullable=True),
+    sa.Column('arquivada_em', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('id_fornecedor_cliente', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['id_fornecedor_cliente'], ['tbl_fornecedor_cliente.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    for nome, colunas in INDICES:
+        op.create_index(nome, 'tbl_contas_arquivo', colunas)
+
+
+def downgrade():
+    # devolve as arquivadas a tbl_contas antes de descartar a tabela; o resumo mensal precisa ser
+    # reconstruído em seguida (python manage.py reconstruir-resumo)
+    op.execute('''
+        INSERT INTO tbl_contas (id, "desc", valor, tipo, data_previsao, data_baixa, valor_baixa,
+                                esta_baixada, id_fornecedor_cliente)
+        SELECT id, "desc", valor, tipo, data_previsao, data_baixa, valor_baixa, esta_baixada, id_fornecedor_cliente
+        FROM tbl_contas_arquivo
+    ''')
+    op.drop_table('tbl_contas_arquivo')
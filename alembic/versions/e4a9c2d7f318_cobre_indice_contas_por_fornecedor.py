@@ -0,0 +1,48 @@
+"""troca o indice de contas por fornecedor por um que cobre os totais
+
+Revision ID: e4a9c2d7f318
+Revises: 7d2c5b8f1a46
+Create Date: 2026-10-18 18:41:07.553120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a9c2d7f318'
+down_revision = '7d2c5b8f1a46'
+branch_labels = None
+depends_on = None
+
+INDICE = 'ix_tbl_contas_id_fornecedor_cliente_cobertura'
+INDICE_ANTERIOR = 'ix_tbl_contas_id_fornecedor_cliente_data_previsao'
+
+
+def criar_indice_particionado(nome, colunas, incluidas=()):
+    """CREATE INDEX CONCURRENTLY não existe para tabela particionada: o índice é criado só no pai
+    (inválido), depois em cada partição sem bloquear escritas, e cada um é anexado ao do pai."""
+    incluir = f" INCLUDE ({', '.join(incluidas)})" if incluidas else ''
+    op.execute(f"CREATE INDEX {nome} ON ONLY tbl_contas ({', '.join(colunas)}){incluir}")
+    
+    particoes = [particao for particao, in op.get_bind().execute(sa.text(
+        "SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = 'tbl_contas'::regclass"))]
+    with op.get_context().autocommit_block():
+        for particao in particoes:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {particao}_{nome.removeprefix('ix_tbl_contas_')} "
+                       f"ON {particao} ({', '.join(colunas)}){incluir}")
+    for particao in particoes:
+        op.execute(f"ALTER INDEX {nome} ATTACH PARTITION {particao}_{nome.removeprefix('ix_tbl_contas_')}")
+
+
+def upgrade():
+    # as colunas somadas no resumo por fornecedor ficam no índice: a consulta vira index-only scan
+    criar_indice_particionado(INDICE, ['id_fornecedor_cliente', 'data_previsao'],
+                              ['tipo', 'esta_baixada', 'valor', 'valor_baixa'])
+    # mesmas colunas iniciais: o índice novo atende tudo que o anterior atendia
+    op.drop_index(INDICE_ANTERIOR, table_name='tbl_contas')
+
+
+def downgrade():
+    criar_indice_particionado(INDICE_ANTERIOR, ['id_fornecedor_cliente', 'data_previsao'])
+    op.drop_index(INDICE, table_name='tbl_contas')
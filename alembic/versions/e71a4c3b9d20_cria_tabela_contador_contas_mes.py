@@ -0,0 +1,36 @@
+"""cria tabela contador contas mes
+
+Revision ID: e71a4c3b9d20
+Revises: 5c8e2a91d4f6
+Create Date: 2026-10-18 10:21:55.276341
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e71a4c3b9d20'
+down_revision = '5c8e2a91d4f6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('tbl_contador_contas_mes',
+    sa.Column('ano', sa.Integer(), nullable=False),
+    sa.Column('mes', sa.Integer(), nullable=False),
+    sa.Column('qtd', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('ano', 'mes')
+    )
+    
+    op.execute('''
+        INSERT INTO tbl_contador_contas_mes (ano, mes, qtd)
+        SELECT extract(year FROM data_previsao), extract(month FROM data_previsao), count(*)
+        FROM tbl_contas
+        GROUP BY 1, 2
+    ''')
+
+
+def downgrade():
+    op.drop_table('tbl_contador_contas_mes')
@@ -0,0 +1,153 @@
+"""Simula um pico de tráfego num servidor uvicorn separado, com e sem o controle de admissão
+(ADMISSAO_ATIVA), e compara a latência das requisições atendidas de cada classe.
+
+Durante --duracao segundos, --usuarios-pesados clientes repetem --caminho-pesado (da classe pesada)
+e --usuarios-leves clientes repetem --caminho-leve (consulta por id). Um cliente que recebe 503
+espera o Retry-After antes de tentar de novo. Durante o pico, /saude/admissao é amostrado para
+registrar a maior fila de cada classe.
+
+O processo sai com código 1 se algum 503 vier sem Retry-After ou se, com o controle ativo, o p99
+das consultas leves atendidas não ficar abaixo do p99 sem o controle.
+
+Uso:
+    python -m benchmarks.admissao --usuarios-pesados 40 --usuarios-leves 20 --duracao 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+CAMINHO_PESADO = '/contas-pagar-receber/previsao-gastos-por-mes?ano=2023&incluir_arquivadas=true'
+CAMINHO_LEVE = '/contas-pagar-receber/{id}'
+INTERVALO_AMOSTRAGEM = 0.1
+
+
+class Classe:
+    """Resultados de um grupo de clientes que repetem o mesmo caminho."""
+    
+    def __init__(self):
+        self.latencias = []
+        self.recusas = 0
+        self.recusas_sem_retry_after = 0
+        self.erros = 0
+    
+    def resumo(self) -> dict:
+        return {
+            'atendidas': len(self.latencias),
+            'recusadas_503': self.recusas,
+            'recusadas_sem_retry_after': self.recusas_sem_retry_after,
+            'erros': self.erros,
+            'p50_ms': percentil(self.latencias, 0.50),
+            'p99_ms': percentil(self.latencias, 0.99),
+            'max_ms': percentil(self.latencias, 1.0),
+        }
+
+
+async def aguardar_servidor(cliente: httpx.AsyncClient) -> None:
+    for _ in range(100):
+        try:
+            await cliente.get('/')
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError('o servidor não respondeu')
+
+def percentil(valores: list, p: float):
+    if not valores:
+        return None
+    valores = sorted(valores)
+    return round(valores[min(len(valores) - 1, int(len(valores) * p))] * 1000, 1)
+
+async def usuario(cliente: httpx.AsyncClient, caminho, classe: Classe, fim: float) -> None:
+    i = 0
+    while time.perf_counter() < fim:
+        i += 1
+        inicio = time.perf_counter()
+        try:
+            resposta = await cliente.get(caminho(i))
+        except httpx.HTTPError:
+            classe.erros += 1
+            continue
+        
+        if resposta.status_code == 503:
+            classe.recusas += 1
+            retry_after = resposta.headers.get('retry-after')
+            if retry_after is None:
+                classe.recusas_sem_retry_after += 1
+            await asyncio.sleep(float(retry_after or 1))
+        elif resposta.status_code < 500:
+            # um 404 (conta arquivada ou removida) também é uma consulta atendida
+            classe.latencias.append(time.perf_counter() - inicio)
+        else:
+            classe.erros += 1
+
+async def amostrar_filas(cliente: httpx.AsyncClient, maiores: dict) -> None:
+    while True:
+        resposta = await cliente.get('/saude/admissao')
+        for nome, classe in resposta.json().items():
+            maiores[nome] = max(maiores.get(nome, 0), classe['na_fila'])
+        await asyncio.sleep(INTERVALO_AMOSTRAGEM)
+
+async def gerar_pico(args) -> dict:
+    pesada, leve = Classe(), Classe()
+    maiores_filas = {}
+    limites = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    
+    async with httpx.AsyncClient(base_url=f'http://127.0.0.1:{args.porta}', limits=limites, timeout=120) as cliente:
+        await aguardar_servidor(cliente)
+        await asyncio.gather(*(cliente.get(args.caminho_leve.format(id=i)) for i in range(1, 16)))
+        
+        amostragem = asyncio.ensure_future(amostrar_filas(cliente, maiores_filas))
+        fim = time.perf_counter() + args.duracao
+        await asyncio.gather(
+            *(usuario(cliente, lambda i: args.caminho_pesado, pesada, fim) for _ in range(args.usuarios_pesados)),
+            *(usuario(cliente, lambda i, u=u: args.caminho_leve.format(id=u * 1000 + i), leve, fim)
+              for u in range(1, args.usuarios_leves + 1)),
+        )
+        amostragem.cancel()
+        admissao = (await cliente.get('/saude/admissao')).json()
+    
+    return {'pesada': pesada.resumo(), 'leve': leve.resumo(), 'maior_fila': maiores_filas, 'admissao': admissao}
+
+def executar_modo(ativa: bool, args) -> dict:
+    ambiente = {**os.environ, 'ADMISSAO_ATIVA': str(ativa).lower()}
+    servidor = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(args.porta),
+                                 '--log-level', 'error'], env=ambiente)
+    try:
+        return asyncio.run(gerar_pico(args))
+    finally:
+        servidor.terminate()
+        servidor.wait()
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--usuarios-pesados', type=int, default=40)
+    parser.add_argument('--usuarios-leves', type=int, default=20)
+    parser.add_argument('--duracao', type=float, default=20)
+    parser.add_argument('--caminho-pesado', default=CAMINHO_PESADO)
+    parser.add_argument('--caminho-leve', default=CAMINHO_LEVE, help='com {id}, trocado a cada requisição')
+    parser.add_argument('--porta', type=int, default=8768)
+    args = parser.parse_args()
+    
+    resultado = {
+        'parametros': {'usuarios_pesados': args.usuarios_pesados, 'usuarios_leves': args.usuarios_leves,
+                       'duracao_s': args.duracao, 'caminho_pesado': args.caminho_pesado},
+        'sem_admissao': executar_modo(False, args),
+        'com_admissao': executar_modo(True, args),
+    }
+    sem, com = resultado['sem_admissao'], resultado['com_admissao']
+    resultado['ok'] = (all(modo[classe]['recusadas_sem_retry_after'] == 0 for modo in (sem, com) for classe in ('pesada', 'leve'))
+                       and com['leve']['p99_ms'] is not None and sem['leve']['p99_ms'] is not None
+                       and com['leve']['p99_ms'] < sem['leve']['p99_ms'])
+    print(json.dumps(resultado, indent=2))
+    raise SystemExit(0 if resultado['ok'] else 1)
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,272 @@
+"""Exercita cada endpoint da API em processo (ASGI), em níveis fixos de concorrência, e reporta
+latência p50/p95/p99, vazão e comandos SQL por requisição em JSON.
+
+Rode sobre uma base recém-semeada (`python -m benchmarks.semear ...`): os cenários de escrita
+alteram contas e fornecedores existentes, então duas execuções só são comparáveis se partirem
+da mesma base. As requisições seguem uma sequência pseudoaleatória fixa (--semente).
+
+Com --salvar-baseline o resultado é gravado para comparações futuras; com --baseline cada
+cenário é comparado ao arquivo informado e o processo sai com código 1 se o p95 ou a vazão
+piorarem além de --tolerancia, ou se o número de comandos SQL por requisição aumentar.
+
+Uso:
+    python -m benchmarks.carga --concorrencia 1 10 50 --requisicoes 500 --salvar-baseline baseline.json
+    python -m benchmarks.carga --concorrencia 1 10 50 --requisicoes 500 --baseline baseline.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import date
+
+import httpx
+from sqlalchemy import func, select
+
+import main
+import routers.contas_pagar_receber_router as contas_router
+import shared.admissao as admissao
+from models.contas_pagar_receber_model import ContaPagarReceber
+from models.fornecedor_cliente_model import FornecedorCliente
+from shared.database import AsyncSessionLocal
+from shared.query_counter import contar_queries
+
+
+# as contas criadas pelo benchmark ficam num ano fora da base semeada
+ANO_ESCRITA = 2099
+TAMANHO_IMPORTACAO = 10
+TAMANHO_BAIXA_EM_LOTE = 10
+AQUECIMENTO = 20
+
+
+class Contexto:
+    """Volumes da base e ids criados durante a execução, usados para montar as requisições."""
+    
+    def __init__(self, semente: int, max_conta: int, max_fornecedor: int, anos: list):
+        self.aleatorio = random.Random(semente)
+        self.max_conta = max_conta
+        self.max_fornecedor = max_fornecedor
+        self.anos = anos
+        self.contas_criadas = []
+        self.fornecedores_criados = []
+    
+    def id_conta(self) -> int:
+        return self.aleatorio.randint(1, self.max_conta)
+    
+    def id_fornecedor(self) -> int:
+        return self.aleatorio.randint(1, self.max_fornecedor)
+    
+    def nova_conta(self, i: int) -> dict:
+        return {'desc': f'benchmark {i}', 'valor': '100.00', 'tipo': 'pagar',
+                'id_fornecedor_cliente': self.id_fornecedor(),
+                'data_previsao': date(ANO_ESCRITA, i % 12 + 1, 1).isoformat()}
+
+
+class Cenario:
+    def __init__(self, nome: str, metodo: str, requisicao, status_esperado=(200,), guardar_id=None):
+        self.nome = nome
+        self.metodo = metodo
+        # requisicao(contexto, i) -> (url, kwargs do httpx)
+        self.requisicao = requisicao
+        self.status_esperado = status_esperado
+        # lista do contexto onde guardar o id devolvido pelas criações
+        self.guardar_id = guardar_id
+
+
+CENARIOS = [
+    Cenario('listar_contas', 'GET',
+            lambda ctx, i: (f'/contas-pagar-receber?limit=100&after={ctx.id_conta()}', {})),
+    Cenario('listar_contas_ndjson', 'GET',
+            lambda ctx, i: (f'/contas-pagar-receber?formato=ndjson&limit=1000&after={ctx.id_conta()}', {})),
+    Cenario('previsao_gastos_por_mes', 'GET',
+            lambda ctx, i: (f'/contas-pagar-receber/previsao-gastos-por-mes?ano={ctx.aleatorio.choice(ctx.anos)}', {})),
+    Cenario('obter_conta', 'GET',
+            lambda ctx, i: (f'/contas-pagar-receber/{ctx.id_conta()}', {})),
+    Cenario('listar_contas_do_fornecedor', 'GET',
+            lambda ctx, i: (f'/fornecedor-cliente/{ctx.id_fornecedor()}/contas-pagar-receber', {})),
+    Cenario('listar_fornecedor_cliente', 'GET',
+            lambda ctx, i: ('/fornecedor-cliente', {})),
+    Cenario('obter_fornecedor_cliente', 'GET',
+            lambda ctx, i: (f'/fornecedor-cliente/{ctx.id_fornecedor()}', {})),
+    Cenario('buscar_contas', 'GET',
+            lambda ctx, i: (f'/contas-pagar-receber/busca?q=conta {ctx.id_conta()}', {})),
+    Cenario('buscar_fornecedor_cliente', 'GET',
+            lambda ctx, i: (f'/fornecedor-cliente/busca?q=fornecedr {ctx.id_fornecedor()}', {})),
+    Cenario('criar_conta', 'POST',
+            lambda ctx, i: ('/contas-pagar-receber', {'json': ctx.nova_conta(i)}),
+            status_esperado=(201,), guardar_id='contas_criadas'),
+    Cenario('importar_contas', 'POST',
+            lambda ctx, i: ('/contas-pagar-receber/bulk',
+                            {'json': [ctx.nova_conta(i * TAMANHO_IMPORTACAO + n) for n in range(TAMANHO_IMPORTACAO)]})),
+    Cenario('atualizar_conta', 'PUT',
+            lambda ctx, i: (f'/contas-pagar-receber/{ctx.id_conta()}', {'json': ctx.nova_conta(i)})),
+    Cenario('baixar_conta', 'POST',
+            lambda ctx, i: (f'/contas-pagar-receber/{ctx.id_conta()}/baixar', {})),
+    Cenario('baixar_contas_em_lote', 'POST',
+            lambda ctx, i: ('/contas-pagar-receber/baixar',
+                            {'json': {'ids': sorted(ctx.id_conta() for _ in range(TAMANHO_BAIXA_EM_LOTE))}})),
+    Cenario('deletar_conta', 'DELETE',
+            lambda ctx, i: (f'/contas-pagar-receber/{ctx.contas_criadas.pop()}', {}),
+            status_esperado=(204,)),
+    Cenario('criar_fornecedor_cliente', 'POST',
+            lambda ctx, i: ('/fornecedor-cliente', {'json': {'nome': f'Fornecedor benchmark {i}'}}),
+            guardar_id='fornecedores_criados'),
+    Cenario('atualizar_fornecedor_cliente', 'PUT',
+            lambda ctx, i: (f'/fornecedor-cliente/{ctx.id_fornecedor()}', {'json': {'nome': f'Fornecedor atualizado {i}'}})),
+    Cenario('deletar_fornecedor_cliente', 'DELETE',
+            lambda ctx, i: (f'/fornecedor-cliente/{ctx.fornecedores_criados.pop()}', {}),
+            status_esperado=(204,)),
+]
+
+
+async def carregar_contexto(semente: int) -> Contexto:
+    async with AsyncSessionLocal() as db:
+        max_conta = await db.scalar(select(func.max(ContaPagarReceber.id)))
+        max_fornecedor = await db.scalar(select(func.max(FornecedorCliente.id)))
+        anos = (await db.execute(select(func.min(ContaPagarReceber.data_previsao),
+                                        func.max(ContaPagarReceber.data_previsao)))).one()
+    
+    if not max_conta or not max_fornecedor:
+        raise SystemExit('Base vazia: rode `python -m benchmarks.semear` antes do benchmark.')
+    
+    return Contexto(semente, max_conta, max_fornecedor, list(range(anos[0].year, anos[1].year + 1)))
+
+async def volumes() -> dict:
+    async with AsyncSessionLocal() as db:
+        return {
+            'fornecedores': await db.scalar(select(func.count()).select_from(FornecedorCliente)),
+            'contas': await db.scalar(select(func.count()).select_from(ContaPagarReceber)),
+        }
+
+
+async def medir(cliente, cenario: Cenario, contexto: Contexto, concorrencia: int, requisicoes: int) -> dict:
+    limite = asyncio.Semaphore(concorrencia)
+    latencias = []
+    erros = 0
+    
+    async def requisitar(i: int):
+        nonlocal erros
+        url, kwargs = cenario.requisicao(contexto, i)
+        async with limite:
+            inicio = time.perf_counter()
+            resposta = await cliente.request(cenario.metodo, url, **kwargs)
+            latencias.append(time.perf_counter() - inicio)
+        
+        if resposta.status_code not in cenario.status_esperado:
+            erros += 1
+        elif cenario.guardar_id:
+            getattr(contexto, cenario.guardar_id).append(resposta.json()['id'])
+    
+    with contar_queries() as contador:
+        inicio = time.perf_counter()
+        await asyncio.gather(*(requisitar(i) for i in range(requisicoes)))
+        duracao = time.perf_counter() - inicio
+    
+    quantis = statistics.quantiles(latencias, n=100)
+    return {
+        'requisicoes': requisicoes,
+        'erros': erros,
+        'vazao_rps': round(requisicoes / duracao, 1),
+        'p50_ms': round(quantis[49] * 1000, 2),
+        'p95_ms': round(quantis[94] * 1000, 2),
+        'p99_ms': round(quantis[98] * 1000, 2),
+        'sql_por_requisicao': round(contador.total / requisicoes, 2),
+    }
+
+
+def comparar(atual: dict, baseline: dict, tolerancia: float) -> dict:
+    """Compara cada cenário/concorrência presente nas duas execuções."""
+    comparacao = {}
+    for nome, niveis in atual['cenarios'].items():
+        for concorrencia, metricas in niveis.items():
+            anterior = baseline['cenarios'].get(nome, {}).get(concorrencia)
+            if anterior is None:
+                continue
+            
+            variacoes = {
+                metrica: {
+                    'baseline': anterior[metrica],
+                    'atual': metricas[metrica],
+                    'variacao_pct': round((metricas[metrica] - anterior[metrica]) / anterior[metrica] * 100, 1)
+                                    if anterior[metrica] else None,
+                }
+                for metrica in ('p50_ms', 'p95_ms', 'p99_ms', 'vazao_rps', 'sql_por_requisicao')
+            }
+            variacoes['regressao'] = (
+                metricas['p95_ms'] > anterior['p95_ms'] * (1 + tolerancia)
+                or metricas['vazao_rps'] < anterior['vazao_rps'] * (1 - tolerancia)
+                or metricas['sql_por_requisicao'] > anterior['sql_por_requisicao']
+            )
+            comparacao.setdefault(nome, {})[concorrencia] = variacoes
+    
+    return comparacao
+
+
+async def executar(args) -> dict:
+    # a base semeada já passa do limite mensal de contas
+    contas_router.QTD_PERMITIDA_MES = 10 ** 9
+    # mede a aplicação em cada nível de concorrência, sem recusas do controle de admissão
+    admissao.ADMISSAO_ATIVA = False
+    
+    contexto = await carregar_contexto(args.semente)
+    cenarios = [cenario for cenario in CENARIOS if not args.cenarios or cenario.nome in args.cenarios]
+    resultado = {
+        'parametros': {'concorrencia': args.concorrencia, 'requisicoes': args.requisicoes, 'semente': args.semente},
+        'volumes': await volumes(),
+        'cenarios': {},
+    }
+    
+    # erros da aplicação viram respostas 500 e contam como erro do cenário, em vez de interromper a execução
+    transporte = httpx.ASGITransport(app=main.app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transporte, base_url='http://benchmark', timeout=None) as cliente:
+        for cenario in cenarios:
+            # aquecimento: abre as conexões do pool e popula os caches de compilação
+            await medir(cliente, cenario, contexto, min(args.concorrencia), AQUECIMENTO)
+            
+            for concorrencia in args.concorrencia:
+                resultado['cenarios'].setdefault(cenario.nome, {})[str(concorrencia)] = \
+                    await medir(cliente, cenario, contexto, concorrencia, args.requisicoes)
+                print(f'{cenario.nome} c={concorrencia}: '
+                      f'{resultado["cenarios"][cenario.nome][str(concorrencia)]}', file=sys.stderr, flush=True)
+    
+    return resultado
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concorrencia', type=int, nargs='+', default=[1, 10, 50])
+    parser.add_argument('--requisicoes', type=int, default=500, help='requisições por cenário e nível de concorrência')
+    parser.add_argument('--cenarios', nargs='*', choices=[cenario.nome for cenario in CENARIOS],
+                        help='executa só os cenários informados')
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--salvar-baseline', metavar='ARQUIVO')
+    parser.add_argument('--baseline', metavar='ARQUIVO', help='compara o resultado com uma execução salva')
+    parser.add_argument('--tolerancia', type=float, default=0.1,
+                        help='piora relativa aceita no p95 e na vazão antes de acusar regressão')
+    args = parser.parse_args()
+    
+    resultado = asyncio.run(executar(args))
+    
+    if args.salvar_baseline:
+        with open(args.salvar_baseline, 'w') as arquivo:
+            json.dump(resultado, arquivo, indent=2)
+    
+    regressao = False
+    if args.baseline:
+        with open(args.baseline) as arquivo:
+            baseline = json.load(arquivo)
+        
+        resultado['comparacao'] = comparar(resultado, baseline, args.tolerancia)
+        resultado['volumes_iguais_ao_baseline'] = resultado['volumes'] == baseline['volumes']
+        regressao = any(variacoes['regressao'] for niveis in resultado['comparacao'].values()
+                        for variacoes in niveis.values())
+    
+    print(json.dumps(resultado, indent=2))
+    
+    if regressao:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,88 @@
+"""Mede, em processo (ASGI), os bytes transferidos e a latência de GET /contas-pagar-receber para
+alguns tamanhos de página, com a resposta completa e com fields=, sem compressão, com gzip e com br.
+
+Cada combinação faz --requisicoes requisições em páginas sorteadas (cursor `after` aleatório, mesma
+sequência para todas). Os bytes são os do corpo como enviados (comprimidos, quando for o caso).
+Como em processo não há rede, também é reportado o tempo estimado com a transferência a
+--banda-mbps: latência + bytes / banda.
+
+Uso:
+    python -m benchmarks.compressao --tamanhos 10 100 1000 --requisicoes 50 --banda-mbps 10
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+import httpx
+from sqlalchemy import func, select
+
+import main
+import shared.admissao as admissao
+from models.contas_pagar_receber_model import ContaPagarReceber
+from shared.database import AsyncSessionLocal
+
+
+CAMPOS_ENXUTOS = 'id,valor,data_previsao,esta_baixada'
+CODIFICACOES = ('identity', 'gzip', 'br')
+
+async def maior_id() -> int:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(func.max(ContaPagarReceber.id)))
+
+async def medir(cliente: httpx.AsyncClient, parametros: dict, codificacao: str, cursores: list, banda_mbps: float) -> dict:
+    latencias, tamanhos = [], []
+    for after in cursores:
+        inicio = time.perf_counter()
+        resposta = await cliente.get('/contas-pagar-receber', params={**parametros, 'after': after},
+                                     headers={'Accept-Encoding': codificacao})
+        latencias.append(time.perf_counter() - inicio)
+        resposta.raise_for_status()
+        assert resposta.headers.get('content-encoding', 'identity') in (codificacao, 'identity')
+        tamanhos.append(resposta.num_bytes_downloaded)
+    
+    latencias.sort()
+    media_bytes = statistics.fmean(tamanhos)
+    return {
+        'bytes_medio': round(media_bytes),
+        'p50_ms': round(latencias[len(latencias) // 2] * 1000, 2),
+        'p95_ms': round(latencias[min(len(latencias) - 1, int(len(latencias) * 0.95))] * 1000, 2),
+        'estimado_com_transferencia_ms': round((statistics.fmean(latencias) + media_bytes * 8 / (banda_mbps * 1e6)) * 1000, 2),
+    }
+
+async def executar(args) -> dict:
+    # mede serialização e compressão, sem recusas do controle de admissão
+    admissao.ADMISSAO_ATIVA = False
+    aleatorio = random.Random(args.semente)
+    ultimo_id = await maior_id()
+    resultado = {'parametros': {'tamanhos': args.tamanhos, 'requisicoes': args.requisicoes, 'banda_mbps': args.banda_mbps},
+                 'paginas': {}}
+    
+    async with httpx.AsyncClient(app=main.app, base_url='http://benchmark', timeout=None) as cliente:
+        for tamanho in args.tamanhos:
+            cursores = [aleatorio.randint(0, ultimo_id - tamanho * 10) for _ in range(args.requisicoes)]
+            for campos in (None, CAMPOS_ENXUTOS):
+                parametros = {'limit': tamanho, **({'fields': campos} if campos else {})}
+                # aquecimento: pool de conexões e caches de compilação
+                await medir(cliente, parametros, 'identity', cursores[:5], args.banda_mbps)
+                for codificacao in CODIFICACOES:
+                    chave = f"limit={tamanho} fields={campos or 'todos'} {codificacao}"
+                    resultado['paginas'][chave] = await medir(cliente, parametros, codificacao, cursores, args.banda_mbps)
+    
+    return resultado
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--requisicoes', type=int, default=50)
+    parser.add_argument('--banda-mbps', type=float, default=10)
+    parser.add_argument('--semente', type=int, default=42)
+    args = parser.parse_args()
+    
+    print(json.dumps(asyncio.run(executar(args)), indent=2))
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,111 @@
+"""Compara a latência de criar_conta e atualizar_conta no caminho antigo (get do fornecedor,
+upsert do contador, INSERT/UPDATE pelo ORM, COMMIT e SELECT de recarga) com o caminho
+atual (um único comando com RETURNING + COMMIT), contando os comandos SQL de cada um.
+
+Uso:
+    python -m benchmarks.escrita --iteracoes 500 --id-fornecedor 1
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from datetime import date
+
+from sqlalchemy.orm import joinedload
+
+import routers.contas_pagar_receber_router as contas_router
+from models.contas_pagar_receber_model import ContaPagarReceber
+from models.fornecedor_cliente_model import FornecedorCliente
+from routers.contas_pagar_receber_router import ContaPagarReceberRequest, ContaPagarReceberResponse
+from shared.database import AsyncSessionLocal
+from shared.query_counter import contar_queries
+
+
+async def criar_conta_antigo(conta_request: ContaPagarReceberRequest, db):
+    if conta_request.id_fornecedor_cliente is not None:
+        await db.get(FornecedorCliente, conta_request.id_fornecedor_cliente)
+    await contas_router.reservar_registros_no_mes(db, conta_request.data_previsao)
+    
+    conta = ContaPagarReceber(**conta_request.dict())
+    db.add(conta)
+    await db.commit()
+    
+    conta = await db.get(ContaPagarReceber, conta.id,
+                         options=[joinedload(ContaPagarReceber.fornecedor_cliente)],
+                         populate_existing=True)
+    return ContaPagarReceberResponse.from_orm(conta)
+
+async def atualizar_conta_antigo(id_conta: int, conta_request: ContaPagarReceberRequest, db):
+    if conta_request.id_fornecedor_cliente is not None:
+        await db.get(FornecedorCliente, conta_request.id_fornecedor_cliente)
+    
+    conta = await db.get(ContaPagarReceber, id_conta)
+    conta.desc = conta_request.desc
+    conta.valor = conta_request.valor
+    conta.tipo = conta_request.tipo
+    conta.id_fornecedor_cliente = conta_request.id_fornecedor_cliente
+    await db.commit()
+    
+    conta = await db.get(ContaPagarReceber, id_conta,
+                         options=[joinedload(ContaPagarReceber.fornecedor_cliente)],
+                         populate_existing=True)
+    return ContaPagarReceberResponse.from_orm(conta)
+
+async def criar_conta_atual(conta_request: ContaPagarReceberRequest, db):
+    return ContaPagarReceberResponse.parse_obj(await contas_router.criar_conta(conta_request, db))
+
+async def atualizar_conta_atual(id_conta: int, conta_request: ContaPagarReceberRequest, db):
+    return ContaPagarReceberResponse.parse_obj(await contas_router.atualizar_conta(id_conta, conta_request, db))
+
+
+async def medir(operacao, iteracoes: int) -> dict:
+    latencias = []
+    with contar_queries() as contador:
+        for i in range(iteracoes):
+            async with AsyncSessionLocal() as db:
+                inicio = time.perf_counter()
+                await operacao(i, db)
+                latencias.append(time.perf_counter() - inicio)
+    
+    quantis = statistics.quantiles(latencias, n=100)
+    return {
+        'iteracoes': iteracoes,
+        'p50_ms': round(quantis[49] * 1000, 3),
+        'p95_ms': round(quantis[94] * 1000, 3),
+        'comandos_por_operacao': round(contador.total / iteracoes, 2),
+    }
+
+
+async def executar(args) -> dict:
+    # o benchmark cria milhares de contas no mesmo mês
+    contas_router.QTD_PERMITIDA_MES = 10 ** 9
+    
+    def requisicao(i: int) -> ContaPagarReceberRequest:
+        return ContaPagarReceberRequest(desc=f'benchmark {i}', valor='100.00', tipo='pagar',
+                                        id_fornecedor_cliente=args.id_fornecedor,
+                                        data_previsao=date(2000, 1, 1))
+    
+    async with AsyncSessionLocal() as db:
+        conta = await criar_conta_atual(requisicao(0), db)
+    
+    resultado = {}
+    for nome, criar, atualizar in (('antigo', criar_conta_antigo, atualizar_conta_antigo),
+                                   ('atual', criar_conta_atual, atualizar_conta_atual)):
+        resultado[nome] = {
+            'criar_conta': await medir(lambda i, db: criar(requisicao(i), db), args.iteracoes),
+            'atualizar_conta': await medir(lambda i, db: atualizar(conta.id, requisicao(i), db), args.iteracoes),
+        }
+    
+    return resultado
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iteracoes', type=int, default=500)
+    parser.add_argument('--id-fornecedor', type=int, default=None)
+    
+    print(json.dumps(asyncio.run(executar(parser.parse_args())), indent=2))
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,127 @@
+"""Exporta as contas por GET /contas-pagar-receber/export num servidor uvicorn separado e verifica
+que a memória do servidor não cresce com a quantidade de linhas exportadas.
+
+O RSS do processo do servidor é amostrado (/proc, só Linux) durante a exportação inteira; o
+processo sai com código 1 se o pico passar do RSS medido antes da exportação em mais de
+--limite-memoria-mb, ou se a quantidade de linhas exportadas não bater com a de contas na base.
+Em seguida uma exportação é abandonada após o primeiro bloco e confere-se que nenhuma consulta
+sobre tbl_contas continua aberta no banco.
+
+Rode sobre uma base semeada com alguns milhões de contas (`python -m benchmarks.semear --contas 3000000`).
+
+Uso:
+    python -m benchmarks.exportacao --formato csv --limite-memoria-mb 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+from sqlalchemy import func, select, text
+
+from models.contas_pagar_receber_model import ContaPagarReceber
+from shared.database import AsyncSessionLocal
+
+
+INTERVALO_AMOSTRAGEM = 0.05
+
+def rss_mb(pid: int) -> float:
+    with open(f'/proc/{pid}/status') as status:
+        for linha in status:
+            if linha.startswith('VmRSS:'):
+                return int(linha.split()[1]) / 1024
+    return 0.0
+
+async def amostrar_memoria(pid: int, amostras: list) -> None:
+    while True:
+        amostras.append(rss_mb(pid))
+        await asyncio.sleep(INTERVALO_AMOSTRAGEM)
+
+async def aguardar_servidor(cliente: httpx.AsyncClient) -> None:
+    for _ in range(100):
+        try:
+            await cliente.get('/')
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError('o servidor não respondeu')
+
+async def consultas_abertas_em_contas() -> int:
+    consulta = text("SELECT count(*) FROM pg_stat_activity "
+                    "WHERE pid <> pg_backend_pid() AND state <> 'idle' AND query ILIKE '%FROM tbl_contas%'")
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(consulta)
+
+async def exportar(args, pid: int) -> dict:
+    async with AsyncSessionLocal() as db:
+        total_contas = await db.scalar(select(func.count()).select_from(ContaPagarReceber))
+    
+    async with httpx.AsyncClient(base_url=f'http://127.0.0.1:{args.porta}', timeout=None) as cliente:
+        await aguardar_servidor(cliente)
+        rss_inicial = rss_mb(pid)
+        
+        amostras = []
+        amostragem = asyncio.ensure_future(amostrar_memoria(pid, amostras))
+        inicio = time.perf_counter()
+        linhas = 0
+        bytes_recebidos = 0
+        async with cliente.stream('GET', '/contas-pagar-receber/export', params={'formato': args.formato}) as resposta:
+            resposta.raise_for_status()
+            async for bloco in resposta.aiter_bytes():
+                linhas += bloco.count(b'\n')
+                bytes_recebidos += len(bloco)
+        duracao = time.perf_counter() - inicio
+        amostragem.cancel()
+        
+        # abandona uma exportação no primeiro bloco: a consulta precisa ser encerrada no servidor
+        async with cliente.stream('GET', '/contas-pagar-receber/export', params={'formato': args.formato}) as resposta:
+            async for bloco in resposta.aiter_bytes():
+                break
+        await asyncio.sleep(1)
+        abertas_apos_desconexao = await consultas_abertas_em_contas()
+    
+    # o CSV tem uma linha de cabeçalho
+    linhas_de_contas = linhas - 1 if args.formato == 'csv' else linhas
+    crescimento = max(amostras) - rss_inicial
+    return {
+        'formato': args.formato,
+        'contas_na_base': total_contas,
+        'contas_exportadas': linhas_de_contas,
+        'mb_exportados': round(bytes_recebidos / 2 ** 20, 1),
+        'duracao_s': round(duracao, 2),
+        'contas_por_s': round(linhas_de_contas / duracao),
+        'rss_inicial_mb': round(rss_inicial, 1),
+        'rss_pico_mb': round(max(amostras), 1),
+        'crescimento_rss_mb': round(crescimento, 1),
+        'limite_memoria_mb': args.limite_memoria_mb,
+        'consultas_abertas_apos_desconexao': abertas_apos_desconexao,
+        'ok': crescimento <= args.limite_memoria_mb and linhas_de_contas == total_contas
+              and abertas_apos_desconexao == 0,
+    }
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--formato', choices=['csv', 'ndjson'], default='csv')
+    parser.add_argument('--limite-memoria-mb', type=float, default=64,
+                        help='crescimento máximo aceito do RSS do servidor durante a exportação')
+    parser.add_argument('--porta', type=int, default=8765)
+    args = parser.parse_args()
+    
+    servidor = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(args.porta),
+                                 '--log-level', 'warning'], env=os.environ.copy())
+    try:
+        resultado = asyncio.run(exportar(args, servidor.pid))
+    finally:
+        servidor.terminate()
+        servidor.wait()
+    
+    print(json.dumps(resultado, indent=2))
+    raise SystemExit(0 if resultado['ok'] else 1)
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,160 @@
+"""Verifica o roteamento de leituras para réplicas contra um primário e uma réplica PostgreSQL locais
+(streaming replication, por exemplo criada com `pg_basebackup -R`), com servidores uvicorn separados.
+
+1. Com a aplicação de WAL pausada na réplica (pg_wal_replay_pause), uma conta criada no primário não
+   aparece num GET sem LSN (a leitura foi à réplica), mas aparece no GET que envia o X-LSN-Escrita
+   devolvido pela escrita (a réplica está atrás, a leitura vai ao primário). Retomada a réplica, o GET
+   com o mesmo LSN volta a ser atendido por ela.
+2. Com uma réplica fora do ar em DB_REPLICAS, as leituras continuam respondendo, pelo primário
+   (e pela outra réplica, quando informada).
+
+O destino de cada leitura é conferido pela métrica db_leituras_roteadas_total de /metrics.
+O processo sai com código 1 se alguma verificação falhar.
+
+Uso:
+    python -m benchmarks.replicas --replica 127.0.0.1:5433 --replica-fora-do-ar 127.0.0.1:5499
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+import asyncpg
+import httpx
+
+from shared.database import DB_NAME, DB_PASSWORD, DB_USER
+
+
+METRICA_LEITURAS = re.compile(r'^db_leituras_roteadas_total\{destino="(\w+)"\} (\S+)$', re.M)
+
+@contextmanager
+def servidor(porta: int, replicas: str):
+    ambiente = {**os.environ, 'DB_REPLICAS': replicas, 'DB_REPLICA_ESPERA_APOS_FALHA_S': '60'}
+    processo = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(porta),
+                                 '--log-level', 'error'], env=ambiente)
+    try:
+        yield f'http://127.0.0.1:{porta}'
+    finally:
+        processo.terminate()
+        processo.wait()
+
+async def aguardar_servidor(cliente: httpx.AsyncClient) -> None:
+    for _ in range(100):
+        try:
+            await cliente.get('/')
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError('o servidor não respondeu')
+
+async def leituras_por_destino(cliente: httpx.AsyncClient) -> dict:
+    texto = (await cliente.get('/metrics')).text
+    return {destino: float(valor) for destino, valor in METRICA_LEITURAS.findall(texto)}
+
+async def destino_da_leitura(cliente: httpx.AsyncClient, caminho: str, **kw):
+    """Faz o GET e retorna (status, destino contado em db_leituras_roteadas_total)."""
+    antes = await leituras_por_destino(cliente)
+    resposta = await cliente.get(caminho, **kw)
+    depois = await leituras_por_destino(cliente)
+    destinos = [destino for destino, valor in depois.items() if valor > antes.get(destino, 0)]
+    
+    return resposta.status_code, destinos[0] if len(destinos) == 1 else destinos
+
+async def conectar(endereco: str):
+    host, porta = endereco.rsplit(':', 1)
+    return await asyncpg.connect(host=host, port=int(porta), user=DB_USER, password=DB_PASSWORD, database=DB_NAME)
+
+async def aguardar_replica_alcancar(replica, lsn: str, limite_s: float = 30) -> None:
+    fim = time.monotonic() + limite_s
+    while not await replica.fetchval('SELECT pg_last_wal_replay_lsn() >= $1::text::pg_lsn', lsn):
+        if time.monotonic() > fim:
+            raise RuntimeError(f'a réplica não chegou a {lsn}')
+        await asyncio.sleep(0.05)
+
+async def verificar_leitura_das_escritas(args) -> dict:
+    replica = await conectar(args.replica)
+    conta = {'desc': 'teste replica', 'valor': '10.00', 'tipo': 'pagar',
+             'data_previsao': f'2099-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}'}
+    
+    with servidor(args.porta, args.replica) as url:
+        async with httpx.AsyncClient(base_url=url, timeout=30) as cliente:
+            await aguardar_servidor(cliente)
+            await replica.execute('SELECT pg_wal_replay_pause()')
+            try:
+                escrita = await cliente.post('/contas-pagar-receber', json=conta)
+                escrita.raise_for_status()
+                caminho = f"/contas-pagar-receber/{escrita.json()['id']}"
+                lsn = escrita.headers['x-lsn-escrita']
+                
+                cookie_da_escrita = escrita.cookies
+                cliente.cookies.clear()
+                
+                sem_lsn = await destino_da_leitura(cliente, caminho)
+                com_lsn = await destino_da_leitura(cliente, caminho, headers={'X-LSN-Escrita': lsn})
+                com_cookie = await destino_da_leitura(cliente, caminho, cookies=cookie_da_escrita)
+            finally:
+                await replica.execute('SELECT pg_wal_replay_resume()')
+            
+            await aguardar_replica_alcancar(replica, lsn)
+            apos_retomar = await destino_da_leitura(cliente, caminho, headers={'X-LSN-Escrita': lsn})
+            (await cliente.delete(caminho)).raise_for_status()
+    
+    await replica.close()
+    resultado = {
+        'lsn_da_escrita': lsn,
+        'replica_pausada_sem_lsn': sem_lsn,
+        'replica_pausada_com_cabecalho_lsn': com_lsn,
+        'replica_pausada_com_cookie_lsn': com_cookie,
+        'replica_em_dia_com_cabecalho_lsn': apos_retomar,
+    }
+    resultado['ok'] = (sem_lsn == (404, 'replica') and com_lsn == (200, 'primario_atraso')
+                       and com_cookie == (200, 'primario_atraso') and apos_retomar == (200, 'replica'))
+    return resultado
+
+async def verificar_replica_fora_do_ar(args) -> dict:
+    replicas = ','.join([args.replica_fora_do_ar] + ([args.replica] if args.replica else []))
+    esperado = 'replica' if args.replica else 'primario_falha'
+    
+    with servidor(args.porta + 1, replicas) as url:
+        async with httpx.AsyncClient(base_url=url, timeout=30) as cliente:
+            await aguardar_servidor(cliente)
+            leituras = []
+            for _ in range(4):
+                inicio = time.perf_counter()
+                status, destino = await destino_da_leitura(cliente, '/fornecedor-cliente/1')
+                leituras.append({'status': status, 'destino': destino,
+                                 'duracao_ms': round((time.perf_counter() - inicio) * 1000, 1)})
+    
+    return {
+        'replicas': replicas,
+        'leituras': leituras,
+        'ok': all(leitura['status'] == 200 and leitura['destino'] == esperado for leitura in leituras),
+    }
+
+async def verificar(args) -> dict:
+    resultado = {}
+    if args.replica:
+        resultado['leitura_das_proprias_escritas'] = await verificar_leitura_das_escritas(args)
+    resultado['replica_fora_do_ar'] = await verificar_replica_fora_do_ar(args)
+    return resultado
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--replica', help='host:porta de uma réplica em streaming do primário de DB_HOST/DB_PORT')
+    parser.add_argument('--replica-fora-do-ar', default='127.0.0.1:1', help='host:porta onde não há PostgreSQL')
+    parser.add_argument('--porta', type=int, default=8767)
+    args = parser.parse_args()
+    
+    resultado = asyncio.run(verificar(args))
+    print(json.dumps(resultado, indent=2))
+    raise SystemExit(0 if all(etapa['ok'] for etapa in resultado.values()) else 1)
+
+if __name__ == '__main__':
+    main_cli()
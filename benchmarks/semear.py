@@ -0,0 +1,121 @@
+"""Popula a base local com um volume configurável de fornecedores e contas para os benchmarks.
+
+Os dados são gerados no próprio PostgreSQL (generate_series + random() com setseed), então a
+mesma semente, os mesmos volumes e o mesmo tamanho de lote produzem sempre a mesma base. Os contadores mensais e o
+resumo mensal são recalculados no final, e as tabelas são analisadas.
+
+ATENÇÃO: apaga todas as contas e fornecedores existentes.
+
+Uso:
+    python -m benchmarks.semear --fornecedores 10000 --contas 5000000 --ano-inicial 2021 --anos 5
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from sqlalchemy import text
+
+from routers.contas_pagar_receber_router import reconstruir_resumo_contas_mes
+from shared.database import AsyncSessionLocal, async_engine
+from shared.particoes import garantir_particoes_contas
+
+
+INSERIR_FORNECEDORES = text("""
+    INSERT INTO tbl_fornecedor_cliente (nome)
+    SELECT 'Fornecedor ' || g FROM generate_series(1, CAST(:fornecedores AS integer)) AS g
+""")
+
+# Cerca de 30% das contas já baixadas; uma em cada vinte sem fornecedor.
+INSERIR_CONTAS = text("""
+    INSERT INTO tbl_contas (id, "desc", valor, tipo, data_previsao, data_baixa, valor_baixa,
+                            esta_baixada, id_fornecedor_cliente)
+    SELECT g,
+           'conta ' || g,
+           valor,
+           CASE WHEN r_tipo < 0.5 THEN 'pagar' ELSE 'receber' END,
+           data_previsao,
+           CASE WHEN baixada THEN data_previsao END,
+           CASE WHEN baixada THEN valor END,
+           baixada,
+           CASE WHEN sem_fornecedor THEN NULL ELSE 1 + floor(r_fornecedor * CAST(:fornecedores AS integer))::int END
+    FROM (
+        SELECT g,
+               round((1 + random() * 9999)::numeric, 2) AS valor,
+               random() AS r_tipo,
+               make_date(CAST(:ano_inicial AS integer), 1, 1) + floor(random() * CAST(:dias AS integer))::int AS data_previsao,
+               random() < 0.3 AS baixada,
+               random() < 0.05 AS sem_fornecedor,
+               random() AS r_fornecedor
+        FROM generate_series(CAST(:primeiro AS integer), CAST(:ultimo AS integer)) AS g
+    ) AS gerado
+""")
+
+RECALCULAR_CONTADOR = text("""
+    INSERT INTO tbl_contador_contas_mes (ano, mes, qtd)
+    SELECT extract(year FROM data_previsao), extract(month FROM data_previsao), count(*)
+    FROM tbl_contas
+    GROUP BY 1, 2
+""")
+
+
+def semente_do_lote(semente: float, numero_lote: int) -> float:
+    # setseed aceita valores em [-1, 1]
+    return (semente + numero_lote * 0.0001) % 2 - 1
+
+
+async def semear(args) -> dict:
+    inicio = time.perf_counter()
+    dias = (args.anos * 365) + (args.anos // 4)
+    
+    async with AsyncSessionLocal() as db:
+        await db.execute(text('TRUNCATE tbl_contas, tbl_fornecedor_cliente, tbl_contador_contas_mes, '
+                              'tbl_resumo_contas_mes, tbl_versao_dados RESTART IDENTITY'))
+        await db.execute(INSERIR_FORNECEDORES, {'fornecedores': args.fornecedores})
+        # uma partição por ano semeado, para que nada caia na partição padrão
+        await garantir_particoes_contas(db, args.ano_inicial, args.ano_inicial + args.anos)
+        await db.commit()
+        
+        for numero_lote, primeiro in enumerate(range(1, args.contas + 1, args.lote)):
+            ultimo = min(primeiro + args.lote - 1, args.contas)
+            # a semente vale para a conexão, que pode mudar entre transações; por isso é fixada em cada lote
+            await db.execute(text('SELECT setseed(:semente)'), {'semente': semente_do_lote(args.semente, numero_lote)})
+            await db.execute(INSERIR_CONTAS, {'fornecedores': args.fornecedores, 'ano_inicial': args.ano_inicial,
+                                              'dias': dias, 'primeiro': primeiro, 'ultimo': ultimo})
+            await db.commit()
+            print(f'{ultimo}/{args.contas} contas', flush=True)
+        
+        await db.execute(text("SELECT setval(pg_get_serial_sequence('tbl_contas', 'id'), "
+                              "(SELECT coalesce(max(id), 0) + 1 FROM tbl_contas), false)"))
+        await db.execute(RECALCULAR_CONTADOR)
+        await db.commit()
+        
+        await reconstruir_resumo_contas_mes(db)
+    
+    async with async_engine.connect() as conexao:
+        conexao = await conexao.execution_options(isolation_level='AUTOCOMMIT')
+        await conexao.execute(text('ANALYZE tbl_fornecedor_cliente, tbl_contas, tbl_contador_contas_mes, tbl_resumo_contas_mes'))
+    
+    return {
+        'fornecedores': args.fornecedores,
+        'contas': args.contas,
+        'ano_inicial': args.ano_inicial,
+        'anos': args.anos,
+        'semente': args.semente,
+        'duracao_s': round(time.perf_counter() - inicio, 1),
+    }
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fornecedores', type=int, default=10000)
+    parser.add_argument('--contas', type=int, default=100000)
+    parser.add_argument('--ano-inicial', type=int, default=2021)
+    parser.add_argument('--anos', type=int, default=5)
+    parser.add_argument('--semente', type=float, default=0.42)
+    parser.add_argument('--lote', type=int, default=500000, help='contas inseridas por transação')
+    
+    print(json.dumps(asyncio.run(semear(parser.parse_args())), indent=2))
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,122 @@
+"""Confere que o caminho rápido de serialização das listagens produz exatamente os mesmos bytes
+do caminho padrão (response_model + JSONResponse) e mede o tempo de cada um.
+
+Não usa banco: as contas são montadas em memória, com valores que exercitam Decimal com e sem
+casas decimais, valores muito pequenos/grandes, datas nulas, texto não ASCII e contas sem fornecedor.
+Sai com código 1 se algum byte divergir.
+
+Uso:
+    python -m benchmarks.serializacao --contas 1000 --repeticoes 50
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+
+from models.contas_pagar_receber_model import ContaPagarReceber
+from models.fornecedor_cliente_model import FornecedorCliente
+from routers import contas_pagar_receber_router, fornecedor_cliente_router
+import shared.admissao as admissao
+from shared.serializacao import codificar_json
+
+
+VALORES = [Decimal('100'), Decimal('100.00'), Decimal('19.90'), Decimal('0.01'), Decimal('0.00001'),
+           Decimal('1234567.891'), Decimal('12345678901234567'), Decimal('1E+3')]
+
+def gerar_linhas(qtd: int) -> list:
+    linhas = []
+    for i in range(qtd):
+        baixada = i % 3 == 0
+        linhas.append({
+            'id': i + 1,
+            'desc': f'conta {i} ç ã 😀' if i % 7 == 0 else f'conta {i}',
+            'valor': VALORES[i % len(VALORES)],
+            'tipo': 'pagar' if i % 2 else 'receber',
+            'data_previsao': date(2024, 1, 1) + timedelta(days=i % 365),
+            'data_baixa': date(2024, 6, 1) if baixada else None,
+            'valor_baixa': VALORES[(i + 1) % len(VALORES)] if baixada else None,
+            'esta_baixada': baixada if i % 11 else None,
+            'id_fornecedor_cliente': None if i % 5 == 0 else i % 50 + 1,
+            'fornecedor_nome': None if i % 5 == 0 else f'Fornecedor {i % 50 + 1} "aspas"',
+        })
+    return linhas
+
+def conta_orm(linha: dict) -> ContaPagarReceber:
+    campos = {campo: valor for campo, valor in linha.items() if campo != 'fornecedor_nome'}
+    conta = ContaPagarReceber(**campos)
+    if linha['id_fornecedor_cliente'] is not None:
+        conta.fornecedor_cliente = FornecedorCliente(id=linha['id_fornecedor_cliente'], nome=linha['fornecedor_nome'])
+    return conta
+
+def campo_resposta(router, endpoint):
+    return next(rota for rota in router.routes if rota.endpoint is endpoint).secure_cloned_response_field
+
+async def padrao(campo, conteudo) -> bytes:
+    return JSONResponse(await serialize_response(field=campo, response_content=conteudo)).body
+
+async def medir(funcao, repeticoes: int) -> dict:
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        await funcao()
+        tempos.append(time.perf_counter() - inicio)
+    
+    quantis = statistics.quantiles(tempos, n=100)
+    return {'p50_ms': round(quantis[49] * 1000, 3), 'p95_ms': round(quantis[94] * 1000, 3)}
+
+
+async def executar(args) -> dict:
+    # nada passa pelo app ASGI hoje, mas uma recusa do controle de admissão não pode entrar na medição
+    admissao.ADMISSAO_ATIVA = False
+    linhas = gerar_linhas(args.contas)
+    contas = [conta_orm(linha) for linha in linhas]
+    fornecedores = [FornecedorCliente(id=i, nome=f'Fornecedor {i} ç') for i in range(1, args.contas + 1)]
+    
+    campo_contas = campo_resposta(contas_pagar_receber_router.router, contas_pagar_receber_router.listar_contas)
+    campo_fornecedores = campo_resposta(fornecedor_cliente_router.router, fornecedor_cliente_router.listar_fornecedor_cliente)
+    
+    casos = {
+        'listar_contas': (
+            lambda: padrao(campo_contas, contas),
+            lambda: codificar_json([contas_pagar_receber_router.conta_response_de_linha(linha) for linha in linhas]),
+        ),
+        'listar_fornecedor_cliente': (
+            lambda: padrao(campo_fornecedores, fornecedores),
+            lambda: codificar_json([{'id': f.id, 'nome': f.nome} for f in fornecedores]),
+        ),
+    }
+    
+    resultado = {}
+    for nome, (caminho_padrao, caminho_rapido) in casos.items():
+        async def rapido():
+            return caminho_rapido()
+        
+        resultado[nome] = {
+            'bytes_identicos': await caminho_padrao() == await rapido(),
+            'padrao': await medir(caminho_padrao, args.repeticoes),
+            'rapido': await medir(rapido, args.repeticoes),
+        }
+    
+    return resultado
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--contas', type=int, default=1000)
+    parser.add_argument('--repeticoes', type=int, default=50)
+    
+    resultado = asyncio.run(executar(parser.parse_args()))
+    print(json.dumps(resultado, indent=2))
+    
+    if not all(caso['bytes_identicos'] for caso in resultado.values()):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,149 @@
+"""Compara o servidor de produção (gunicorn + workers uvicorn com uvloop/httptools, gunicorn.conf.py)
+com um único processo uvicorn padrão: tempo até a primeira resposta, vazão e latência por HTTP
+com vários processos clientes, e se o SIGTERM espera as requisições em andamento terminarem.
+
+Cada modo sobe o servidor numa porta local, espera o GET / responder, gera carga por --duracao
+segundos em --caminho e, por fim, dispara --requisicoes-drenagem exportações simultâneas e envia
+SIGTERM logo em seguida: todas precisam terminar com 200 e completas.
+
+Uso:
+    python -m benchmarks.servidor --workers 4 --clientes 4 --concorrencia 64 --duracao 15
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+CAMINHO_DRENAGEM = '/contas-pagar-receber/export?formato=csv&data_previsao_inicio=2024-01-01&data_previsao_fim=2024-01-31'
+
+def comando_servidor(modo: str, porta: int, workers: int) -> list:
+    if modo == 'gunicorn':
+        return [sys.executable, '-m', 'gunicorn', 'main:app', '--bind', f'127.0.0.1:{porta}', '--workers', str(workers)]
+    return [sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(porta), '--log-level', 'warning']
+
+async def aguardar_servidor(url: str, limite_s: float = 60) -> float:
+    inicio = time.perf_counter()
+    async with httpx.AsyncClient() as cliente:
+        while time.perf_counter() - inicio < limite_s:
+            try:
+                if (await cliente.get(url + '/')).status_code == 200:
+                    return time.perf_counter() - inicio
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.02)
+    raise RuntimeError('o servidor não respondeu')
+
+async def gerar_carga(url: str, caminho: str, concorrencia: int, duracao: float) -> dict:
+    latencias, erros = [], 0
+    fim = time.perf_counter() + duracao
+    limites = httpx.Limits(max_connections=concorrencia, max_keepalive_connections=concorrencia)
+    
+    async with httpx.AsyncClient(base_url=url, limits=limites, timeout=30) as cliente:
+        async def usuario():
+            nonlocal erros
+            while time.perf_counter() < fim:
+                inicio = time.perf_counter()
+                try:
+                    resposta = await cliente.get(caminho)
+                    resposta.raise_for_status()
+                    latencias.append(time.perf_counter() - inicio)
+                except httpx.HTTPError:
+                    erros += 1
+        
+        await asyncio.gather(*(usuario() for _ in range(concorrencia)))
+    
+    return {'latencias': latencias, 'erros': erros}
+
+def processo_cliente(argumentos) -> dict:
+    return asyncio.run(gerar_carga(*argumentos))
+
+async def aquecer(url: str, caminho: str) -> None:
+    """Abre as conexões dos pools dos workers antes da medição."""
+    async with httpx.AsyncClient(base_url=url) as cliente:
+        await asyncio.gather(*(cliente.get(caminho) for _ in range(50)))
+
+def medir_vazao(url: str, args) -> dict:
+    concorrencia_por_cliente = max(1, args.concorrencia // args.clientes)
+    with multiprocessing.Pool(args.clientes) as pool:
+        resultados = pool.map(processo_cliente, [(url, args.caminho, concorrencia_por_cliente, args.duracao)] * args.clientes)
+    
+    latencias = sorted(latencia for resultado in resultados for latencia in resultado['latencias'])
+    percentil = lambda p: round(latencias[min(len(latencias) - 1, int(len(latencias) * p))] * 1000, 2)
+    return {
+        'requisicoes': len(latencias),
+        'erros': sum(resultado['erros'] for resultado in resultados),
+        'vazao_rps': round(len(latencias) / args.duracao, 1),
+        'p50_ms': percentil(0.50),
+        'p99_ms': percentil(0.99),
+        'media_ms': round(statistics.fmean(latencias) * 1000, 2),
+    }
+
+async def verificar_drenagem(url: str, servidor: subprocess.Popen, quantidade: int) -> dict:
+    async with httpx.AsyncClient(base_url=url, timeout=60) as cliente:
+        requisicoes = [asyncio.ensure_future(cliente.get(CAMINHO_DRENAGEM)) for _ in range(quantidade)]
+        await asyncio.sleep(0.2)
+        servidor.send_signal(signal.SIGTERM)
+        respostas = await asyncio.gather(*requisicoes, return_exceptions=True)
+    
+    completas = [resposta for resposta in respostas
+                 if isinstance(resposta, httpx.Response) and resposta.status_code == 200]
+    tamanhos = {len(resposta.content) for resposta in completas}
+    return {
+        'requisicoes_em_andamento': quantidade,
+        'concluidas_com_200': len(completas),
+        'corpos_identicos': len(tamanhos) == 1,
+        'falhas': [repr(resposta) for resposta in respostas if isinstance(resposta, Exception)][:3],
+    }
+
+def executar_modo(modo: str, args) -> dict:
+    url = f'http://127.0.0.1:{args.porta}'
+    servidor = subprocess.Popen(comando_servidor(modo, args.porta, args.workers), env=os.environ.copy())
+    try:
+        partida_s = asyncio.run(aguardar_servidor(url))
+        asyncio.run(aquecer(url, args.caminho))
+        vazao = medir_vazao(url, args)
+        drenagem = asyncio.run(verificar_drenagem(url, servidor, args.requisicoes_drenagem))
+        servidor.wait(timeout=60)
+    finally:
+        if servidor.poll() is None:
+            servidor.kill()
+            servidor.wait()
+    
+    return {'partida_ate_primeira_resposta_s': round(partida_s, 2), **vazao, 'drenagem_no_sigterm': drenagem,
+            'codigo_saida': servidor.returncode}
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--modos', nargs='+', choices=['uvicorn', 'gunicorn'], default=['uvicorn', 'gunicorn'])
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--clientes', type=int, default=multiprocessing.cpu_count(), help='processos geradores de carga')
+    parser.add_argument('--concorrencia', type=int, default=64, help='requisições simultâneas, somando os clientes')
+    parser.add_argument('--duracao', type=float, default=15)
+    parser.add_argument('--caminho', default='/contas-pagar-receber/1')
+    parser.add_argument('--requisicoes-drenagem', type=int, default=8)
+    parser.add_argument('--porta', type=int, default=8766)
+    args = parser.parse_args()
+    
+    resultado = {
+        'cpus': multiprocessing.cpu_count(),
+        'workers': args.workers,
+        'caminho': args.caminho,
+        'modos': {modo: executar_modo(modo, args) for modo in args.modos},
+    }
+    print(json.dumps(resultado, indent=2))
+    
+    drenagens = [modo['drenagem_no_sigterm'] for modo in resultado['modos'].values()]
+    raise SystemExit(0 if all(d['concluidas_com_200'] == d['requisicoes_em_andamento'] for d in drenagens) else 1)
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,119 @@
+"""Compara a vazão do caminho síncrono antigo (rota `def` + SessionLocal, executada no
+threadpool) com o caminho assíncrono atual (rota `async def` + AsyncSession) em
+GET /contas-pagar-receber/{id}, mantendo N requisições simultâneas em voo.
+
+As requisições são enviadas em processo, direto na aplicação ASGI, então o número medido
+é o da aplicação + banco, sem custo de rede do cliente. O controle de admissão fica desligado,
+para medir a aplicação e não as recusas, e o app síncrono só deixa em andamento tantas
+requisições quantas conexões o pool tem (as demais esperam no event loop).
+
+Uso:
+    python -m benchmarks.sync_vs_async --concorrencia 500 --requisicoes 10000 --id-conta 1
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy.orm import Session, joinedload
+
+import main
+import shared.admissao as admissao
+from models.contas_pagar_receber_model import ContaPagarReceber
+from routers.contas_pagar_receber_router import ContaPagarReceberResponse
+from shared.database import DB_MAX_OVERFLOW, DB_POOL_SIZE
+from shared.dependencies import get_db
+from shared.exceptions import ContaNotFound
+from shared.exceptions_handler import conta_not_found_handler
+
+
+class LimiteRequisicoes:
+    """Middleware ASGI que limita as requisições em andamento. Sem ele, acima das conexões do pool
+    todas as threads do threadpool ficam presas esperando conexão, enquanto as requisições que têm
+    conexão esperam uma thread livre para fechar a sessão (saída de get_db), até o checkout estourar
+    DB_POOL_TIMEOUT."""
+    
+    def __init__(self, app, limite: int):
+        self.app = app
+        self.limite = asyncio.Semaphore(limite)
+    
+    async def __call__(self, scope, receive, send):
+        async with self.limite:
+            await self.app(scope, receive, send)
+
+
+app_sync = FastAPI()
+app_sync.add_middleware(LimiteRequisicoes, limite=DB_POOL_SIZE + DB_MAX_OVERFLOW)
+
+@app_sync.get('/contas-pagar-receber/{id_conta}', response_model=ContaPagarReceberResponse)
+def listar_uma_conta_sync(id_conta: int,
+                    db: Session=Depends(get_db)) -> ContaPagarReceberResponse:
+    conta = db.get(ContaPagarReceber, id_conta,
+                   options=[joinedload(ContaPagarReceber.fornecedor_cliente)])
+    
+    if conta is None:
+        raise ContaNotFound
+    
+    return conta
+
+app_sync.add_exception_handler(ContaNotFound, conta_not_found_handler)
+
+
+async def medir(app, url: str, concorrencia: int, requisicoes: int) -> dict:
+    limite = asyncio.Semaphore(concorrencia)
+    latencias = []
+    erros = 0
+    
+    async with httpx.AsyncClient(app=app, base_url='http://benchmark', timeout=None) as cliente:
+        async def requisitar():
+            nonlocal erros
+            async with limite:
+                inicio = time.perf_counter()
+                resposta = await cliente.get(url)
+                latencias.append(time.perf_counter() - inicio)
+                if resposta.status_code != 200:
+                    erros += 1
+        
+        inicio = time.perf_counter()
+        await asyncio.gather(*(requisitar() for _ in range(requisicoes)))
+        duracao = time.perf_counter() - inicio
+    
+    quantis = statistics.quantiles(latencias, n=100)
+    return {
+        'requisicoes': requisicoes,
+        'concorrencia': concorrencia,
+        'erros': erros,
+        'duracao_s': round(duracao, 3),
+        'vazao_rps': round(requisicoes / duracao, 1),
+        'p50_ms': round(quantis[49] * 1000, 2),
+        'p99_ms': round(quantis[98] * 1000, 2),
+    }
+
+
+async def executar(args) -> dict:
+    admissao.ADMISSAO_ATIVA = False
+    url = f'/contas-pagar-receber/{args.id_conta}'
+    
+    # aquecimento: abre as conexões dos pools antes da medição
+    await medir(app_sync, url, 10, 50)
+    await medir(main.app, url, 10, 50)
+    
+    return {
+        'sync': await medir(app_sync, url, args.concorrencia, args.requisicoes),
+        'async': await medir(main.app, url, args.concorrencia, args.requisicoes),
+    }
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concorrencia', type=int, default=500)
+    parser.add_argument('--requisicoes', type=int, default=10000)
+    parser.add_argument('--id-conta', type=int, default=1)
+    
+    print(json.dumps(asyncio.run(executar(parser.parse_args())), indent=2))
+
+if __name__ == '__main__':
+    main_cli()
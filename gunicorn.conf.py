@@ -0,0 +1,28 @@
+# Configuração de produção, lida automaticamente pelo gunicorn no diretório da aplicação:
+#     gunicorn main:app
+# Em desenvolvimento continue usando `python main.py` (um processo, com reload).
+import multiprocessing
+import os
+
+
+bind = os.getenv('WEB_BIND', '0.0.0.0:80')
+workers = int(os.getenv('WEB_WORKERS', str(multiprocessing.cpu_count())))
+worker_class = 'shared.servidor.WorkerUvicorn'
+# A aplicação é importada uma vez no processo mestre e os workers nascem com ela já carregada
+preload_app = True
+# No SIGTERM cada worker para de aceitar conexões e termina as requisições em andamento;
+# as que passarem de WEB_GRACEFUL_TIMEOUT segundos são interrompidas
+graceful_timeout = int(os.getenv('WEB_GRACEFUL_TIMEOUT', '30'))
+timeout = int(os.getenv('WEB_TIMEOUT', '60'))
+keepalive = int(os.getenv('WEB_KEEPALIVE', '5'))
+accesslog = os.getenv('WEB_ACCESS_LOG') or None
+
+def post_fork(server, worker):
+    # Com preload_app as engines foram criadas no mestre. Conexões herdadas não podem ser usadas
+    # por dois processos: cada worker descarta o pool herdado (sem fechar as conexões, que são
+    # do mestre) e abre as suas.
+    from shared.database import async_engine, async_engines_replicas, engine
+    
+    engine.dispose(close=False)
+    for engine_assincrona in [async_engine, *async_engines_replicas.values()]:
+        engine_assincrona.sync_engine.dispose(close=False)
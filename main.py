@@ -1,30 +1,118 @@
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 
 from routers import contas_pagar_receber_router
+from routers.contas_pagar_receber_router import ARQUIVAMENTO_INTERVALO_S, arquivar_contas_baixadas, data_corte_arquivamento
 from routers import fornecedor_cliente_router
 from routers import fornecedor_cliente_vs_contas_pagar_receber_router
-from shared.exceptions import ContaNotFound, FornecedorNotFound, MonthlyAccountLimitExceededException
-from shared.exceptions_handler import conta_not_found_handler, fornecedor_not_found_handler, monthly_account_limit_exceeded_handler
+from shared.admissao import MiddlewareAdmissao, classe_admissao, estatisticas_admissao
+from shared.compressao import COMPRESSAO_ATIVA, COMPRESSAO_MINIMO_BYTES, COMPRESSAO_NIVEL_GZIP, COMPRESSAO_QUALIDADE_BROTLI, \
+                              MiddlewareCompressao
+from shared.cache import CACHE_INVALIDACAO_NOTIFY, caches, ouvinte_invalidacao
+from shared.database import AsyncSessionLocal, async_engine, async_engines_replicas
+from shared.metricas import MiddlewareMetricas, exportar_prometheus, instrumentar_engine, registrar_metricas_pool
+from shared.particoes import PARTICOES_CRIAR_NA_INICIALIZACAO, garantir_particoes_futuras
+from shared.pool import estatisticas_pool
+from shared.replicas import MiddlewareLeituraDasEscritas
+from shared.tarefas import TarefaPeriodica
+from shared.exceptions import ContaNotFound, FornecedorNotFound, InvalidBulkPayload, InvalidCursor, InvalidFields, InvalidPeriod, \
+                              MonthlyAccountLimitExceededException
+from shared.exceptions_handler import conta_not_found_handler, fornecedor_not_found_handler, invalid_bulk_payload_handler, invalid_cursor_handler, \
+                                       invalid_fields_handler, invalid_period_handler, monthly_account_limit_exceeded_handler
 
 
 app = FastAPI()
+# a primeira adicionada fica mais por dentro: as recusas do controle de admissão entram nas métricas
+app.add_middleware(MiddlewareAdmissao)
+if COMPRESSAO_ATIVA:
+    app.add_middleware(MiddlewareCompressao, minimo_bytes=COMPRESSAO_MINIMO_BYTES, nivel_gzip=COMPRESSAO_NIVEL_GZIP,
+                       qualidade_brotli=COMPRESSAO_QUALIDADE_BROTLI)
+app.add_middleware(MiddlewareMetricas)
+app.add_middleware(MiddlewareLeituraDasEscritas)
+instrumentar_engine(async_engine.sync_engine)
+for engine_replica in async_engines_replicas.values():
+    instrumentar_engine(engine_replica.sync_engine)
+registrar_metricas_pool(async_engine)
 # Base.metadata.drop_all(bind=engine)
 # Base.metadata.create_all(bind=engine)
 
 @app.get('/', tags=['root'])
+@classe_admissao(None)
 def hello_world() -> dict:
     return {'message': 'Hello, World!'}
 
+@app.get('/saude/pool', tags=['monitoramento'])
+@classe_admissao(None)
+def saude_pool() -> dict:
+    return estatisticas_pool(async_engine)
+
+@app.get('/saude/cache', tags=['monitoramento'])
+@classe_admissao(None)
+def saude_cache() -> dict:
+    return {nome: cache.estatisticas() for nome, cache in caches.items()}
+
+@app.get('/saude/admissao', tags=['monitoramento'])
+@classe_admissao(None)
+def saude_admissao() -> dict:
+    return estatisticas_admissao()
+
+@app.get('/metrics', tags=['monitoramento'], include_in_schema=False)
+@classe_admissao(None)
+def metricas() -> Response:
+    return Response(exportar_prometheus(), media_type='text/plain; version=0.0.4')
+
+@app.on_event('startup')
+async def iniciar_ouvinte_invalidacao():
+    if CACHE_INVALIDACAO_NOTIFY:
+        await ouvinte_invalidacao.iniciar()
+
+@app.on_event('startup')
+async def criar_particoes_futuras():
+    if PARTICOES_CRIAR_NA_INICIALIZACAO:
+        async with AsyncSessionLocal() as db:
+            await garantir_particoes_futuras(db)
+            await db.commit()
+
+async def arquivar_contas_antigas():
+    async with AsyncSessionLocal() as db:
+        await arquivar_contas_baixadas(db, data_corte_arquivamento())
+
+arquivamento_periodico = TarefaPeriodica('arquivamento', ARQUIVAMENTO_INTERVALO_S, arquivar_contas_antigas)
+
+@app.on_event('startup')
+async def iniciar_arquivamento_periodico():
+    # cada worker agenda o seu; a trava em arquivar_lote_contas deixa só um arquivando por vez
+    if ARQUIVAMENTO_INTERVALO_S > 0:
+        arquivamento_periodico.iniciar()
+
+@app.on_event('shutdown')
+async def parar_arquivamento_periodico():
+    await arquivamento_periodico.parar()
+
+@app.on_event('shutdown')
+async def parar_ouvinte_invalidacao():
+    await ouvinte_invalidacao.parar()
+
+@app.on_event('shutdown')
+async def fechar_pool():
+    await async_engine.dispose()
+    for engine_replica in async_engines_replicas.values():
+        await engine_replica.dispose()
+
 # Routers
 app.include_router(contas_pagar_receber_router.router, tags=['contas'])
-app.include_router(fornecedor_cliente_router.router, tags=['fornecedores'])
+# antes do router de fornecedores: /fornecedor-cliente/resumo precisa casar antes de /fornecedor-cliente/{id}
 app.include_router(fornecedor_cliente_vs_contas_pagar_receber_router.router, tags=['fornecedores'])
+app.include_router(fornecedor_cliente_router.router, tags=['fornecedores'])
 
 # Exceptions
 app.add_exception_handler(ContaNotFound, conta_not_found_handler)
 app.add_exception_handler(FornecedorNotFound, fornecedor_not_found_handler)
 app.add_exception_handler(MonthlyAccountLimitExceededException, monthly_account_limit_exceeded_handler)
+app.add_exception_handler(InvalidBulkPayload, invalid_bulk_payload_handler)
+app.add_exception_handler(InvalidCursor, invalid_cursor_handler)
+app.add_exception_handler(InvalidFields, invalid_fields_handler)
+app.add_exception_handler(InvalidPeriod, invalid_period_handler)
 
 if __name__ == '__main__':
     uvicorn.run('main:app', host='0.0.0.0', port=8001, reload=True)
\ No newline at end of file
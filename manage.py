@@ -0,0 +1,86 @@
+import argparse
+import asyncio
+from datetime import date
+
+from shared.database import AsyncSessionLocal
+from shared.particoes import PARTICOES_ANOS_A_FRENTE, desanexar_particao_contas, garantir_particoes_contas
+from routers.contas_pagar_receber_router import ARQUIVAMENTO_PAUSA_S, ARQUIVAMENTO_TAMANHO_LOTE, arquivar_contas_baixadas, \
+                                               data_corte_arquivamento, reconstruir_resumo_contas_mes, verificar_resumo_contas_mes
+
+
+async def verificar_resumo(args) -> int:
+    async with AsyncSessionLocal() as db:
+        divergencias = await verificar_resumo_contas_mes(db)
+    
+    for ano, mes, tipo in divergencias:
+        print(f'Divergência no resumo: ano={ano} mes={mes} tipo={tipo}')
+    
+    return 1 if divergencias else 0
+
+async def reconstruir_resumo(args) -> int:
+    async with AsyncSessionLocal() as db:
+        await reconstruir_resumo_contas_mes(db)
+    
+    print('Resumo mensal de contas reconstruído.')
+    return 0
+
+async def criar_particoes(args) -> int:
+    ano_inicial = args.ano_inicial or date.today().year
+    ano_final = args.ano_final or date.today().year + PARTICOES_ANOS_A_FRENTE
+    async with AsyncSessionLocal() as db:
+        criados = await garantir_particoes_contas(db, ano_inicial, ano_final)
+        await db.commit()
+    
+    for ano in criados:
+        print(f'Partição criada: {ano}')
+    print(f'Partições de {ano_inicial} a {ano_final} presentes.')
+    return 0
+
+async def desanexar_particao(args) -> int:
+    async with AsyncSessionLocal() as db:
+        particao = await desanexar_particao_contas(db, args.ano)
+        await db.commit()
+        # as contas do ano saíram de tbl_contas: o resumo mensal precisa refletir isso
+        await reconstruir_resumo_contas_mes(db)
+    
+    print(f'Partição {particao} desanexada; a tabela pode ser arquivada e removida.')
+    return 0
+
+async def arquivar_contas(args) -> int:
+    corte = args.corte or data_corte_arquivamento()
+    async with AsyncSessionLocal() as db:
+        total = await arquivar_contas_baixadas(db, corte, args.tamanho_lote, args.pausa, args.max_lotes)
+    
+    print(f'{total} contas baixadas com data_previsao anterior a {corte} arquivadas.')
+    return 0
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Comandos de manutenção da base de contas')
+    comandos = parser.add_subparsers(dest='comando')
+    comandos.required = True
+    
+    comandos.add_parser('verificar-resumo', help='Compara tbl_resumo_contas_mes com tbl_contas') \
+            .set_defaults(executar=verificar_resumo)
+    comandos.add_parser('reconstruir-resumo', help='Recalcula tbl_resumo_contas_mes a partir de tbl_contas') \
+            .set_defaults(executar=reconstruir_resumo)
+    
+    criar = comandos.add_parser('criar-particoes', help='Cria as partições anuais de tbl_contas que faltam')
+    criar.add_argument('--ano-inicial', type=int, help='padrão: ano corrente')
+    criar.add_argument('--ano-final', type=int, help='padrão: ano corrente + PARTICOES_ANOS_A_FRENTE')
+    criar.set_defaults(executar=criar_particoes)
+    desanexar = comandos.add_parser('desanexar-particao', help='Desanexa de tbl_contas a partição de um ano, para arquivamento')
+    desanexar.add_argument('--ano', type=int, required=True)
+    desanexar.set_defaults(executar=desanexar_particao)
+    
+    arquivar = comandos.add_parser('arquivar-contas', help='Move para tbl_contas_arquivo as contas baixadas antigas, em lotes')
+    arquivar.add_argument('--corte', type=date.fromisoformat, help='padrão: hoje - ARQUIVAMENTO_IDADE_DIAS')
+    arquivar.add_argument('--tamanho-lote', type=int, default=ARQUIVAMENTO_TAMANHO_LOTE)
+    arquivar.add_argument('--pausa', type=float, default=ARQUIVAMENTO_PAUSA_S, help='segundos entre os lotes')
+    arquivar.add_argument('--max-lotes', type=int, help='para depois desse número de lotes; padrão: até acabar')
+    arquivar.set_defaults(executar=arquivar_contas)
+    
+    args = parser.parse_args()
+    return asyncio.run(args.executar(args))
+
+if __name__ == '__main__':
+    raise SystemExit(main())
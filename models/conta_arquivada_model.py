@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, Numeric, String, ForeignKey, Date, Boolean, DateTime, Index, func
+from shared.database import Base
+
+# Contas baixadas movidas de tbl_contas pelo arquivamento (arquivar_contas_baixadas), com as mesmas
+# colunas; listagens e relatórios só as leem com incluir_arquivadas=true
+class ContaArquivada(Base):
+    __tablename__ = 'tbl_contas_arquivo'
+    __table_args__ = (
+        Index('ix_tbl_contas_arquivo_data_previsao_id', 'data_previsao', 'id'),
+        Index('ix_tbl_contas_arquivo_id_fornecedor_cliente_data_previsao', 'id_fornecedor_cliente', 'data_previsao'),
+        Index('ix_tbl_contas_arquivo_tipo_data_previsao', 'tipo', 'data_previsao', 'id'),
+        Index('ix_tbl_contas_arquivo_valor_id', 'valor', 'id'),
+        Index('ix_tbl_contas_arquivo_data_baixa', 'data_baixa'),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    desc = Column(String(30))
+    valor = Column(Numeric)
+    tipo = Column(String(30))
+    data_previsao = Column(Date(), nullable=False)
+    data_baixa = Column(Date())
+    valor_baixa = Column(Numeric)
+    esta_baixada = Column(Boolean)
+    arquivada_em = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    
+    id_fornecedor_cliente = Column(Integer, ForeignKey('tbl_fornecedor_cliente.id'))
@@ -0,0 +1,9 @@
+from sqlalchemy import Column, Integer
+from shared.database import Base
+
+class ContadorContasMes(Base):
+    __tablename__ = 'tbl_contador_contas_mes'
+    
+    ano = Column(Integer, primary_key=True)
+    mes = Column(Integer, primary_key=True)
+    qtd = Column(Integer, nullable=False, default=0)
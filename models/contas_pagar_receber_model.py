@@ -1,19 +1,39 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, Numeric, String, ForeignKey, Date, Boolean
+from sqlalchemy import Column, Integer, Numeric, String, ForeignKey, Date, Boolean, Index, text
 from sqlalchemy.orm import relationship
 from shared.database import Base
 
 class ContaPagarReceber(Base):
     __tablename__ = 'tbl_contas'
+    __table_args__ = (
+        Index('ix_tbl_contas_data_previsao_id', 'data_previsao', 'id'),
+        # cobre os totais do resumo por fornecedor (index-only scan)
+        Index('ix_tbl_contas_id_fornecedor_cliente_cobertura', 'id_fornecedor_cliente', 'data_previsao',
+              postgresql_include=['tipo', 'esta_baixada', 'valor', 'valor_baixa']),
+        Index('ix_tbl_contas_tipo_data_previsao', 'tipo', 'data_previsao', 'id'),
+        Index('ix_tbl_contas_valor_id', 'valor', 'id'),
+        Index('ix_tbl_contas_abertas_data_previsao', 'data_previsao', 'id',
+              postgresql_where=text('esta_baixada IS NOT TRUE')),
+        Index('ix_tbl_contas_baixadas_data_baixa', 'data_baixa',
+              postgresql_where=text('esta_baixada IS TRUE')),
+        # busca por trechos da descrição (pg_trgm)
+        Index('ix_tbl_contas_desc_trgm', 'desc', postgresql_using='gin', postgresql_ops={'desc': 'gin_trgm_ops'}),
+        # partições anuais (tbl_contas_2024, ..., tbl_contas_padrao) são mantidas por shared/particoes.py
+        {'postgresql_partition_by': 'RANGE (data_previsao)'},
+    )
     
+    # No banco a chave primária é (id, data_previsao), como exige o particionamento; para o ORM
+    # a identidade da conta continua sendo só o id.
     id = Column(Integer, primary_key=True, autoincrement=True)
     desc = Column(String(30))
     valor = Column(Numeric)
     tipo = Column(String(30))
-    data_previsao = Column(Date(), nullable=False)
+    data_previsao = Column(Date(), primary_key=True)
     data_baixa = Column(Date())
     valor_baixa = Column(Numeric)
     esta_baixada = Column(Boolean, default=False)
     
     id_fornecedor_cliente = Column(Integer, ForeignKey('tbl_fornecedor_cliente.id'))
-    fornecedor_cliente = relationship('FornecedorCliente')
\ No newline at end of file
+    fornecedor_cliente = relationship('FornecedorCliente')
+    
+    __mapper_args__ = {'primary_key': [id]}
\ No newline at end of file
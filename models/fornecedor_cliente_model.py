@@ -1,7 +1,12 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Index, Integer, String
 from shared.database import Base
 
 class FornecedorCliente(Base):
     __tablename__ = 'tbl_fornecedor_cliente'
+    __table_args__ = (
+        # busca por trechos do nome (pg_trgm)
+        Index('ix_tbl_fornecedor_cliente_nome_trgm', 'nome', postgresql_using='gin', postgresql_ops={'nome': 'gin_trgm_ops'}),
+    )
+    
     id = Column(Integer, primary_key=True, autoincrement=True)
     nome = Column(String(255))
\ No newline at end of file
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, Numeric, String
+from shared.database import Base
+
+class ResumoContasMes(Base):
+    __tablename__ = 'tbl_resumo_contas_mes'
+    
+    ano = Column(Integer, primary_key=True)
+    mes = Column(Integer, primary_key=True)
+    tipo = Column(String(30), primary_key=True)
+    qtd = Column(Integer, nullable=False, default=0)
+    valor_total = Column(Numeric, nullable=False, default=0)
+    valor_baixado = Column(Numeric, nullable=False, default=0)
@@ -0,0 +1,8 @@
+from sqlalchemy import BigInteger, Column, String
+from shared.database import Base
+
+class VersaoDados(Base):
+    __tablename__ = 'tbl_versao_dados'
+    
+    chave = Column(String(100), primary_key=True)
+    versao = Column(BigInteger, nullable=False, default=0)
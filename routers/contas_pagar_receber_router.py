@@ -1,21 +1,65 @@
+import asyncio
+import csv
+import io
+import json
+import logging
+import os
+from collections import defaultdict
 from decimal import Decimal
 from enum import Enum
-from typing import List, Optional
-from datetime import date
+from typing import Any, List, Optional, Tuple
+from datetime import date, timedelta
 
-from fastapi import APIRouter, Depends
-from pydantic import BaseModel, Field
-from sqlalchemy import extract
-from sqlalchemy.orm import Session
+import anyio
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ValidationError, root_validator
+from sqlalchemy import Boolean, Date, DateTime, Integer, Interval, Numeric, String, bindparam, case, cast, delete, extract, func, inspect, \
+                       literal, or_, select, text, tuple_, union_all, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, joinedload
 
-from shared.dependencies import get_db
+from shared.busca import LIMITE_MAXIMO_BUSCA, LIMITE_PADRAO_BUSCA, TAMANHO_MINIMO_BUSCA, buscar_por_similaridade
+from shared.admissao import classe_admissao
+from shared.dependencies import get_async_db
 from models.contas_pagar_receber_model import ContaPagarReceber
+from models.conta_arquivada_model import ContaArquivada
 from models.fornecedor_cliente_model import FornecedorCliente
+from models.resumo_contas_mes_model import ResumoContasMes
+from models.contador_contas_mes_model import ContadorContasMes
 from routers.fornecedor_cliente_router import FornecedorClienteResponse
-from shared.exceptions import ContaNotFound, FornecedorNotFound, MonthlyAccountLimitExceededException
+from shared.serializacao import SERIALIZACAO_RAPIDA_ATIVA, RespostaJSONRapida, codificar_json
+from shared.versoes import TABELA_CONTAS, TABELA_FORNECEDORES, cabecalhos_cache, chave_previsao, etag_das_versoes, \
+                            registrar_alteracao, resposta_se_nao_modificado
+from shared.exceptions import ContaNotFound, FornecedorNotFound, InvalidBulkPayload, InvalidCursor, InvalidFields, InvalidPeriod, \
+                              MonthlyAccountLimitExceededException
 
 
 QTD_PERMITIDA_MES = 5
+LIMITE_PADRAO_LISTAGEM = 100
+LIMITE_MAXIMO_LISTAGEM = 1000
+TAMANHO_LOTE_STREAMING = 1000
+COLUNAS_EXPORTACAO_CSV = ['id', 'desc', 'valor', 'tipo', 'data_previsao', 'data_baixa', 'valor_baixa', 'esta_baixada',
+                          'id_fornecedor_cliente', 'fornecedor_nome']
+# Quando ativo, tbl_resumo_contas_mes é mantida a cada escrita e o relatório mensal lê dela.
+# Ao ativar em uma base existente, execute `python manage.py reconstruir-resumo`.
+RESUMO_CONTAS_MES_ATIVO = os.getenv('RESUMO_CONTAS_MES_ATIVO', 'false').lower() == 'true'
+# Contas baixadas com data_previsao anterior a ARQUIVAMENTO_IDADE_DIAS atrás são movidas para
+# tbl_contas_arquivo em lotes de ARQUIVAMENTO_TAMANHO_LOTE, cada um na sua transação, com
+# ARQUIVAMENTO_PAUSA_S entre eles. Com ARQUIVAMENTO_INTERVALO_S > 0 a aplicação arquiva
+# periodicamente; senão use `python manage.py arquivar-contas`.
+ARQUIVAMENTO_IDADE_DIAS = int(os.getenv('ARQUIVAMENTO_IDADE_DIAS', '730'))
+ARQUIVAMENTO_TAMANHO_LOTE = int(os.getenv('ARQUIVAMENTO_TAMANHO_LOTE', '1000'))
+ARQUIVAMENTO_PAUSA_S = float(os.getenv('ARQUIVAMENTO_PAUSA_S', '0.1'))
+ARQUIVAMENTO_INTERVALO_S = float(os.getenv('ARQUIVAMENTO_INTERVALO_S', '0'))
+# chave do pg_try_advisory_xact_lock que impede dois arquivamentos simultâneos (ver shared/particoes.py)
+TRAVA_ARQUIVAMENTO = 7317002
+# marca, na importação em NDJSON, a linha que não é JSON válido (None é o item `null`)
+LINHA_ILEGIVEL = object()
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix='/contas-pagar-receber')
 
@@ -44,10 +88,84 @@ class ContaPagarReceberRequest(BaseModel):
     id_fornecedor_cliente: Optional[int] = None
     data_previsao: date
 
+class FormatoListagemEnum(str, Enum):
+    JSON = 'json'
+    NDJSON = 'ndjson'
+
+class FormatoExportacaoEnum(str, Enum):
+    CSV = 'csv'
+    NDJSON = 'ndjson'
+
+class OrdenacaoContasEnum(str, Enum):
+    ID = 'id'
+    DATA_PREVISAO = 'data_previsao'
+    VALOR = 'valor'
+
+class DirecaoOrdenacaoEnum(str, Enum):
+    ASC = 'asc'
+    DESC = 'desc'
+
+class FiltroContas(BaseModel):
+    """Filtros e ordenação das listagens de contas, recebidos como query params.
+    esta_baixada=false retorna as contas em aberto (esta_baixada falso ou nulo);
+    incluir_arquivadas=true junta as contas de tbl_contas_arquivo."""
+    tipo: Optional[ContaPagarReceberTipoEnum] = None
+    esta_baixada: Optional[bool] = None
+    data_previsao_inicio: Optional[date] = None
+    data_previsao_fim: Optional[date] = None
+    id_fornecedor_cliente: Optional[int] = None
+    ordenar_por: OrdenacaoContasEnum = OrdenacaoContasEnum.ID
+    ordem: DirecaoOrdenacaoEnum = DirecaoOrdenacaoEnum.ASC
+    incluir_arquivadas: bool = False
+
+class BaixaEmLoteRequest(BaseModel):
+    ids: Optional[List[int]] = None
+    id_fornecedor_cliente: Optional[int] = None
+    data_previsao_inicio: Optional[date] = None
+    data_previsao_fim: Optional[date] = None
+    
+    @root_validator
+    def exige_algum_filtro(cls, values):
+        if all(values.get(campo) is None for campo in ('ids', 'id_fornecedor_cliente',
+                                                       'data_previsao_inicio', 'data_previsao_fim')):
+            raise ValueError('Informe ids ou ao menos um filtro (fornecedor ou período)')
+        return values
+
+class ErroImportacaoLinha(BaseModel):
+    linha: int
+    mensagem: str
+
+class ImportacaoContasResponse(BaseModel):
+    inseridas: int
+    erros: List[ErroImportacaoLinha]
+
 class PrevisaoPorMes(BaseModel):
     mes: int
     valor_total: Decimal
 
+class GranularidadeEnum(str, Enum):
+    DIA = 'dia'
+    SEMANA = 'semana'
+    MES = 'mes'
+
+class FluxoDeCaixaPeriodo(BaseModel):
+    periodo: date
+    entradas: Decimal
+    saidas: Decimal
+    saldo_periodo: Decimal
+    saldo_acumulado: Decimal
+
+def campos_pedidos(fields: Optional[str] = Query(None, description='Campos de cada conta a retornar, separados por '
+                                                 'vírgula (ex.: id,valor,data_previsao,esta_baixada)')) -> Optional[List[str]]:
+    """Lê `fields` como lista de campos de ContaPagarReceberResponse, na ordem da resposta completa."""
+    if fields is None:
+        return None
+    
+    pedidos = {campo.strip() for campo in fields.split(',')} - {''}
+    if not pedidos or not pedidos <= ContaPagarReceberResponse.__fields__.keys():
+        raise InvalidFields
+    return [campo for campo in ContaPagarReceberResponse.__fields__ if campo in pedidos]
+
 # CRUD
 
 # Create
@@ -57,47 +175,233 @@ class PrevisaoPorMes(BaseModel):
     summary='Criar conta',
     description='Cria uma nova conta a pagar/receber'
 )
-def criar_conta(conta_request: ContaPagarReceberRequest,
-                db: Session=Depends(get_db)) -> ContaPagarReceberResponse: 
-    valida_fornecedor(conta_request.id_fornecedor_cliente, db)
-    valida_limite_de_registro_nova_conta(conta_request, db)
-        
-    conta = ContaPagarReceber(
-        **conta_request.dict()
-    )
+async def criar_conta(conta_request: ContaPagarReceberRequest,
+                db: AsyncSession=Depends(get_async_db)) -> ContaPagarReceberResponse: 
+    if QTD_PERMITIDA_MES < 1:
+        raise MonthlyAccountLimitExceededException
     
-    db.add(conta)
-    db.commit()
-    db.refresh(conta)
+    conta = await executar_escrita_conta(db, comando_criar_conta(conta_request))
     
-    return conta
+    if conta is None:
+        raise MonthlyAccountLimitExceededException
+    
+    await atualizar_resumo_contas_mes(db, conta['data_previsao'], conta['tipo'], qtd=1, valor_total=conta['valor'])
+    await registrar_alteracao(db, TABELA_CONTAS, chave_previsao(conta['data_previsao'].year))
+    await db.commit()
+    
+    return conta_response_de_linha(conta)
+
+@router.post('/bulk',
+    response_model=ImportacaoContasResponse,
+    status_code=200,
+    summary='Importar contas em lote',
+    description='Recebe uma lista JSON ou um NDJSON (Content-Type: application/x-ndjson) de contas '
+                'no formato de criação e grava as válidas numa única transação via COPY. '
+                'O limite mensal é aplicado ao lote inteiro de cada mês; as linhas rejeitadas '
+                'são informadas em `erros`, numeradas a partir de 1 (no NDJSON, pela linha do corpo, '
+                'contando as em branco).'
+)
+@classe_admissao('pesada')
+async def importar_contas(request: Request,
+                db: AsyncSession=Depends(get_async_db)) -> ImportacaoContasResponse:
+    linhas = ler_linhas_importacao(await request.body(), request.headers.get('content-type', ''))
+    
+    contas = {}
+    erros = {}
+    for numero, linha in linhas:
+        if linha is LINHA_ILEGIVEL:
+            erros[numero] = 'JSON inválido'
+            continue
+        if not isinstance(linha, dict):
+            erros[numero] = 'item deve ser um objeto'
+            continue
+        try:
+            contas[numero] = ContaPagarReceberRequest.parse_obj(linha)
+        except ValidationError as e:
+            erros[numero] = '; '.join(f"{'.'.join(map(str, erro['loc']))}: {erro['msg']}" for erro in e.errors())
+    
+    ids_fornecedor = {c.id_fornecedor_cliente for c in contas.values() if c.id_fornecedor_cliente is not None}
+    fornecedores_existentes = await fornecedores_existentes_por_id(db, ids_fornecedor)
+    
+    contas_por_mes = defaultdict(list)
+    for numero, conta in contas.items():
+        if conta.id_fornecedor_cliente is not None and conta.id_fornecedor_cliente not in fornecedores_existentes:
+            erros[numero] = FornecedorNotFound().message
+        else:
+            contas_por_mes[(conta.data_previsao.year, conta.data_previsao.month)].append(numero)
+    
+    validas = []
+    # meses em ordem, para que importações concorrentes travem os contadores na mesma sequência
+    for _, numeros in sorted(contas_por_mes.items()):
+        try:
+            await reservar_registros_no_mes(db, contas[numeros[0]].data_previsao, len(numeros))
+            validas.extend(contas[numero] for numero in numeros)
+        except MonthlyAccountLimitExceededException as e:
+            erros.update((numero, e.message) for numero in numeros)
+    
+    if validas:
+        await inserir_contas_em_lote(db, validas)
+        await registrar_alteracao(db, TABELA_CONTAS, *{chave_previsao(c.data_previsao.year) for c in validas})
+        await db.commit()
+    
+    return ImportacaoContasResponse(
+        inseridas=len(validas),
+        erros=[ErroImportacaoLinha(linha=numero, mensagem=mensagem) for numero, mensagem in sorted(erros.items())]
+    )
 
 # Read
 @router.get('',
     response_model=List[ContaPagarReceberResponse],
     summary='Listar contas',
-    description='Retorna uma lista de todas as contas'
+    description='Retorna as contas filtradas e ordenadas (por ID, data_previsao ou valor), paginadas por cursor. '
+                'O cabeçalho X-Proximo-Cursor traz o valor de `after` da próxima página, válido para a mesma ordenação. '
+                'Com formato=ndjson as contas são transmitidas uma por linha, sem paginação obrigatória. '
+                'Com fields, só os campos pedidos são lidos e retornados; o fornecedor só é consultado '
+                'quando fornecedor_cliente está entre eles.'
 )
-def listar_contas(db: Session=Depends(get_db)) -> List[ContaPagarReceberResponse]:
-    return db.query(ContaPagarReceber).all()
+@classe_admissao('pesada')
+async def listar_contas(request: Request,
+                response: Response,
+                filtro: FiltroContas = Depends(),
+                limit: Optional[int] = Query(None, ge=1, le=LIMITE_MAXIMO_LISTAGEM),
+                after: Optional[str] = None,
+                formato: FormatoListagemEnum = FormatoListagemEnum.JSON,
+                campos: Optional[List[str]] = Depends(campos_pedidos),
+                db: AsyncSession=Depends(get_async_db)) -> List[ContaPagarReceberResponse]:
+    cursor = ler_cursor(after, filtro.ordenar_por) if after is not None else None
+    
+    etag = await etag_das_versoes(db, TABELA_CONTAS, TABELA_FORNECEDORES)
+    nao_modificado = resposta_se_nao_modificado(request, etag)
+    if nao_modificado is not None:
+        return nao_modificado
+    
+    if formato == FormatoListagemEnum.NDJSON:
+        return StreamingResponse(gerar_contas_ndjson(db, filtro, cursor, limit, campos),
+                                media_type='application/x-ndjson',
+                                headers=cabecalhos_cache(etag))
+    
+    response.headers.update(cabecalhos_cache(etag))
+    limit = limit or LIMITE_PADRAO_LISTAGEM
+    
+    if SERIALIZACAO_RAPIDA_ATIVA or campos is not None:
+        linhas = await listar_linhas_contas_paginadas(db, filtro, limit + 1, cursor, campos)
+        if len(linhas) > limit:
+            linhas = linhas[:limit]
+            response.headers['X-Proximo-Cursor'] = montar_cursor(linhas[-1][filtro.ordenar_por.value], linhas[-1]['id'],
+                                                                 filtro.ordenar_por)
+        
+        return RespostaJSONRapida([conta_response_de_linha(linha, campos) for linha in linhas], headers=dict(response.headers))
+    
+    contas = await listar_contas_paginadas(db, filtro, limit + 1, cursor)
+    
+    if len(contas) > limit:
+        contas = contas[:limit]
+        response.headers['X-Proximo-Cursor'] = montar_cursor(getattr(contas[-1], filtro.ordenar_por.value), contas[-1].id,
+                                                             filtro.ordenar_por)
+    
+    return contas
 
 @router.get('/previsao-gastos-por-mes',
     response_model=List[PrevisaoPorMes],
     summary='Relatorio gastos previstos no mes',
-    description='Retorna um relatorio de gastos previstos para cada mês'
+    description='Retorna um relatorio de gastos previstos para cada mês. Com incluir_arquivadas=true '
+                'soma também as contas arquivadas.'
 )
-def previsao_gastos_por_mes(ano: int = date.today().year,
-                    db: Session=Depends(get_db)) -> List[PrevisaoPorMes]:
-    return relatorio_gastos_previstos_para_o_mes(db, ano)
+@classe_admissao('pesada')
+async def previsao_gastos_por_mes(request: Request,
+                    response: Response,
+                    ano: int = date.today().year,
+                    incluir_arquivadas: bool = False,
+                    db: AsyncSession=Depends(get_async_db)) -> List[PrevisaoPorMes]:
+    etag = await etag_das_versoes(db, chave_previsao(ano))
+    nao_modificado = resposta_se_nao_modificado(request, etag)
+    if nao_modificado is not None:
+        return nao_modificado
+    
+    response.headers.update(cabecalhos_cache(etag))
+    return await relatorio_gastos_previstos_para_o_mes(db, ano, incluir_arquivadas)
+
+@router.get('/fluxo-de-caixa',
+    response_model=List[FluxoDeCaixaPeriodo],
+    summary='Fluxo de caixa projetado',
+    description='Retorna, para cada dia/semana/mês entre inicio e fim, as entradas (contas a receber), as saídas '
+                '(contas a pagar) e o saldo acumulado desde o início da janela. Contas baixadas entram pela '
+                'data_baixa e valor_baixa; as em aberto, pela data_previsao e valor. Com incluir_arquivadas=true '
+                'entram também as baixas das contas arquivadas. A janela é limitada por granularidade: '
+                '366 dias por dia, 5 anos por semana e 20 anos por mês.'
+)
+@classe_admissao('pesada')
+async def fluxo_de_caixa(request: Request,
+                    response: Response,
+                    inicio: date,
+                    fim: date,
+                    granularidade: GranularidadeEnum = GranularidadeEnum.DIA,
+                    incluir_arquivadas: bool = False,
+                    db: AsyncSession=Depends(get_async_db)) -> List[FluxoDeCaixaPeriodo]:
+    if fim < inicio:
+        raise InvalidPeriod
+    
+    janela_maxima = JANELA_MAXIMA_FLUXO_DE_CAIXA[granularidade]
+    if fim - inicio >= janela_maxima:
+        raise InvalidPeriod(f'A janela do fluxo de caixa com granularidade {granularidade.value} '
+                            f'deve ter no máximo {janela_maxima.days} dias.')
+    
+    etag = await etag_das_versoes(db, TABELA_CONTAS)
+    nao_modificado = resposta_se_nao_modificado(request, etag)
+    if nao_modificado is not None:
+        return nao_modificado
+    
+    response.headers.update(cabecalhos_cache(etag))
+    return (await db.execute(consulta_fluxo_de_caixa(inicio, fim, granularidade, incluir_arquivadas))).mappings().all()
+
+@router.get('/export',
+    summary='Exportar contas',
+    description='Transmite todas as contas que atendem aos mesmos filtros e ordenação da listagem, em CSV '
+                '(com cabeçalho) ou NDJSON, lidas em lotes de um cursor no servidor: a memória usada não depende '
+                'da quantidade de contas, e a consulta é encerrada se o cliente desconectar.'
+)
+@classe_admissao('exportacao')
+async def exportar_contas(filtro: FiltroContas = Depends(),
+                    formato: FormatoExportacaoEnum = FormatoExportacaoEnum.CSV,
+                    db: AsyncSession=Depends(get_async_db)) -> StreamingResponse:
+    if formato == FormatoExportacaoEnum.CSV:
+        return StreamingResponse(gerar_exportacao_contas(db, filtro, formato), media_type='text/csv',
+                                 headers={'Content-Disposition': 'attachment; filename="contas.csv"'})
+    
+    return StreamingResponse(gerar_exportacao_contas(db, filtro, formato), media_type='application/x-ndjson',
+                             headers={'Content-Disposition': 'attachment; filename="contas.ndjson"'})
+
+@router.get('/busca',
+    response_model=List[ContaPagarReceberResponse],
+    summary='Buscar contas pela descrição',
+    description='Retorna as contas cuja descrição contém um trecho parecido com `q` (tolerante a erros de digitação), '
+                'da mais para a menos parecida.'
+)
+@classe_admissao('pesada')
+async def buscar_contas(request: Request,
+                    response: Response,
+                    q: str = Query(..., min_length=TAMANHO_MINIMO_BUSCA, max_length=30),
+                    limit: int = Query(LIMITE_PADRAO_BUSCA, ge=1, le=LIMITE_MAXIMO_BUSCA),
+                    db: AsyncSession=Depends(get_async_db)) -> List[ContaPagarReceberResponse]:
+    etag = await etag_das_versoes(db, TABELA_CONTAS, TABELA_FORNECEDORES)
+    nao_modificado = resposta_se_nao_modificado(request, etag)
+    if nao_modificado is not None:
+        return nao_modificado
+    
+    response.headers.update(cabecalhos_cache(etag))
+    
+    conta = ContaPagarReceber.__table__
+    consulta = buscar_por_similaridade(com_fornecedor(conta), conta.c.desc, q, conta.c.id, limit)
+    return [conta_response_de_linha(linha) for linha in (await db.execute(consulta)).mappings()]
 
 @router.get('/{id_conta}',
     response_model=ContaPagarReceberResponse,
     summary='Retornar conta pelo ID',
     description='Retorna uma conta específica pelo seu ID'
 )
-def listar_uma_conta(id_conta: int,
-                    db: Session=Depends(get_db)) -> ContaPagarReceberResponse:
-    conta = obter_conta_por_id(id_conta, db)
+async def listar_uma_conta(id_conta: int,
+                    db: AsyncSession=Depends(get_async_db)) -> ContaPagarReceberResponse:
+    conta = await obter_conta_por_id(id_conta, db)
     
     return conta
 
@@ -108,23 +412,23 @@ def listar_uma_conta(id_conta: int,
     summary='Atualizar conta',
     description='Atualiza os detalhes de uma conta existente'
 )
-def atualizar_conta(id_conta: int,
+async def atualizar_conta(id_conta: int,
                 conta_request: ContaPagarReceberRequest,
-                db: Session=Depends(get_db)) -> ContaPagarReceberResponse:
-    valida_fornecedor(conta_request.id_fornecedor_cliente, db)
-    
-    conta = obter_conta_por_id(id_conta, db)
+                db: AsyncSession=Depends(get_async_db)) -> ContaPagarReceberResponse:
+    conta = await executar_escrita_conta(db, comando_atualizar_conta(id_conta, conta_request))
     
-    conta.desc = conta_request.desc
-    conta.valor = conta_request.valor
-    conta.tipo = conta_request.tipo
-    conta.id_fornecedor_cliente = conta_request.id_fornecedor_cliente
+    if conta is None:
+        raise ContaNotFound
     
-    db.add(conta)
-    db.commit()
-    db.refresh(conta)
+    baixado = valor_baixado(conta['esta_baixada'], conta['valor_baixa'])
+    await atualizar_resumo_contas_mes(db, conta['data_previsao'], conta['tipo_anterior'], qtd=-1,
+                                valor_total=-(conta['valor_anterior'] or 0), valor_baixado=-baixado)
+    await atualizar_resumo_contas_mes(db, conta['data_previsao'], conta['tipo'], qtd=1,
+                                valor_total=conta['valor'], valor_baixado=baixado)
+    await registrar_alteracao(db, TABELA_CONTAS, chave_previsao(conta['data_previsao'].year))
+    await db.commit()
     
-    return conta
+    return conta_response_de_linha(conta)
 
 @router.post('/{id_conta}/baixar',
     response_model=ContaPagarReceberResponse,
@@ -132,21 +436,49 @@ def atualizar_conta(id_conta: int,
     summary='Baixar conta',
     description='Marca uma conta como baixada (paga ou recebida)'
 )
-def baixar_conta(id_conta: int,
-                db: Session=Depends(get_db)) -> ContaPagarReceberResponse:
+async def baixar_conta(id_conta: int,
+                db: AsyncSession=Depends(get_async_db)) -> ContaPagarReceberResponse:
     
-    conta += obter_conta_por_id(id_conta, db)
+    # a conta é escrita antes do resumo e da versão, na mesma ordem de travas das outras escritas
+    linha = (await db.execute(consulta_baixa_em_lote(BaixaEmLoteRequest(ids=[id_conta])))).mappings().first()
     
-    if not conta.esta_baixada or (conta.esta_baixada and conta.valor != conta.valor):
-        conta.data_baixa = date.today()
-        conta.esta_baixada = True
-        conta.valor_baixa = conta.valor
+    if linha is None:
+        # já baixada pelo valor atual; obter_conta_por_id levanta ContaNotFound se não existir
+        return await obter_conta_por_id(id_conta, db)
     
-        db.add(conta)
-        db.commit()
-        db.refresh(conta)
+    await atualizar_resumo_contas_mes(db, linha['data_previsao'], linha['tipo'],
+                                valor_baixado=linha['valor'] - valor_baixado(linha['estava_baixada'], linha['valor_baixa_anterior']))
+    await registrar_alteracao(db, TABELA_CONTAS)
+    await db.commit()
     
-    return conta
+    return conta_response_de_linha(linha)
+
+@router.post('/baixar',
+    response_model=List[ContaPagarReceberResponse],
+    status_code=200,
+    summary='Baixar contas em lote',
+    description='Baixa de uma vez as contas em aberto que atendem aos filtros (ids, fornecedor, '
+                'período de data_previsao, combinados com E), com as mesmas regras da baixa '
+                'individual. Retorna as contas alteradas.'
+)
+@classe_admissao('pesada')
+async def baixar_contas_em_lote(baixa_request: BaixaEmLoteRequest,
+                db: AsyncSession=Depends(get_async_db)) -> List[ContaPagarReceberResponse]:
+    linhas = (await db.execute(consulta_baixa_em_lote(baixa_request))).mappings().all()
+    
+    deltas = defaultdict(Decimal)
+    for linha in linhas:
+        anterior = valor_baixado(linha['estava_baixada'], linha['valor_baixa_anterior'])
+        deltas[(linha['data_previsao'].replace(day=1), linha['tipo'])] += linha['valor'] - anterior
+    
+    for (mes, tipo), valor in sorted(deltas.items()):
+        await atualizar_resumo_contas_mes(db, mes, tipo, valor_baixado=valor)
+    
+    if linhas:
+        await registrar_alteracao(db, TABELA_CONTAS)
+    await db.commit()
+    
+    return [conta_response_de_linha(linha) for linha in linhas]
 
 # Delete
 @router.delete('/{id_conta}',
@@ -154,56 +486,621 @@ def baixar_conta(id_conta: int,
     summary='Deletar conta',
     description='Remove uma conta existente do sistema'
 )
-def deletar_conta(id_conta: int,
-                db: Session=Depends(get_db)):
+async def deletar_conta(id_conta: int,
+                db: AsyncSession=Depends(get_async_db)):
     
-    conta = obter_conta_por_id(id_conta, db)
-    db.delete(conta)
+    conta = (await db.execute(comando_excluir_conta(id_conta))).mappings().first()
+    if conta is None:
+        raise ContaNotFound
+    
+    await liberar_registros_no_mes(db, conta['data_previsao'])
+    await atualizar_resumo_contas_mes(db, conta['data_previsao'], conta['tipo'], qtd=-1,
+                                valor_total=-(conta['valor'] or 0), valor_baixado=-valor_baixado(conta['esta_baixada'], conta['valor_baixa']))
+    await registrar_alteracao(db, TABELA_CONTAS, chave_previsao(conta['data_previsao'].year))
     
-    db.commit()
+    await db.commit()
 
 
 # Auxiliar functions
-def obter_conta_por_id(id_conta: int,
-                        db: Session=Depends(get_db)) -> ContaPagarReceber:
-    conta: ContaPagarReceber = db.get(ContaPagarReceber, id_conta)
+async def obter_conta_por_id(id_conta: int,
+                        db: AsyncSession=Depends(get_async_db)) -> ContaPagarReceber:
+    # populate_existing recarrega a conta e o fornecedor mesmo que já estejam na sessão,
+    # já que uma sessão assíncrona não pode carregar o relacionamento sob demanda
+    conta: ContaPagarReceber = await db.get(ContaPagarReceber, id_conta,
+                                    options=[joinedload(ContaPagarReceber.fornecedor_cliente)],
+                                    populate_existing=True)
     
     if conta is None:
         raise ContaNotFound
     
     return conta
 
-def valida_fornecedor(id_fornecedor_cliente: int,
-                    db: Session=Depends(get_db)):
-    if id_fornecedor_cliente is not None:
-        fornecedor_cliente: FornecedorCliente = db.get(FornecedorCliente, id_fornecedor_cliente)
-        if fornecedor_cliente is None:
+async def executar_escrita_conta(db, comando):
+    """Executa um comando de escrita que retorna no máximo uma conta, traduzindo a violação
+    da chave estrangeira de id_fornecedor_cliente em FornecedorNotFound."""
+    try:
+        return (await db.execute(comando)).mappings().first()
+    except IntegrityError as e:
+        await db.rollback()
+        if getattr(e.orig, 'pgcode', None) == '23503':
             raise FornecedorNotFound
+        raise
+
+def com_fornecedor(conta_cte):
+    return select(conta_cte, FornecedorCliente.nome.label('fornecedor_nome')) \
+            .outerjoin(FornecedorCliente, FornecedorCliente.id == conta_cte.c.id_fornecedor_cliente)
 
-def contar_registros_por_mes(db, mes, ano) -> int:
-    qtd_registros = db.query(ContaPagarReceber) \
-                        .filter(extract('month', ContaPagarReceber.data_previsao) == mes) \
-                        .filter(extract('year', ContaPagarReceber.data_previsao) == ano).count()
+def comando_criar_conta(conta_request: ContaPagarReceberRequest):
+    """Reserva a vaga no contador do mês, insere a conta e junta o fornecedor num só comando.
+    Se o mês já estiver cheio a CTE `vaga` não retorna linha e nada é inserido."""
+    vaga = comando_reservar_registros_no_mes(conta_request.data_previsao, 1).cte('vaga')
     
-    return qtd_registros
+    valores = select(
+        cast(literal(conta_request.desc), String),
+        cast(literal(conta_request.valor), Numeric),
+        cast(literal(conta_request.tipo.value), String),
+        cast(literal(conta_request.data_previsao), Date),
+        cast(literal(conta_request.id_fornecedor_cliente), Integer),
+        cast(literal(False), Boolean)
+    ).select_from(vaga)
+    
+    nova = insert(ContaPagarReceber) \
+            .from_select(['desc', 'valor', 'tipo', 'data_previsao', 'id_fornecedor_cliente', 'esta_baixada'], valores) \
+            .returning(*ContaPagarReceber.__table__.c) \
+            .cte('nova')
+    
+    return com_fornecedor(nova)
 
-def valida_limite_de_registro_nova_conta(conta_request: ContaPagarReceberRequest, db) -> None:
-    if contar_registros_por_mes(db, conta_request.data_previsao.month, conta_request.data_previsao.year) >= QTD_PERMITIDA_MES:
-        raise MonthlyAccountLimitExceededException
+def comando_atualizar_conta(id_conta: int, conta_request: ContaPagarReceberRequest):
+    """Atualiza a conta com UPDATE ... RETURNING, devolvendo também tipo e valor anteriores
+    para o resumo mensal, e junta o fornecedor num só comando."""
+    anterior = select(ContaPagarReceber.id, ContaPagarReceber.tipo, ContaPagarReceber.valor) \
+                .where(ContaPagarReceber.id == id_conta) \
+                .with_for_update() \
+                .subquery('anterior')
+    
+    atualizada = update(ContaPagarReceber) \
+                    .where(ContaPagarReceber.id == anterior.c.id) \
+                    .values(desc=conta_request.desc,
+                            valor=conta_request.valor,
+                            tipo=conta_request.tipo.value,
+                            id_fornecedor_cliente=conta_request.id_fornecedor_cliente) \
+                    .returning(*ContaPagarReceber.__table__.c,
+                               anterior.c.tipo.label('tipo_anterior'),
+                               anterior.c.valor.label('valor_anterior')) \
+                    .cte('atualizada')
+    
+    return com_fornecedor(atualizada)
+
+def comando_excluir_conta(id_conta: int):
+    """Remove a conta com DELETE ... RETURNING, antes de mexer no resumo e na versão, devolvendo
+    os valores necessários para desfazer a conta no resumo mensal."""
+    return delete(ContaPagarReceber) \
+            .where(ContaPagarReceber.id == id_conta) \
+            .returning(ContaPagarReceber.data_previsao, ContaPagarReceber.tipo, ContaPagarReceber.valor,
+                       ContaPagarReceber.esta_baixada, ContaPagarReceber.valor_baixa)
+
+async def fornecedores_existentes_por_id(db, ids_fornecedor: set) -> set:
+    """Confere os ids no banco, numa única consulta dentro da transação da importação. Não usa o cache:
+    um fornecedor removido em outro worker ainda estaria nele, e o COPY falharia com violação de FK.
+    FOR KEY SHARE impede que os fornecedores encontrados sejam removidos até o commit."""
+    if not ids_fornecedor:
+        return set()
+    
+    consulta = select(FornecedorCliente.id).where(FornecedorCliente.id.in_(ids_fornecedor)).with_for_update(key_share=True)
+    return set((await db.execute(consulta)).scalars())
+
+def ler_linha_ndjson(linha: bytes):
+    try:
+        return json.loads(linha)
+    except ValueError:
+        return LINHA_ILEGIVEL
+
+def ler_linhas_importacao(corpo: bytes, content_type: str) -> List[Tuple[int, Any]]:
+    """Lê o corpo como NDJSON ou lista JSON e retorna pares (número da linha, item). No NDJSON
+    o número é a posição da linha no corpo, contando as em branco, que são ignoradas; uma linha
+    ilegível vira LINHA_ILEGIVEL e é rejeitada sozinha, sem invalidar o restante do lote."""
+    if 'ndjson' in content_type:
+        return [(numero, ler_linha_ndjson(linha)) for numero, linha in enumerate(corpo.splitlines(), start=1)
+                if linha.strip()]
+    
+    try:
+        linhas = json.loads(corpo)
+    except ValueError:
+        raise InvalidBulkPayload
     
-def relatorio_gastos_previstos_para_o_mes(db, ano) -> List[PrevisaoPorMes]:
-    contas = db.query(ContaPagarReceber) \
-                .filter(extract('year', ContaPagarReceber.data_previsao) == ano) \
-                .filter(ContaPagarReceber.tipo == ContaPagarReceberTipoEnum.PAGAR) \
-                .order_by(ContaPagarReceber.data_previsao).all()
+    if not isinstance(linhas, list):
+        raise InvalidBulkPayload
     
-    valor_por_mes = {}
+    return list(enumerate(linhas, start=1))
+
+async def inserir_contas_em_lote(db, contas: List[ContaPagarReceberRequest]) -> None:
+    """Grava as contas com COPY na conexão da sessão, dentro da transação já aberta,
+    e soma os totais de cada (ano, mes, tipo) ao resumo mensal."""
+    colunas = ['desc', 'valor', 'tipo', 'data_previsao', 'id_fornecedor_cliente', 'esta_baixada']
+    registros = [
+        (c.desc, c.valor, c.tipo.value, c.data_previsao, c.id_fornecedor_cliente, False)
+        for c in contas
+    ]
+    
+    conexao = await (await db.connection()).get_raw_connection()
+    await conexao.driver_connection.copy_records_to_table(
+        ContaPagarReceber.__tablename__, records=registros, columns=colunas
+    )
+    
+    totais = defaultdict(lambda: [0, Decimal(0)])
     for conta in contas:
-        mes = conta.data_previsao.month
+        total = totais[(conta.data_previsao.replace(day=1), conta.tipo)]
+        total[0] += 1
+        total[1] += conta.valor
+    
+    for (mes, tipo), (qtd, valor_total) in sorted(totais.items()):
+        await atualizar_resumo_contas_mes(db, mes, tipo, qtd=qtd, valor_total=valor_total)
+
+def consulta_baixa_em_lote(baixa_request: BaixaEmLoteRequest):
+    """Monta um único comando: trava as contas em aberto que atendem aos filtros, aplica a baixa
+    com UPDATE ... RETURNING numa CTE e junta o fornecedor para montar a resposta."""
+    anteriores = select(ContaPagarReceber.id, ContaPagarReceber.esta_baixada, ContaPagarReceber.valor_baixa) \
+                    .where(or_(ContaPagarReceber.esta_baixada.isnot(True),
+                               ContaPagarReceber.valor_baixa.is_distinct_from(ContaPagarReceber.valor)))
+    
+    if baixa_request.ids is not None:
+        anteriores = anteriores.where(ContaPagarReceber.id.in_(baixa_request.ids))
+    if baixa_request.id_fornecedor_cliente is not None:
+        anteriores = anteriores.where(ContaPagarReceber.id_fornecedor_cliente == baixa_request.id_fornecedor_cliente)
+    if baixa_request.data_previsao_inicio is not None:
+        anteriores = anteriores.where(ContaPagarReceber.data_previsao >= baixa_request.data_previsao_inicio)
+    if baixa_request.data_previsao_fim is not None:
+        anteriores = anteriores.where(ContaPagarReceber.data_previsao <= baixa_request.data_previsao_fim)
+    
+    # travadas em ordem de id para que baixas em lote concorrentes não entrem em deadlock
+    anteriores = anteriores.order_by(ContaPagarReceber.id).with_for_update().subquery('anteriores')
+    
+    atualizadas = update(ContaPagarReceber) \
+                    .where(ContaPagarReceber.id == anteriores.c.id) \
+                    .values(data_baixa=date.today(), esta_baixada=True, valor_baixa=ContaPagarReceber.valor) \
+                    .returning(*ContaPagarReceber.__table__.c,
+                               anteriores.c.esta_baixada.label('estava_baixada'),
+                               anteriores.c.valor_baixa.label('valor_baixa_anterior')) \
+                    .cte('atualizadas')
+    
+    return com_fornecedor(atualizadas).order_by(atualizadas.c.id)
+
+def conta_response_de_linha(linha, campos: Optional[List[str]] = None) -> dict:
+    """Converte uma linha de tbl_contas (+ fornecedor_nome) no formato de ContaPagarReceberResponse,
+    só com os `campos` informados (todos, por padrão)."""
+    campos = campos or ContaPagarReceberResponse.__fields__
+    conta = {campo: linha[campo] for campo in campos if campo != 'fornecedor_cliente'}
+    
+    if 'fornecedor_cliente' in campos:
+        conta['fornecedor_cliente'] = None
+        if linha['id_fornecedor_cliente'] is not None:
+            conta['fornecedor_cliente'] = {'id': linha['id_fornecedor_cliente'], 'nome': linha['fornecedor_nome']}
+    
+    return conta
+
+def contas_consultadas(incluir_arquivadas: bool):
+    """ContaPagarReceber ou, com incluir_arquivadas, um alias dela sobre tbl_contas UNION ALL
+    tbl_contas_arquivo. O PostgreSQL leva os filtros e a ordenação a cada lado da união, que
+    continuam usando os índices de cada tabela."""
+    if not incluir_arquivadas:
+        return ContaPagarReceber
+    
+    conta = ContaPagarReceber.__table__
+    arquivada = ContaArquivada.__table__
+    uniao = union_all(select(conta), select(*(arquivada.c[coluna.name] for coluna in conta.c))).subquery('contas')
+    return aliased(ContaPagarReceber, uniao)
+
+def consulta_contas_por_cursor(filtro: FiltroContas, cursor: Optional[tuple], limit: Optional[int]):
+    contas = contas_consultadas(filtro.incluir_arquivadas)
+    consulta = select(contas) \
+                .options(joinedload(contas.fornecedor_cliente))
+    
+    return paginar_por_cursor(filtrar_contas(consulta, filtro, contas), filtro, cursor, limit, contas)
+
+def consulta_linhas_contas_por_cursor(filtro: FiltroContas, cursor: Optional[tuple], limit: Optional[int],
+                                      campos: Optional[List[str]] = None):
+    """Mesma página de consulta_contas_por_cursor, mas como colunas simples (conta + fornecedor_nome).
+    Com `campos`, seleciona só as colunas deles mais id e a coluna de ordenação (para o cursor), e
+    só junta o fornecedor quando fornecedor_cliente é pedido."""
+    contas = contas_consultadas(filtro.incluir_arquivadas)
+    tabela = inspect(contas).selectable
+    if campos is None:
+        consulta = com_fornecedor(tabela)
+    else:
+        colunas = dict.fromkeys(['id', filtro.ordenar_por.value, *campos])
+        colunas.pop('fornecedor_cliente', None)
+        consulta = select(*(tabela.c[coluna] for coluna in colunas))
+        if 'fornecedor_cliente' in campos:
+            consulta = consulta.add_columns(tabela.c.id_fornecedor_cliente, FornecedorCliente.nome.label('fornecedor_nome')) \
+                        .outerjoin(FornecedorCliente, FornecedorCliente.id == tabela.c.id_fornecedor_cliente)
+    
+    return paginar_por_cursor(filtrar_contas(consulta, filtro, contas), filtro, cursor, limit, contas)
+
+def filtrar_contas(consulta, filtro: FiltroContas, contas=ContaPagarReceber):
+    if filtro.tipo is not None:
+        consulta = consulta.where(contas.tipo == filtro.tipo.value)
+    if filtro.esta_baixada:
+        consulta = consulta.where(contas.esta_baixada.is_(True))
+    elif filtro.esta_baixada is not None:
+        # mesmo predicado do índice parcial ix_tbl_contas_abertas_data_previsao
+        consulta = consulta.where(contas.esta_baixada.isnot(True))
+    if filtro.data_previsao_inicio is not None:
+        consulta = consulta.where(contas.data_previsao >= filtro.data_previsao_inicio)
+    if filtro.data_previsao_fim is not None:
+        consulta = consulta.where(contas.data_previsao <= filtro.data_previsao_fim)
+    if filtro.id_fornecedor_cliente is not None:
+        consulta = consulta.where(contas.id_fornecedor_cliente == filtro.id_fornecedor_cliente)
+    
+    return consulta
+
+def paginar_por_cursor(consulta, filtro: FiltroContas, cursor: Optional[tuple], limit: Optional[int],
+                       contas=ContaPagarReceber):
+    """Ordena pela coluna escolhida com o id como desempate e aplica o cursor (keyset) como
+    comparação de tupla, que o PostgreSQL resolve com os índices (coluna, id)."""
+    chaves = [contas.id]
+    if filtro.ordenar_por != OrdenacaoContasEnum.ID:
+        chaves.insert(0, getattr(contas, filtro.ordenar_por.value))
+    decrescente = filtro.ordem == DirecaoOrdenacaoEnum.DESC
+    
+    consulta = consulta.order_by(*(chave.desc() if decrescente else chave for chave in chaves))
+    
+    if cursor is not None:
+        consulta = consulta.where(tuple_(*chaves) < tuple_(*cursor) if decrescente else tuple_(*chaves) > tuple_(*cursor))
+    
+    if limit is not None:
+        consulta = consulta.limit(limit)
+    
+    return consulta
+
+def montar_cursor(valor_ordenacao, id_conta: int, ordenar_por: OrdenacaoContasEnum) -> str:
+    if ordenar_por == OrdenacaoContasEnum.ID:
+        return str(id_conta)
+    
+    return f'{valor_ordenacao},{id_conta}'
+
+def ler_cursor(after: str, ordenar_por: OrdenacaoContasEnum) -> tuple:
+    """Converte o `after` recebido de volta nos valores de (coluna de ordenação, id)."""
+    try:
+        if ordenar_por == OrdenacaoContasEnum.ID:
+            return (int(after),)
         
-        if valor_por_mes.get(mes) is None:
-            valor_por_mes[mes] = 0
+        valor, id_conta = after.rsplit(',', 1)
+        valor = date.fromisoformat(valor) if ordenar_por == OrdenacaoContasEnum.DATA_PREVISAO else Decimal(valor)
+        return valor, int(id_conta)
+    except (ValueError, ArithmeticError):
+        raise InvalidCursor
+
+async def listar_contas_paginadas(db, filtro: FiltroContas, limit: int, cursor: Optional[tuple]) -> List[ContaPagarReceber]:
+    return (await db.execute(consulta_contas_por_cursor(filtro, cursor, limit))).scalars().all()
+
+async def listar_linhas_contas_paginadas(db, filtro: FiltroContas, limit: int, cursor: Optional[tuple],
+                                        campos: Optional[List[str]] = None) -> list:
+    return (await db.execute(consulta_linhas_contas_por_cursor(filtro, cursor, limit, campos))).mappings().all()
+
+async def gerar_contas_ndjson(db, filtro: FiltroContas, cursor: Optional[tuple], limit: Optional[int],
+                              campos: Optional[List[str]] = None):
+    """Lê as linhas das contas (com `campos`, só as colunas deles) por um cursor no servidor, em lotes
+    de TAMANHO_LOTE_STREAMING, e produz uma linha JSON por conta sem carregar a tabela inteira em memória."""
+    consulta = consulta_linhas_contas_por_cursor(filtro, cursor, limit, campos) \
+                .execution_options(yield_per=TAMANHO_LOTE_STREAMING)
+    resultado = await db.stream(consulta)
+    
+    try:
+        async for lote in resultado.mappings().partitions():
+            yield b''.join(codificar_json(conta_response_de_linha(linha, campos)) + b'\n' for linha in lote)
+    finally:
+        # como em gerar_exportacao_contas: fecha o cursor mesmo quando o cliente desconecta
+        with anyio.CancelScope(shield=True):
+            await resultado.close()
+
+async def gerar_exportacao_contas(db, filtro: FiltroContas, formato: FormatoExportacaoEnum):
+    """Lê as linhas (conta + fornecedor_nome, sem objetos do ORM) por um cursor no servidor, em lotes de
+    TAMANHO_LOTE_STREAMING, e produz um bloco de CSV ou NDJSON por lote."""
+    consulta = consulta_linhas_contas_por_cursor(filtro, None, None) \
+                .execution_options(yield_per=TAMANHO_LOTE_STREAMING)
+    resultado = await db.stream(consulta)
+    
+    try:
+        if formato == FormatoExportacaoEnum.CSV:
+            yield linhas_csv([COLUNAS_EXPORTACAO_CSV])
+        
+        async for lote in resultado.mappings().partitions():
+            if formato == FormatoExportacaoEnum.CSV:
+                yield linhas_csv([linha[coluna] for coluna in COLUNAS_EXPORTACAO_CSV] for linha in lote)
+            else:
+                yield b''.join(codificar_json(conta_response_de_linha(linha)) + b'\n' for linha in lote)
+    finally:
+        # Se o cliente desconecta, a StreamingResponse cancela a leitura; o cursor é fechado mesmo assim,
+        # protegido do cancelamento, para não deixar a consulta aberta no servidor
+        with anyio.CancelScope(shield=True):
+            await resultado.close()
+
+def linhas_csv(linhas) -> str:
+    saida = io.StringIO()
+    csv.writer(saida).writerows(linhas)
+    
+    return saida.getvalue()
+
+def intervalo_do_mes(ano: int, mes: int) -> Tuple[date, date]:
+    """Retorna o intervalo semiaberto [inicio, fim) do mês, que pode ser atendido pelo índice de data_previsao."""
+    inicio = date(ano, mes, 1)
+    fim = date(ano + 1, 1, 1) if mes == 12 else date(ano, mes + 1, 1)
+    
+    return inicio, fim
+
+async def contar_registros_por_mes(db, mes, ano) -> int:
+    inicio, fim = intervalo_do_mes(ano, mes)
+    qtd_registros = await db.scalar(select(func.count())
+                        .select_from(ContaPagarReceber)
+                        .where(ContaPagarReceber.data_previsao >= inicio)
+                        .where(ContaPagarReceber.data_previsao < fim))
+    
+    return qtd_registros
+
+async def reservar_registros_no_mes(db, data_previsao: date, qtd: int = 1) -> None:
+    """Incrementa o contador do mês somente se o total continuar dentro de QTD_PERMITIDA_MES.
+    
+    O upsert trava a linha do mês até o commit, então escritas concorrentes no mesmo mês
+    são serializadas e não conseguem ultrapassar o limite."""
+    if qtd > QTD_PERMITIDA_MES:
+        raise MonthlyAccountLimitExceededException
+    
+    if (await db.execute(comando_reservar_registros_no_mes(data_previsao, qtd))).first() is None:
+        raise MonthlyAccountLimitExceededException
+
+def comando_reservar_registros_no_mes(data_previsao: date, qtd: int):
+    comando = insert(ContadorContasMes).values(ano=data_previsao.year, mes=data_previsao.month, qtd=qtd)
+    
+    return comando.on_conflict_do_update(
+        index_elements=[ContadorContasMes.ano, ContadorContasMes.mes],
+        set_={'qtd': ContadorContasMes.qtd + comando.excluded.qtd},
+        # limite renderizado inline: dentro de uma CTE o SQLAlchemy 1.4 posiciona errado
+        # o parâmetro do WHERE do ON CONFLICT quando o estilo de parâmetro é posicional (asyncpg)
+        where=ContadorContasMes.qtd + comando.excluded.qtd <= bindparam('limite', QTD_PERMITIDA_MES, literal_execute=True)
+    ).returning(ContadorContasMes.qtd)
+
+async def liberar_registros_no_mes(db, data_previsao: date, qtd: int = 1) -> None:
+    await db.execute(update(ContadorContasMes)
+                .where(ContadorContasMes.ano == data_previsao.year)
+                .where(ContadorContasMes.mes == data_previsao.month)
+                .values(qtd=ContadorContasMes.qtd - qtd))
+    
+async def relatorio_gastos_previstos_para_o_mes(db, ano, incluir_arquivadas: bool = False) -> List[PrevisaoPorMes]:
+    if RESUMO_CONTAS_MES_ATIVO:
+        consulta = select(ResumoContasMes.mes, ResumoContasMes.valor_total) \
+                    .where(ResumoContasMes.ano == ano) \
+                    .where(ResumoContasMes.tipo == ContaPagarReceberTipoEnum.PAGAR.value) \
+                    .where(ResumoContasMes.qtd > 0)
+        # o resumo só acompanha tbl_contas: as arquivadas do ano são somadas à parte
+        if incluir_arquivadas:
+            arquivadas = consulta_gastos_previstos_por_mes(ContaArquivada, ano).subquery('arquivadas')
+            uniao = union_all(consulta, select(arquivadas)).subquery('previsao')
+            consulta = select(uniao.c.mes, func.sum(uniao.c.valor_total)).group_by(uniao.c.mes)
+    else:
+        consulta = consulta_gastos_previstos_por_mes(contas_consultadas(incluir_arquivadas), ano)
+    
+    linhas = await db.execute(consulta.order_by(consulta.selected_columns[0]))
+    return [PrevisaoPorMes(mes=int(m), valor_total=v) for m, v in linhas]
+
+def consulta_gastos_previstos_por_mes(contas, ano: int):
+    mes = extract('month', contas.data_previsao)
+    return select(mes.label('mes'), func.sum(contas.valor).label('valor_total')) \
+            .where(contas.data_previsao >= date(ano, 1, 1)) \
+            .where(contas.data_previsao < date(ano + 1, 1, 1)) \
+            .where(contas.tipo == ContaPagarReceberTipoEnum.PAGAR) \
+            .group_by(mes)
+
+UNIDADES_GRANULARIDADE = {
+    GranularidadeEnum.DIA: 'day',
+    GranularidadeEnum.SEMANA: 'week',
+    GranularidadeEnum.MES: 'month',
+}
+# maior janela (fim - inicio + 1 dia) aceita pelo fluxo de caixa em cada granularidade, para que
+# generate_series e a leitura dos movimentos fiquem limitados a algumas centenas de períodos
+JANELA_MAXIMA_FLUXO_DE_CAIXA = {
+    GranularidadeEnum.DIA: timedelta(days=366),
+    GranularidadeEnum.SEMANA: timedelta(days=5 * 366),
+    GranularidadeEnum.MES: timedelta(days=20 * 366),
+}
+
+def consulta_fluxo_de_caixa(inicio: date, fim: date, granularidade: GranularidadeEnum, incluir_arquivadas: bool = False):
+    """Monta o fluxo de caixa num único comando: os movimentos da janela (em aberto pelo índice parcial
+    de contas abertas, baixados pelo de data_baixa), somados por período, com os períodos sem movimento
+    preenchidos por generate_series e o saldo acumulado por uma função de janela.
+    
+    Só as contas com movimento dentro de [inicio, fim] são lidas, então o custo depende do tamanho da
+    janela e não do histórico; por isso o saldo acumulado parte de zero no início da janela."""
+    # literal para que o date_trunc do SELECT e o do GROUP BY sejam a mesma expressão para o PostgreSQL
+    unidade = bindparam('unidade', UNIDADES_GRANULARIDADE[granularidade], literal_execute=True)
+    passo = bindparam('passo', f'1 {UNIDADES_GRANULARIDADE[granularidade]}', String, literal_execute=True)
+    
+    abertas = select(ContaPagarReceber.data_previsao.label('data'), ContaPagarReceber.valor.label('valor'),
+                     ContaPagarReceber.tipo) \
+                .where(ContaPagarReceber.esta_baixada.isnot(True)) \
+                .where(ContaPagarReceber.data_previsao >= inicio) \
+                .where(ContaPagarReceber.data_previsao <= fim)
+    # as arquivadas são todas baixadas
+    baixadas = [
+        select(contas.data_baixa.label('data'), contas.valor_baixa.label('valor'), contas.tipo) \
+            .where(contas.esta_baixada.is_(True)) \
+            .where(contas.data_baixa >= inicio) \
+            .where(contas.data_baixa <= fim)
+        for contas in ([ContaPagarReceber, ContaArquivada] if incluir_arquivadas else [ContaPagarReceber])
+    ]
+    movimentos = union_all(abertas, *baixadas).subquery('movimentos')
+    
+    periodo_movimento = cast(func.date_trunc(unidade, movimentos.c.data), Date)
+    por_periodo = select(periodo_movimento.label('periodo'),
+                         func.sum(case((movimentos.c.tipo == ContaPagarReceberTipoEnum.RECEBER.value, movimentos.c.valor),
+                                       else_=0)).label('entradas'),
+                         func.sum(case((movimentos.c.tipo == ContaPagarReceberTipoEnum.PAGAR.value, movimentos.c.valor),
+                                       else_=0)).label('saidas')) \
+                    .group_by(periodo_movimento) \
+                    .subquery('por_periodo')
+    
+    serie = select(cast(func.generate_series(func.date_trunc(unidade, cast(inicio, DateTime)),
+                                             cast(fim, DateTime),
+                                             cast(passo, Interval)), Date).label('periodo')) \
+                .subquery('serie')
+    
+    entradas = func.coalesce(por_periodo.c.entradas, 0)
+    saidas = func.coalesce(por_periodo.c.saidas, 0)
+    return select(serie.c.periodo,
+                  entradas.label('entradas'),
+                  saidas.label('saidas'),
+                  (entradas - saidas).label('saldo_periodo'),
+                  func.sum(entradas - saidas).over(order_by=serie.c.periodo).label('saldo_acumulado')) \
+            .select_from(serie.outerjoin(por_periodo, por_periodo.c.periodo == serie.c.periodo)) \
+            .order_by(serie.c.periodo)
+
+def valor_baixado(esta_baixada: Optional[bool], valor_baixa: Optional[Decimal]) -> Decimal:
+    if esta_baixada and valor_baixa is not None:
+        return valor_baixa
+    
+    return Decimal(0)
+
+async def atualizar_resumo_contas_mes(db, data_previsao: date, tipo, qtd: int = 0,
+                                valor_total: Decimal = 0, valor_baixado: Decimal = 0) -> None:
+    """Soma os deltas informados à linha (ano, mes, tipo) do resumo, na mesma transação da escrita da conta."""
+    if not RESUMO_CONTAS_MES_ATIVO or tipo is None:
+        return
+    
+    comando = insert(ResumoContasMes).values(
+        ano=data_previsao.year,
+        mes=data_previsao.month,
+        tipo=getattr(tipo, 'value', tipo),
+        qtd=qtd,
+        valor_total=valor_total or 0,
+        valor_baixado=valor_baixado or 0
+    )
+    comando = comando.on_conflict_do_update(
+        index_elements=[ResumoContasMes.ano, ResumoContasMes.mes, ResumoContasMes.tipo],
+        set_={
+            'qtd': ResumoContasMes.qtd + comando.excluded.qtd,
+            'valor_total': ResumoContasMes.valor_total + comando.excluded.valor_total,
+            'valor_baixado': ResumoContasMes.valor_baixado + comando.excluded.valor_baixado,
+        }
+    )
+    await db.execute(comando)
+
+def consulta_resumo_contas_mes():
+    ano = extract('year', ContaPagarReceber.data_previsao)
+    mes = extract('month', ContaPagarReceber.data_previsao)
+    
+    return select(ano.label('ano'),
+                  mes.label('mes'),
+                  ContaPagarReceber.tipo,
+                  func.count().label('qtd'),
+                  func.coalesce(func.sum(ContaPagarReceber.valor), 0).label('valor_total'),
+                  func.coalesce(func.sum(case((ContaPagarReceber.esta_baixada, ContaPagarReceber.valor_baixa))), 0)
+                    .label('valor_baixado')) \
+            .where(ContaPagarReceber.tipo.isnot(None)) \
+            .group_by(ano, mes, ContaPagarReceber.tipo)
+
+async def reconstruir_resumo_contas_mes(db) -> None:
+    """Recalcula tbl_resumo_contas_mes a partir de tbl_contas, bloqueando escritas em tbl_contas enquanto isso."""
+    await db.execute(text('LOCK TABLE tbl_contas IN SHARE MODE'))
+    await db.execute(delete(ResumoContasMes))
+    await db.execute(insert(ResumoContasMes).from_select(
+        ['ano', 'mes', 'tipo', 'qtd', 'valor_total', 'valor_baixado'],
+        consulta_resumo_contas_mes()
+    ))
+    await db.commit()
+
+async def verificar_resumo_contas_mes(db) -> List[tuple]:
+    """Retorna as chaves (ano, mes, tipo) cujo resumo diverge do que está em tbl_contas."""
+    esperado = {
+        (int(linha.ano), int(linha.mes), linha.tipo): (linha.qtd, linha.valor_total, linha.valor_baixado)
+        for linha in await db.execute(consulta_resumo_contas_mes())
+    }
+    atual = {
+        (resumo.ano, resumo.mes, resumo.tipo): (resumo.qtd, resumo.valor_total, resumo.valor_baixado)
+        for resumo in (await db.execute(select(ResumoContasMes))).scalars()
+        if resumo.qtd or resumo.valor_total or resumo.valor_baixado
+    }
+    
+    return sorted(chave for chave in esperado.keys() | atual.keys()
+                  if esperado.get(chave) != atual.get(chave))
+
+def data_corte_arquivamento() -> date:
+    return date.today() - timedelta(days=ARQUIVAMENTO_IDADE_DIAS)
+
+def comando_arquivar_lote(corte: date, depois_de: tuple, tamanho_lote: int):
+    """Move até `tamanho_lote` contas baixadas com data_previsao anterior a `corte`, na ordem
+    (data_previsao, id) a partir de `depois_de`, de tbl_contas para tbl_contas_arquivo num só comando.
+    As contas já travadas por outra transação são puladas (SKIP LOCKED) e ficam para a próxima
+    execução, então o arquivamento nunca espera por uma escrita da aplicação."""
+    lote = select(ContaPagarReceber.id, ContaPagarReceber.data_previsao) \
+            .where(ContaPagarReceber.esta_baixada.is_(True)) \
+            .where(ContaPagarReceber.data_previsao < corte) \
+            .where(tuple_(ContaPagarReceber.data_previsao, ContaPagarReceber.id) > tuple_(*depois_de)) \
+            .order_by(ContaPagarReceber.data_previsao, ContaPagarReceber.id) \
+            .limit(tamanho_lote) \
+            .with_for_update(skip_locked=True) \
+            .cte('lote')
+    
+    # data_previsao na condição para que o DELETE só visite a partição de cada conta
+    movidas = delete(ContaPagarReceber) \
+                .where(ContaPagarReceber.id == lote.c.id) \
+                .where(ContaPagarReceber.data_previsao == lote.c.data_previsao) \
+                .returning(*ContaPagarReceber.__table__.c) \
+                .cte('movidas')
+    
+    colunas = [coluna.name for coluna in ContaPagarReceber.__table__.c]
+    arquivadas = insert(ContaArquivada) \
+                    .from_select(colunas, select(*(movidas.c[coluna] for coluna in colunas))) \
+                    .returning(ContaArquivada.id, ContaArquivada.data_previsao, ContaArquivada.tipo,
+                               ContaArquivada.valor, ContaArquivada.valor_baixa, ContaArquivada.esta_baixada) \
+                    .cte('arquivadas')
+    
+    return select(arquivadas).order_by(arquivadas.c.data_previsao, arquivadas.c.id)
+
+async def arquivar_lote_contas(db, corte: date, depois_de: tuple, tamanho_lote: int) -> Optional[list]:
+    """Arquiva um lote numa transação curta, tirando as contas movidas do resumo mensal e
+    registrando a alteração dos anos afetados. Retorna as contas arquivadas ou None quando outro
+    arquivamento está em andamento."""
+    if not await db.scalar(select(func.pg_try_advisory_xact_lock(TRAVA_ARQUIVAMENTO))):
+        await db.rollback()
+        return None
+    
+    arquivadas = (await db.execute(comando_arquivar_lote(corte, depois_de, tamanho_lote))).all()
+    
+    por_mes = defaultdict(lambda: [0, Decimal(0), Decimal(0)])
+    for conta in arquivadas:
+        deltas = por_mes[(conta.data_previsao.replace(day=1), conta.tipo)]
+        deltas[0] -= 1
+        deltas[1] -= conta.valor or 0
+        deltas[2] -= valor_baixado(conta.esta_baixada, conta.valor_baixa)
+    # o lote vem ordenado por data_previsao, então os meses do resumo são atualizados em ordem
+    for (mes, tipo), (qtd, valor_total, valor_baixado_mes) in por_mes.items():
+        await atualizar_resumo_contas_mes(db, mes, tipo, qtd, valor_total, valor_baixado_mes)
+    
+    if arquivadas:
+        anos = {conta.data_previsao.year for conta in arquivadas}
+        await registrar_alteracao(db, TABELA_CONTAS, *(chave_previsao(ano) for ano in anos))
+    
+    await db.commit()
+    return arquivadas
+
+async def arquivar_contas_baixadas(db, corte: date, tamanho_lote: int = ARQUIVAMENTO_TAMANHO_LOTE,
+                            pausa_s: float = ARQUIVAMENTO_PAUSA_S, max_lotes: Optional[int] = None) -> int:
+    """Move para tbl_contas_arquivo, lote a lote, as contas baixadas com data_previsao anterior a `corte`
+    e retorna quantas foram arquivadas. Cada lote é uma transação: se o processo parar, o que já foi
+    movido fica arquivado e a próxima execução continua das contas que restaram em tbl_contas."""
+    total = 0
+    depois_de = (date.min, 0)
+    lotes = 0
+    
+    while max_lotes is None or lotes < max_lotes:
+        arquivadas = await arquivar_lote_contas(db, corte, depois_de, tamanho_lote)
+        if not arquivadas:
+            break
         
-        valor_por_mes[mes] += conta.valor
+        total += len(arquivadas)
+        lotes += 1
+        depois_de = (arquivadas[-1].data_previsao, arquivadas[-1].id)
+        logger.info('Arquivamento: %d contas até data_previsao=%s', total, depois_de[0])
+        await asyncio.sleep(pausa_s)
     
-    return [PrevisaoPorMes(mes=m, valor_total=v) for m, v in valor_por_mes.items()]
\ No newline at end of file
+    return total
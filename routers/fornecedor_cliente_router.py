@@ -1,14 +1,22 @@
 from typing import List
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request, Response
 from pydantic import BaseModel, Field
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from models.fornecedor_cliente_model import FornecedorCliente
-from shared.dependencies import get_db
+from shared.busca import LIMITE_MAXIMO_BUSCA, LIMITE_PADRAO_BUSCA, TAMANHO_MINIMO_BUSCA, buscar_por_similaridade
+from shared.cache import CACHE_FORNECEDOR_TAMANHO, CACHE_FORNECEDOR_TTL, BackendMemoriaLRU, Cache
+from shared.admissao import classe_admissao
+from shared.dependencies import get_async_db
+from shared.serializacao import SERIALIZACAO_RAPIDA_ATIVA, RespostaJSONRapida
+from shared.versoes import TABELA_FORNECEDORES, cabecalhos_cache, etag_das_versoes, registrar_alteracao, resposta_se_nao_modificado
 from shared.exceptions import FornecedorNotFound
 
 
 router = APIRouter(prefix='/fornecedor-cliente')
+cache_fornecedor_cliente = Cache('fornecedor_cliente',
+                                 BackendMemoriaLRU(CACHE_FORNECEDOR_TAMANHO, CACHE_FORNECEDOR_TTL))
 
 class FornecedorClienteResponse(BaseModel):
     id: int
@@ -28,14 +36,15 @@ class FornecedorClienteRequest(BaseModel):
     summary="Criar Fornecedor/Cliente",
     description="Cria um novo fornecedor ou cliente com o nome fornecido."
 )
-def criar_fornecedor_cliente(fornecedor_cliente: FornecedorClienteRequest,
-                            db: Session=Depends(get_db)) -> FornecedorClienteResponse:
+async def criar_fornecedor_cliente(fornecedor_cliente: FornecedorClienteRequest,
+                            db: AsyncSession=Depends(get_async_db)) -> FornecedorClienteResponse:
     
-    for_cli = FornecedorCliente(**fornecedor_cliente.dict())
-    
-    db.add(for_cli)
-    db.commit()
-    db.refresh(for_cli)
+    comando = insert(FornecedorCliente) \
+                .values(**fornecedor_cliente.dict()) \
+                .returning(FornecedorCliente.id, FornecedorCliente.nome)
+    for_cli = (await db.execute(comando)).mappings().one()
+    await registrar_alteracao(db, TABELA_FORNECEDORES)
+    await db.commit()
     
     return for_cli
 
@@ -45,18 +54,55 @@ def criar_fornecedor_cliente(fornecedor_cliente: FornecedorClienteRequest,
     summary="Listar Fornecedores/Clientes",
     description="Retorna uma lista de todos os fornecedores e clientes."
 )
-def listar_fornecedor_cliente(db: Session=Depends(get_db)) -> List[FornecedorClienteResponse]:
-    return db.query(FornecedorCliente).all()
+@classe_admissao('pesada')
+async def listar_fornecedor_cliente(request: Request,
+                                response: Response,
+                                db: AsyncSession=Depends(get_async_db)) -> List[FornecedorClienteResponse]:
+    etag = await etag_das_versoes(db, TABELA_FORNECEDORES)
+    nao_modificado = resposta_se_nao_modificado(request, etag)
+    if nao_modificado is not None:
+        return nao_modificado
+    
+    response.headers.update(cabecalhos_cache(etag))
+    
+    if SERIALIZACAO_RAPIDA_ATIVA:
+        linhas = (await db.execute(select(FornecedorCliente.id, FornecedorCliente.nome))).mappings()
+        return RespostaJSONRapida([dict(linha) for linha in linhas], headers=dict(response.headers))
+    
+    return (await db.execute(select(FornecedorCliente))).scalars().all()
+
+@router.get('/busca',
+    response_model=List[FornecedorClienteResponse],
+    summary="Buscar Fornecedores/Clientes pelo nome",
+    description="Retorna os fornecedores e clientes cujo nome contém um trecho parecido com `q` (tolerante a erros "
+                "de digitação), do mais para o menos parecido."
+)
+@classe_admissao('pesada')
+async def buscar_fornecedor_cliente(request: Request,
+                                response: Response,
+                                q: str = Query(..., min_length=TAMANHO_MINIMO_BUSCA, max_length=255),
+                                limit: int = Query(LIMITE_PADRAO_BUSCA, ge=1, le=LIMITE_MAXIMO_BUSCA),
+                                db: AsyncSession=Depends(get_async_db)) -> List[FornecedorClienteResponse]:
+    etag = await etag_das_versoes(db, TABELA_FORNECEDORES)
+    nao_modificado = resposta_se_nao_modificado(request, etag)
+    if nao_modificado is not None:
+        return nao_modificado
+    
+    response.headers.update(cabecalhos_cache(etag))
+    
+    consulta = buscar_por_similaridade(select(FornecedorCliente.id, FornecedorCliente.nome),
+                                       FornecedorCliente.nome, q, FornecedorCliente.id, limit)
+    return (await db.execute(consulta)).mappings().all()
 
 @router.get('/{id_fornecedor_cliente}',
     response_model=FornecedorClienteResponse,
     summary="Obter Fornecedor/Cliente por ID",
     description="Retorna um fornecedor ou cliente específico pelo seu ID."
 )
-def listar_um_fornecedor_cliente(id_fornecedor_cliente: int,
-                                db: Session=Depends(get_db)) -> FornecedorClienteResponse:
-
-    return consultar_fornecedor_cliente_por_id(id_fornecedor_cliente, db)
+async def listar_um_fornecedor_cliente(id_fornecedor_cliente: int,
+                                db: AsyncSession=Depends(get_async_db)) -> FornecedorClienteResponse:
+    
+    return await consultar_fornecedor_cliente_por_id(id_fornecedor_cliente, db)
 
 # Update
 @router.put('/{id_fornecedor_cliente}',
@@ -64,17 +110,23 @@ def listar_um_fornecedor_cliente(id_fornecedor_cliente: int,
     summary="Atualizar Fornecedor/Cliente",
     description="Atualiza os detalhes de um fornecedor ou cliente existente."
 )
-def atualizar_fornecedor_cliente(id_fornecedor_cliente: int,
+async def atualizar_fornecedor_cliente(id_fornecedor_cliente: int,
                                 fornecedor_cliente_request: FornecedorClienteRequest,
-                                db: Session=Depends(get_db)) -> FornecedorClienteResponse:
+                                db: AsyncSession=Depends(get_async_db)) -> FornecedorClienteResponse:
     
-    for_cli = consultar_fornecedor_cliente_por_id(id_fornecedor_cliente, db)
+    comando = update(FornecedorCliente) \
+                .where(FornecedorCliente.id == id_fornecedor_cliente) \
+                .values(nome=fornecedor_cliente_request.nome) \
+                .returning(FornecedorCliente.id, FornecedorCliente.nome)
+    for_cli = (await db.execute(comando)).mappings().first()
     
-    for_cli.nome = fornecedor_cliente_request.nome
+    if for_cli is None:
+        raise FornecedorNotFound
     
-    db.add(for_cli)
-    db.commit()
-    db.refresh(for_cli)
+    await cache_fornecedor_cliente.publicar_invalidacao(db, id_fornecedor_cliente)
+    await registrar_alteracao(db, TABELA_FORNECEDORES)
+    await db.commit()
+    await cache_fornecedor_cliente.gravar(id_fornecedor_cliente, FornecedorClienteResponse(**for_cli))
     
     return for_cli
 
@@ -84,19 +136,36 @@ def atualizar_fornecedor_cliente(id_fornecedor_cliente: int,
     summary="Deletar Fornecedor/Cliente",
     description="Remove um fornecedor ou cliente do sistema pelo seu ID."
 )
-def deletar_fornecedor_cliente(id_fornecedor_cliente: int,
-                            db: Session=Depends(get_db)):
-
-    for_cli = consultar_fornecedor_cliente_por_id(id_fornecedor_cliente, db)
+async def deletar_fornecedor_cliente(id_fornecedor_cliente: int,
+                            db: AsyncSession=Depends(get_async_db)):
+    
+    comando = delete(FornecedorCliente) \
+                .where(FornecedorCliente.id == id_fornecedor_cliente) \
+                .returning(FornecedorCliente.id)
     
-    db.delete(for_cli)
-    db.commit()
+    if (await db.execute(comando)).first() is None:
+        raise FornecedorNotFound
+    
+    await cache_fornecedor_cliente.publicar_invalidacao(db, id_fornecedor_cliente)
+    await registrar_alteracao(db, TABELA_FORNECEDORES)
+    await db.commit()
+    await cache_fornecedor_cliente.invalidar(id_fornecedor_cliente)
 
-def consultar_fornecedor_cliente_por_id(id_fornecedor_cliente: int,
-                        db: Session=Depends(get_db)) -> FornecedorCliente:
-    fornecedor_cliente: FornecedorCliente = db.get(FornecedorCliente, id_fornecedor_cliente)
+async def consultar_fornecedor_cliente_por_id(id_fornecedor_cliente: int,
+                        db: AsyncSession=Depends(get_async_db)) -> FornecedorClienteResponse:
+    fornecedor_cliente = await cache_fornecedor_cliente.obter(id_fornecedor_cliente)
+    if fornecedor_cliente is not None:
+        return fornecedor_cliente
+    
+    fornecedor_cliente = await db.get(FornecedorCliente, id_fornecedor_cliente)
     
     if fornecedor_cliente is None:
         raise FornecedorNotFound
     
+    fornecedor_cliente = FornecedorClienteResponse.from_orm(fornecedor_cliente)
+    # uma réplica atrasada poderia devolver o fornecedor de antes de uma alteração já invalidada no
+    # cache, que ficaria guardado até o TTL: o cache só é preenchido com leituras do primário
+    if 'replica' not in db.info:
+        await cache_fornecedor_cliente.gravar(id_fornecedor_cliente, fornecedor_cliente)
+    
     return fornecedor_cliente
\ No newline at end of file
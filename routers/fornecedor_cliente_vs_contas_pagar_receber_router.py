@@ -1,16 +1,117 @@
-from typing import List
-from fastapi import Depends, APIRouter
-from sqlalchemy.orm import Session
+from datetime import date
+from decimal import Decimal
+from typing import List, Optional
+from fastapi import Depends, APIRouter, Query, Request, Response
+from pydantic import BaseModel
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from routers.contas_pagar_receber_router import ContaPagarReceberResponse
+from routers.contas_pagar_receber_router import LIMITE_MAXIMO_LISTAGEM, LIMITE_PADRAO_LISTAGEM, ContaPagarReceberResponse, \
+                                                ContaPagarReceberTipoEnum, FiltroContas, campos_pedidos, conta_response_de_linha, \
+                                                consulta_contas_por_cursor, consulta_linhas_contas_por_cursor
 from models.contas_pagar_receber_model import ContaPagarReceber
-from shared.dependencies import get_db
+from models.fornecedor_cliente_model import FornecedorCliente
+from shared.admissao import classe_admissao
+from shared.dependencies import get_async_db
+from shared.exceptions import InvalidPeriod
+from shared.serializacao import SERIALIZACAO_RAPIDA_ATIVA, RespostaJSONRapida
+from shared.versoes import TABELA_CONTAS, TABELA_FORNECEDORES, cabecalhos_cache, etag_das_versoes, resposta_se_nao_modificado
 
 
 router = APIRouter(prefix='/fornecedor-cliente')
 
+class ResumoFornecedorCliente(BaseModel):
+    id: int
+    nome: str
+    qtd_pagar_abertas: int
+    valor_pagar_abertas: Decimal
+    qtd_pagar_baixadas: int
+    valor_pagar_baixadas: Decimal
+    qtd_receber_abertas: int
+    valor_receber_abertas: Decimal
+    qtd_receber_baixadas: int
+    valor_receber_baixadas: Decimal
+
+# Declarada antes de /{id_fornecedor_cliente} (este router é incluído antes do de fornecedores) para que
+# "resumo" não seja lido como id
+@router.get('/resumo',
+    response_model=List[ResumoFornecedorCliente],
+    summary='Resumo de contas por fornecedor/cliente',
+    description='Retorna, para cada fornecedor ou cliente, a quantidade e o total das contas a pagar e a receber '
+                'em aberto (pelo valor) e baixadas (pelo valor_baixa), opcionalmente só as com data_previsao no período. '
+                'Paginado por id do fornecedor: o cabeçalho X-Proximo-Cursor traz o `after` da próxima página.'
+)
+@classe_admissao('pesada')
+async def resumo_fornecedores_clientes(request: Request,
+                                response: Response,
+                                data_previsao_inicio: Optional[date] = None,
+                                data_previsao_fim: Optional[date] = None,
+                                limit: int = Query(LIMITE_PADRAO_LISTAGEM, ge=1, le=LIMITE_MAXIMO_LISTAGEM),
+                                after: Optional[int] = None,
+                                db: AsyncSession=Depends(get_async_db)) -> List[ResumoFornecedorCliente]:
+    if data_previsao_inicio is not None and data_previsao_fim is not None and data_previsao_fim < data_previsao_inicio:
+        raise InvalidPeriod
+    
+    etag = await etag_das_versoes(db, TABELA_CONTAS, TABELA_FORNECEDORES)
+    nao_modificado = resposta_se_nao_modificado(request, etag)
+    if nao_modificado is not None:
+        return nao_modificado
+    
+    response.headers.update(cabecalhos_cache(etag))
+    
+    consulta = consulta_resumo_fornecedores_clientes(data_previsao_inicio, data_previsao_fim, after, limit + 1)
+    resumos = (await db.execute(consulta)).mappings().all()
+    
+    if len(resumos) > limit:
+        resumos = resumos[:limit]
+        response.headers['X-Proximo-Cursor'] = str(resumos[-1]['id'])
+    
+    return resumos
+
 @router.get('/{id_fornecedor_cliente}/contas-pagar-receber', response_model=List[ContaPagarReceberResponse])
-def obter_contas_pagar_receber_fornecedor_cliente(id_fornecedor_cliente: int,
-                                db: Session=Depends(get_db)) -> List[ContaPagarReceberResponse]:
+@classe_admissao('pesada')
+async def obter_contas_pagar_receber_fornecedor_cliente(id_fornecedor_cliente: int,
+                                filtro: FiltroContas = Depends(),
+                                campos: Optional[List[str]] = Depends(campos_pedidos),
+                                db: AsyncSession=Depends(get_async_db)) -> List[ContaPagarReceberResponse]:
+    # o id do fornecedor no caminho preenche filtro.id_fornecedor_cliente
+    if SERIALIZACAO_RAPIDA_ATIVA or campos is not None:
+        linhas = (await db.execute(consulta_linhas_contas_por_cursor(filtro, None, None, campos))).mappings()
+        return RespostaJSONRapida([conta_response_de_linha(linha, campos) for linha in linhas])
+    
+    return (await db.execute(consulta_contas_por_cursor(filtro, None, None))).scalars().all()
+
+# Auxiliar functions
+def consulta_resumo_fornecedores_clientes(inicio: Optional[date], fim: Optional[date], after: Optional[int], limit: int):
+    """Um único GROUP BY sobre a página de fornecedores (keyset por id) com LEFT JOIN nas contas, de modo
+    que fornecedores sem contas aparecem zerados. As contas de cada fornecedor são lidas só do índice
+    ix_tbl_contas_id_fornecedor_cliente_cobertura, que também atende o período."""
+    fornecedores = select(FornecedorCliente.id, FornecedorCliente.nome) \
+                    .order_by(FornecedorCliente.id) \
+                    .limit(limit)
+    if after is not None:
+        fornecedores = fornecedores.where(FornecedorCliente.id > after)
+    fornecedores = fornecedores.subquery('fornecedores')
+    
+    juncao = [ContaPagarReceber.id_fornecedor_cliente == fornecedores.c.id]
+    if inicio is not None:
+        juncao.append(ContaPagarReceber.data_previsao >= inicio)
+    if fim is not None:
+        juncao.append(ContaPagarReceber.data_previsao <= fim)
+    
+    colunas = []
+    for tipo in ContaPagarReceberTipoEnum:
+        do_tipo = ContaPagarReceber.tipo == tipo.value
+        abertas = and_(do_tipo, ContaPagarReceber.esta_baixada.isnot(True))
+        baixadas = and_(do_tipo, ContaPagarReceber.esta_baixada.is_(True))
+        colunas += [
+            func.count().filter(abertas).label(f'qtd_{tipo.value}_abertas'),
+            func.coalesce(func.sum(ContaPagarReceber.valor).filter(abertas), 0).label(f'valor_{tipo.value}_abertas'),
+            func.count().filter(baixadas).label(f'qtd_{tipo.value}_baixadas'),
+            func.coalesce(func.sum(ContaPagarReceber.valor_baixa).filter(baixadas), 0).label(f'valor_{tipo.value}_baixadas'),
+        ]
     
-    return db.query(ContaPagarReceber).filter_by(id_fornecedor_cliente=id_fornecedor_cliente).all()
\ No newline at end of file
+    return select(fornecedores.c.id, fornecedores.c.nome, *colunas) \
+            .select_from(fornecedores.outerjoin(ContaPagarReceber, and_(*juncao))) \
+            .group_by(fornecedores.c.id, fornecedores.c.nome) \
+            .order_by(fornecedores.c.id)
@@ -0,0 +1,166 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from fastapi.responses import JSONResponse
+from starlette.routing import Match
+
+from shared.metricas import Histograma, MetricaColetada
+
+
+# Controle de admissão: cada rota pertence a uma classe (leve, pesada ou exportacao) com um limite de
+# requisições simultâneas e uma fila de espera limitada. Com a fila cheia, ou depois de ADMISSAO_ESPERA_MAX_S
+# na fila, a requisição recebe 503 com Retry-After na hora, em vez de todas esperarem até DB_POOL_TIMEOUT
+# por uma conexão. Os limites valem por processo e, somados, não devem passar das conexões do pool
+# (DB_POOL_SIZE + DB_MAX_OVERFLOW).
+ADMISSAO_ATIVA = os.getenv('ADMISSAO_ATIVA', 'true').lower() == 'true'
+ADMISSAO_ESPERA_MAX_S = float(os.getenv('ADMISSAO_ESPERA_MAX_S', '2'))
+ADMISSAO_RETRY_AFTER_S = int(os.getenv('ADMISSAO_RETRY_AFTER_S', '1'))
+# (limite, fila) de cada classe, trocados por ADMISSAO_LIMITE_<CLASSE> e ADMISSAO_FILA_<CLASSE>
+LIMITES_PADRAO = {'leve': (10, 100), 'pesada': (3, 12), 'exportacao': (2, 2)}
+CLASSE_PADRAO = 'leve'
+MOTIVOS_RECUSA = ('fila_cheia', 'espera_esgotada')
+
+
+class ClasseAdmissao:
+    """Limite de requisições simultâneas com fila FIFO limitada. Quem sai passa a vaga direto
+    para o primeiro da fila, que não disputa com quem acabou de chegar."""
+    
+    def __init__(self, nome: str, limite: int, fila_max: int):
+        self.nome = nome
+        self.limite = limite
+        self.fila_max = fila_max
+        self.em_andamento = 0
+        self.admitidas = 0
+        self.recusadas = dict.fromkeys(MOTIVOS_RECUSA, 0)
+        self._fila = deque()
+    
+    @property
+    def na_fila(self) -> int:
+        return len(self._fila)
+    
+    async def entrar(self) -> Optional[str]:
+        """Ocupa uma vaga, esperando na fila se preciso. Retorna None quando admitida, ou o motivo da recusa."""
+        motivo = await self._esperar_vaga()
+        if motivo is None:
+            self.admitidas += 1
+        else:
+            self.recusadas[motivo] += 1
+        return motivo
+    
+    async def _esperar_vaga(self) -> Optional[str]:
+        if self.em_andamento < self.limite and not self._fila:
+            self.em_andamento += 1
+            return None
+        if len(self._fila) >= self.fila_max:
+            return 'fila_cheia'
+        
+        vaga = asyncio.get_running_loop().create_future()
+        self._fila.append(vaga)
+        try:
+            await asyncio.wait_for(asyncio.shield(vaga), ADMISSAO_ESPERA_MAX_S)
+        except asyncio.TimeoutError:
+            # a vaga pode ter chegado junto com o fim da espera: nesse caso a requisição segue
+            if not vaga.done():
+                self._fila.remove(vaga)
+                return 'espera_esgotada'
+        except asyncio.CancelledError:
+            if vaga.done():
+                self.sair()
+            else:
+                self._fila.remove(vaga)
+            raise
+        return None
+    
+    def sair(self) -> None:
+        if self._fila:
+            self._fila.popleft().set_result(None)
+        else:
+            self.em_andamento -= 1
+    
+    def estatisticas(self) -> dict:
+        return {
+            'limite': self.limite,
+            'fila_max': self.fila_max,
+            'em_andamento': self.em_andamento,
+            'na_fila': self.na_fila,
+            'admitidas': self.admitidas,
+            'recusadas': dict(self.recusadas),
+        }
+
+
+def criar_classe(nome: str, limite: int, fila_max: int) -> ClasseAdmissao:
+    return ClasseAdmissao(nome, int(os.getenv(f'ADMISSAO_LIMITE_{nome.upper()}', str(limite))),
+                          int(os.getenv(f'ADMISSAO_FILA_{nome.upper()}', str(fila_max))))
+
+classes_admissao: Dict[str, ClasseAdmissao] = {nome: criar_classe(nome, *limites) for nome, limites in LIMITES_PADRAO.items()}
+
+espera_admissao = Histograma('admissao_espera_segundos', 'Tempo na fila de admissão das requisições admitidas', ('classe',))
+MetricaColetada('admissao_em_andamento', 'Requisições admitidas em andamento por classe', 'gauge',
+                lambda: [((classe.nome,), classe.em_andamento) for classe in classes_admissao.values()], rotulos=('classe',))
+MetricaColetada('admissao_fila', 'Requisições esperando admissão por classe', 'gauge',
+                lambda: [((classe.nome,), classe.na_fila) for classe in classes_admissao.values()], rotulos=('classe',))
+MetricaColetada('admissao_limite', 'Requisições simultâneas permitidas por classe', 'gauge',
+                lambda: [((classe.nome,), classe.limite) for classe in classes_admissao.values()], rotulos=('classe',))
+MetricaColetada('admissao_recusas_total', 'Requisições recusadas com 503 por classe e motivo', 'counter',
+                lambda: [((classe.nome, motivo), quantidade) for classe in classes_admissao.values()
+                         for motivo, quantidade in classe.recusadas.items()],
+                rotulos=('classe', 'motivo'))
+
+def classe_admissao(classe: Optional[str]):
+    """Define a classe de admissão do endpoint; None o deixa fora do controle (monitoramento)."""
+    if classe is not None and classe not in classes_admissao:
+        raise ValueError(f'Classe de admissão desconhecida: {classe}')
+    
+    def definir(endpoint):
+        endpoint.classe_admissao = classe
+        return endpoint
+    return definir
+
+def endpoint_da_rota(scope):
+    for rota in scope['app'].routes:
+        correspondencia, _ = rota.matches(scope)
+        if correspondencia == Match.FULL:
+            return getattr(rota, 'endpoint', None)
+    return None
+
+def estatisticas_admissao() -> dict:
+    return {nome: classe.estatisticas() for nome, classe in classes_admissao.items()}
+
+
+class MiddlewareAdmissao:
+    """Middleware ASGI que aplica o controle de admissão pela classe do endpoint (CLASSE_PADRAO quando
+    ele não tem @classe_admissao). Caminhos sem rota, que não chegam ao banco, passam direto. A vaga
+    só é liberada depois do último bloco do corpo, o que inclui exportações em streaming."""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not ADMISSAO_ATIVA:
+            await self.app(scope, receive, send)
+            return
+        
+        endpoint = endpoint_da_rota(scope)
+        classe = classes_admissao.get(getattr(endpoint, 'classe_admissao', CLASSE_PADRAO)) if endpoint else None
+        if classe is None:
+            await self.app(scope, receive, send)
+            return
+        
+        # o roteador grava o mesmo endpoint depois; antecipá-lo põe as recusas na rota certa em /metrics
+        scope['endpoint'] = endpoint
+        inicio = time.perf_counter()
+        motivo = await classe.entrar()
+        if motivo is not None:
+            resposta = JSONResponse(status_code=503, headers={'Retry-After': str(ADMISSAO_RETRY_AFTER_S)},
+                                    content={'message': 'Servidor sobrecarregado, tente novamente em instantes.'})
+            await resposta(scope, receive, send)
+            return
+        
+        espera_admissao.observar(time.perf_counter() - inicio, classe.nome)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            classe.sair()
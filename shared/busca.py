@@ -0,0 +1,17 @@
+from sqlalchemy import func
+
+
+# Busca aproximada por trigramas (pg_trgm): `termo` casa com um trecho do texto parecido com ele,
+# mesmo com erros de digitação, a partir de pg_trgm.word_similarity_threshold (0.6 por padrão).
+# Termos com menos de 3 caracteres não formam trigramas completos e não usam o índice.
+TAMANHO_MINIMO_BUSCA = 3
+LIMITE_PADRAO_BUSCA = 20
+LIMITE_MAXIMO_BUSCA = 100
+
+def buscar_por_similaridade(consulta, coluna, termo: str, desempate, limit: int):
+    """Filtra `consulta` pelas linhas em que `coluna` contém um trecho parecido com `termo` (operador %>,
+    atendido pelos índices GIN gin_trgm_ops) e ordena da mais para a menos parecida, desempatando
+    por `desempate`."""
+    return consulta.where(coluna.op('%>')(termo)) \
+            .order_by(func.word_similarity(termo, coluna).desc(), desempate) \
+            .limit(limit)
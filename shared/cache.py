@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import asyncpg
+from sqlalchemy import func, select
+
+from shared.database import DATABASE_URL
+
+
+CACHE_FORNECEDOR_TAMANHO = int(os.getenv('CACHE_FORNECEDOR_TAMANHO', '1024'))
+CACHE_FORNECEDOR_TTL = float(os.getenv('CACHE_FORNECEDOR_TTL', '60'))
+# Com vários workers, cada escrita publica um NOTIFY e os demais processos descartam a chave.
+# Exige conexão direta ao PostgreSQL (LISTEN não funciona pelo PgBouncer em modo transaction).
+CACHE_INVALIDACAO_NOTIFY = os.getenv('CACHE_INVALIDACAO_NOTIFY', 'false').lower() == 'true'
+CANAL_INVALIDACAO = 'cache_invalidacao'
+# Espera entre tentativas de reconectar o LISTEN, dobrando a cada falha até o máximo
+CACHE_RECONEXAO_ESPERA_MIN_S = float(os.getenv('CACHE_RECONEXAO_ESPERA_MIN_S', '0.5'))
+CACHE_RECONEXAO_ESPERA_MAX_S = float(os.getenv('CACHE_RECONEXAO_ESPERA_MAX_S', '30'))
+
+logger = logging.getLogger(__name__)
+caches: Dict[str, 'Cache'] = {}
+
+
+class BackendCache(ABC):
+    """Armazenamento usado por um Cache. Um backend compartilhado entre workers (Redis,
+    memcached...) pode substituir o BackendMemoriaLRU sem mudar quem usa o cache."""
+    
+    @abstractmethod
+    async def obter(self, chave: str) -> Optional[Any]:
+        ...
+    
+    @abstractmethod
+    async def gravar(self, chave: str, valor: Any) -> None:
+        ...
+    
+    @abstractmethod
+    async def remover(self, chave: str) -> None:
+        ...
+    
+    @abstractmethod
+    async def limpar(self) -> None:
+        ...
+
+class BackendMemoriaLRU(BackendCache):
+    """Backend em memória do processo, limitado a `tamanho_maximo` chaves (descarta a menos
+    usada) e com expiração de `ttl` segundos por chave."""
+    
+    def __init__(self, tamanho_maximo: int, ttl: float):
+        self.tamanho_maximo = tamanho_maximo
+        self.ttl = ttl
+        self._itens = OrderedDict()
+    
+    async def obter(self, chave: str) -> Optional[Any]:
+        item = self._itens.get(chave)
+        if item is None:
+            return None
+        
+        expira_em, valor = item
+        if expira_em < time.monotonic():
+            del self._itens[chave]
+            return None
+        
+        self._itens.move_to_end(chave)
+        return valor
+    
+    async def gravar(self, chave: str, valor: Any) -> None:
+        self._itens[chave] = (time.monotonic() + self.ttl, valor)
+        self._itens.move_to_end(chave)
+        
+        while len(self._itens) > self.tamanho_maximo:
+            self._itens.popitem(last=False)
+    
+    async def remover(self, chave: str) -> None:
+        self._itens.pop(chave, None)
+    
+    async def limpar(self) -> None:
+        self._itens.clear()
+    
+    def __len__(self) -> int:
+        return len(self._itens)
+
+class Cache:
+    """Cache nomeado com contadores de acertos e falhas."""
+    
+    def __init__(self, nome: str, backend: BackendCache):
+        self.nome = nome
+        self.backend = backend
+        self.acertos = 0
+        self.falhas = 0
+        self.invalidacoes = 0
+        caches[nome] = self
+    
+    async def obter(self, chave) -> Optional[Any]:
+        valor = await self.backend.obter(str(chave))
+        
+        if valor is None:
+            self.falhas += 1
+        else:
+            self.acertos += 1
+        
+        return valor
+    
+    async def gravar(self, chave, valor: Any) -> None:
+        await self.backend.gravar(str(chave), valor)
+    
+    async def invalidar(self, chave) -> None:
+        self.invalidacoes += 1
+        await self.backend.remover(str(chave))
+    
+    async def limpar(self) -> None:
+        await self.backend.limpar()
+    
+    async def publicar_invalidacao(self, db, chave) -> None:
+        """Agenda, na transação de `db`, o aviso aos outros workers; o NOTIFY só é entregue no commit."""
+        if CACHE_INVALIDACAO_NOTIFY:
+            await db.execute(select(func.pg_notify(CANAL_INVALIDACAO, ouvinte_invalidacao.aviso(self.nome, chave))))
+    
+    def estatisticas(self) -> dict:
+        estatisticas = {
+            'acertos': self.acertos,
+            'falhas': self.falhas,
+            'invalidacoes': self.invalidacoes,
+        }
+        if isinstance(self.backend, BackendMemoriaLRU):
+            estatisticas['itens'] = len(self.backend)
+        
+        return estatisticas
+
+
+def novo_id_processo() -> str:
+    return f'{os.getpid()}-{uuid.uuid4().hex}'
+
+
+class OuvinteInvalidacao:
+    """Mantém uma conexão dedicada em LISTEN e descarta do cache local as chaves
+    invalidadas por outros processos. Se a conexão cair, reconecta em segundo plano e, ao
+    conseguir, esvazia os caches locais: os avisos enviados durante a queda se perderam."""
+    
+    def __init__(self):
+        self.id_processo = novo_id_processo()
+        self._conexao = None
+        self._reconexao: Optional[asyncio.Task] = None
+        self._ativo = False
+    
+    async def iniciar(self) -> None:
+        # gerado de novo em cada worker: com preload_app o módulo é importado no mestre do gunicorn,
+        # e um id da importação seria o mesmo em todos os workers, que ignorariam os avisos uns dos outros
+        self.id_processo = novo_id_processo()
+        self._ativo = True
+        await self._conectar()
+    
+    def aviso(self, nome_cache: str, chave) -> str:
+        return f'{self.id_processo}:{nome_cache}:{chave}'
+    
+    async def parar(self) -> None:
+        self._ativo = False
+        if self._reconexao is not None:
+            self._reconexao.cancel()
+            await asyncio.gather(self._reconexao, return_exceptions=True)
+            self._reconexao = None
+        
+        if self._conexao is not None:
+            self._conexao.remove_termination_listener(self._conexao_encerrada)
+            await self._conexao.close()
+            self._conexao = None
+    
+    async def _conectar(self) -> None:
+        conexao = await asyncpg.connect(DATABASE_URL)
+        await conexao.add_listener(CANAL_INVALIDACAO, self._receber)
+        conexao.add_termination_listener(self._conexao_encerrada)
+        self._conexao = conexao
+    
+    def _conexao_encerrada(self, conexao) -> None:
+        self._conexao = None
+        if self._ativo and self._reconexao is None:
+            logger.warning('Conexão de invalidação do cache encerrada, reconectando')
+            self._reconexao = asyncio.ensure_future(self._reconectar())
+    
+    async def _reconectar(self) -> None:
+        espera = CACHE_RECONEXAO_ESPERA_MIN_S
+        while True:
+            await asyncio.sleep(espera)
+            try:
+                await self._conectar()
+                break
+            except Exception:
+                espera = min(espera * 2, CACHE_RECONEXAO_ESPERA_MAX_S)
+                logger.warning('Falha ao reconectar a invalidação do cache, nova tentativa em %g s', espera, exc_info=True)
+        
+        for cache in caches.values():
+            await cache.limpar()
+        logger.warning('Invalidação do cache reconectada; caches locais esvaziados')
+        self._reconexao = None
+    
+    def _receber(self, conexao, pid, canal, payload: str) -> None:
+        processo, nome, chave = payload.split(':', 2)
+        cache = caches.get(nome)
+        
+        if processo != self.id_processo and cache is not None:
+            asyncio.ensure_future(cache.invalidar(chave))
+
+ouvinte_invalidacao = OuvinteInvalidacao()
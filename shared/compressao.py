@@ -0,0 +1,114 @@
+import os
+import zlib
+from typing import Optional
+
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+
+
+# Respostas JSON, NDJSON e CSV a partir de COMPRESSAO_MINIMO_BYTES são comprimidas com brotli ou gzip,
+# conforme o Accept-Encoding do cliente. Respostas em streaming são comprimidas bloco a bloco, cada um
+# enviado assim que fica pronto. Os níveis são os de menor custo de CPU por byte economizado em
+# respostas geradas na hora, não os de maior compressão.
+COMPRESSAO_ATIVA = os.getenv('COMPRESSAO_ATIVA', 'true').lower() == 'true'
+COMPRESSAO_MINIMO_BYTES = int(os.getenv('COMPRESSAO_MINIMO_BYTES', '1024'))
+COMPRESSAO_NIVEL_GZIP = int(os.getenv('COMPRESSAO_NIVEL_GZIP', '6'))
+COMPRESSAO_QUALIDADE_BROTLI = int(os.getenv('COMPRESSAO_QUALIDADE_BROTLI', '4'))
+TIPOS_COMPRIMIVEIS = ('application/json', 'application/x-ndjson', 'text/')
+# no empate de q, a primeira da lista
+CODIFICACOES = ('br', 'gzip')
+
+def codificacao_aceita(accept_encoding: str) -> Optional[str]:
+    """Escolhe br ou gzip pelo Accept-Encoding, respeitando os pesos q (q=0 recusa)."""
+    pesos = {}
+    for item in accept_encoding.split(','):
+        nome, _, parametro = item.partition(';')
+        chave, _, valor = parametro.strip().partition('=')
+        try:
+            pesos[nome.strip().lower()] = float(valor) if chave.strip() == 'q' else 1.0
+        except ValueError:
+            pesos[nome.strip().lower()] = 0.0
+    
+    peso_padrao = pesos.get('*', 0.0)
+    candidatas = [(pesos.get(codificacao, peso_padrao), codificacao) for codificacao in CODIFICACOES]
+    peso, codificacao = max(candidatas, key=lambda candidata: candidata[0])
+    return codificacao if peso > 0 else None
+
+def comprimivel(cabecalhos: Headers) -> bool:
+    return 'content-encoding' not in cabecalhos and cabecalhos.get('content-type', '').startswith(TIPOS_COMPRIMIVEIS)
+
+
+class Compressor:
+    """Compressor incremental de br ou gzip: cada bloco sai completo para o cliente descomprimir,
+    e o último fecha o fluxo."""
+    
+    def __init__(self, codificacao: str, nivel_gzip: int, qualidade_brotli: int):
+        if codificacao == 'br':
+            compressor = brotli.Compressor(quality=qualidade_brotli)
+            self._comprimir, self._descarregar, self._finalizar = compressor.process, compressor.flush, compressor.finish
+        else:
+            # wbits 31: formato gzip (cabeçalho e CRC) com janela de 32 KiB
+            compressor = zlib.compressobj(nivel_gzip, zlib.DEFLATED, 31)
+            self._comprimir = compressor.compress
+            self._descarregar = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._finalizar = compressor.flush
+    
+    def bloco(self, dados: bytes, ultimo: bool) -> bytes:
+        return self._comprimir(dados) + (self._finalizar() if ultimo else self._descarregar())
+
+
+class MiddlewareCompressao:
+    """Middleware ASGI que comprime o corpo das respostas com a codificação negociada. Quem responde
+    com corpo de um só bloco abaixo de `minimo_bytes` ou com tipo não comprimível passa intacto.
+    Toda resposta de tipo comprimível leva Vary: Accept-Encoding, comprimida ou não, para que um
+    cache compartilhado não entregue a versão sem compressão a quem aceita br/gzip (ou o contrário)."""
+    
+    def __init__(self, app, minimo_bytes: int = COMPRESSAO_MINIMO_BYTES, nivel_gzip: int = COMPRESSAO_NIVEL_GZIP,
+                 qualidade_brotli: int = COMPRESSAO_QUALIDADE_BROTLI):
+        self.app = app
+        self.minimo_bytes = minimo_bytes
+        self.nivel_gzip = nivel_gzip
+        self.qualidade_brotli = qualidade_brotli
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        
+        codificacao = codificacao_aceita(Headers(scope=scope).get('accept-encoding', ''))
+        inicio = None
+        compressor = None
+        
+        async def enviar(mensagem):
+            nonlocal inicio, compressor
+            if mensagem['type'] == 'http.response.start':
+                # o início só é enviado com o primeiro bloco, quando se sabe o tamanho do corpo
+                inicio = mensagem
+                return
+            if mensagem['type'] != 'http.response.body':
+                await send(mensagem)
+                return
+            
+            corpo = mensagem.get('body', b'')
+            mais = mensagem.get('more_body', False)
+            if inicio is not None:
+                inicio['headers'] = list(inicio.get('headers', []))
+                cabecalhos = MutableHeaders(raw=inicio['headers'])
+                if comprimivel(cabecalhos):
+                    cabecalhos.add_vary_header('Accept-Encoding')
+                    if codificacao is not None and (mais or len(corpo) >= self.minimo_bytes):
+                        compressor = Compressor(codificacao, self.nivel_gzip, self.qualidade_brotli)
+                        corpo = compressor.bloco(corpo, ultimo=not mais)
+                        cabecalhos['Content-Encoding'] = codificacao
+                        if mais:
+                            del cabecalhos['Content-Length']
+                        else:
+                            cabecalhos['Content-Length'] = str(len(corpo))
+                await send(inicio)
+                inicio = None
+            elif compressor is not None:
+                corpo = compressor.bloco(corpo, ultimo=not mais)
+            
+            await send({'type': 'http.response.body', 'body': corpo, 'more_body': mais})
+        
+        await self.app(scope, receive, enviar)
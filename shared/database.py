@@ -1,7 +1,11 @@
 import os
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import NullPool
+
+from shared.pool import PoolAssincronoInstrumentado, PoolInstrumentado
 
 
 load_dotenv()
@@ -12,8 +16,53 @@ DB_HOST = os.getenv('DB_HOST')
 DB_PORT = os.getenv('DB_PORT')
 DB_NAME = os.getenv('DB_NAME')
 
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '-1'))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+# Atrás do PgBouncer em modo transaction o pool fica a cargo dele: sem pool local
+# e sem cache de prepared statements, que não sobrevivem à troca de conexão no servidor
+DB_PGBOUNCER = os.getenv('DB_PGBOUNCER', 'false').lower() == 'true'
+# Réplicas de leitura (streaming replication), como "host:porta,host:porta", com o mesmo usuário,
+# senha e banco do primário. Sem réplicas, todas as requisições usam o primário.
+DB_REPLICAS = [endereco.strip() for endereco in os.getenv('DB_REPLICAS', '').split(',') if endereco.strip()]
+# Segundos para desistir de conectar numa réplica fora do ar e usar o primário
+DB_REPLICA_TIMEOUT_CONEXAO = float(os.getenv('DB_REPLICA_TIMEOUT_CONEXAO', '2'))
+
 DATABASE_URL = f'postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
+ASYNC_DATABASE_URL = f'postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
+
+def opcoes_engine(assincrona: bool) -> dict:
+    if DB_PGBOUNCER:
+        opcoes = {'poolclass': NullPool}
+        if assincrona:
+            opcoes['connect_args'] = {'statement_cache_size': 0, 'prepared_statement_cache_size': 0}
+        return opcoes
+    
+    return {
+        'poolclass': PoolAssincronoInstrumentado if assincrona else PoolInstrumentado,
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': DB_POOL_PRE_PING,
+    }
 
-engine = create_engine(DATABASE_URL)
+engine = create_engine(DATABASE_URL, **opcoes_engine(assincrona=False))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
\ No newline at end of file
+
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **opcoes_engine(assincrona=True))
+# expire_on_commit=False: após o commit os atributos continuam acessíveis sem nova ida ao banco,
+# o que é obrigatório numa sessão assíncrona (não há carregamento implícito)
+AsyncSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=async_engine,
+                                 class_=AsyncSession, expire_on_commit=False)
+
+def criar_engine_replica(endereco: str):
+    opcoes = opcoes_engine(assincrona=True)
+    opcoes['connect_args'] = {**opcoes.get('connect_args', {}), 'timeout': DB_REPLICA_TIMEOUT_CONEXAO}
+    return create_async_engine(f'postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{endereco}/{DB_NAME}', **opcoes)
+
+# As sessões de leitura usam AsyncSessionLocal(bind=<engine da réplica>), ver shared/replicas.py
+async_engines_replicas = {endereco: criar_engine_replica(endereco) for endereco in DB_REPLICAS}
+Base = declarative_base()
@@ -1,4 +1,7 @@
-from shared.database import SessionLocal
+from fastapi import Request
+
+from shared.database import AsyncSessionLocal, SessionLocal
+from shared.replicas import abrir_sessao_replica, lsn_da_requisicao, usa_replicas
 
 
 def get_db():
@@ -6,4 +9,16 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db(request: Request):
+    # leituras vão para uma réplica quando há alguma disponível e em dia com as escritas do cliente
+    db = await abrir_sessao_replica(lsn_da_requisicao(request)) if usa_replicas(request) else None
+    if db is None:
+        db = AsyncSessionLocal()
+        request.state.db_primario = db
+    
+    try:
+        yield db
+    finally:
+        await db.close()
@@ -16,5 +16,33 @@ class MonthlyAccountLimitExceededException(Exception):
     """Exceção lançada quando o limite de contas criadas em um mês é excedido."""
     
     def __init__(self, message="Limite máximo de contas criadas neste mês foi atingido."):
+        self.message = message
+        super().__init__(self.message)
+
+class InvalidBulkPayload(Exception):
+    """Exceção lançada quando o corpo de uma importação em lote não pode ser lido."""
+    
+    def __init__(self, message="Corpo da importação deve ser uma lista JSON ou NDJSON de contas."):
+        self.message = message
+        super().__init__(self.message)
+
+class InvalidCursor(Exception):
+    """Exceção lançada quando o cursor de paginação (`after`) não corresponde à ordenação pedida."""
+    
+    def __init__(self, message="Cursor de paginação inválido para a ordenação informada."):
+        self.message = message
+        super().__init__(self.message)
+
+class InvalidPeriod(Exception):
+    """Exceção lançada quando o fim de um período consultado é anterior ao início."""
+    
+    def __init__(self, message="A data de fim do período deve ser igual ou posterior à data de início."):
+        self.message = message
+        super().__init__(self.message)
+
+class InvalidFields(Exception):
+    """Exceção lançada quando `fields` pede um campo que a resposta de contas não tem."""
+    
+    def __init__(self, message="fields deve listar, separados por vírgula, campos de ContaPagarReceberResponse."):
         self.message = message
         super().__init__(self.message)
\ No newline at end of file
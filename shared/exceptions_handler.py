@@ -1,7 +1,8 @@
 from fastapi import Request
 from fastapi.responses import JSONResponse
 
-from shared.exceptions import ContaNotFound, FornecedorNotFound, MonthlyAccountLimitExceededException
+from shared.exceptions import ContaNotFound, FornecedorNotFound, InvalidBulkPayload, InvalidCursor, InvalidFields, InvalidPeriod, \
+                              MonthlyAccountLimitExceededException
 
 
 async def conta_not_found_handler(request: Request, exc: ContaNotFound):
@@ -20,4 +21,28 @@ async def monthly_account_limit_exceeded_handler(request: Request, exc: MonthlyA
     return JSONResponse(
         status_code=404,
         content={'message': exc.message}
+    )
+
+async def invalid_bulk_payload_handler(request: Request, exc: InvalidBulkPayload):
+    return JSONResponse(
+        status_code=422,
+        content={'message': exc.message}
+    )
+
+async def invalid_cursor_handler(request: Request, exc: InvalidCursor):
+    return JSONResponse(
+        status_code=422,
+        content={'message': exc.message}
+    )
+
+async def invalid_period_handler(request: Request, exc: InvalidPeriod):
+    return JSONResponse(
+        status_code=422,
+        content={'message': exc.message}
+    )
+
+async def invalid_fields_handler(request: Request, exc: InvalidFields):
+    return JSONResponse(
+        status_code=422,
+        content={'message': exc.message}
     )
\ No newline at end of file
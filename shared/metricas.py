@@ -0,0 +1,254 @@
+import logging
+import os
+import re
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from shared.pool import estatisticas_pool
+
+
+# Métricas de requisição e de SQL ficam sempre ativas por padrão: cada observação é só
+# um incremento em dict, sem locks nem chamadas de rede.
+METRICAS_ATIVAS = os.getenv('METRICAS_ATIVAS', 'true').lower() == 'true'
+DB_CONSULTA_LENTA_MS = float(os.getenv('DB_CONSULTA_LENTA_MS', '500'))
+
+BUCKETS_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_COMANDOS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+OPERACOES_SQL = {'SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH'}
+PRIMEIRA_PALAVRA = re.compile(r'\s*(\w+)')
+
+logger = logging.getLogger(__name__)
+metricas: List['Metrica'] = []
+
+
+class Metrica(ABC):
+    """Série no formato de exposição do Prometheus, com um valor por combinação de rótulos."""
+    
+    tipo = 'untyped'
+    
+    def __init__(self, nome: str, ajuda: str, rotulos: Tuple[str, ...] = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        metricas.append(self)
+    
+    @abstractmethod
+    def amostras(self) -> Iterable[Tuple[str, tuple, float]]:
+        """Retorna (sufixo do nome, pares (rótulo, valor), valor da amostra)."""
+    
+    def exportar(self) -> str:
+        linhas = [f'# HELP {self.nome} {self.ajuda}', f'# TYPE {self.nome} {self.tipo}']
+        for sufixo, rotulos, valor in self.amostras():
+            linhas.append(f'{self.nome}{sufixo}{formatar_rotulos(rotulos)} {formatar_valor(valor)}')
+        return '\n'.join(linhas)
+
+class Contador(Metrica):
+    tipo = 'counter'
+    
+    def __init__(self, nome: str, ajuda: str, rotulos: Tuple[str, ...] = ()):
+        super().__init__(nome, ajuda, rotulos)
+        self._valores: Dict[tuple, float] = {}
+    
+    def inc(self, *valores_rotulos, valor: float = 1) -> None:
+        self._valores[valores_rotulos] = self._valores.get(valores_rotulos, 0) + valor
+    
+    def amostras(self):
+        for valores_rotulos, valor in self._valores.items():
+            yield '', tuple(zip(self.rotulos, valores_rotulos)), valor
+
+class Medidor(Contador):
+    tipo = 'gauge'
+    
+    def dec(self, *valores_rotulos, valor: float = 1) -> None:
+        self.inc(*valores_rotulos, valor=-valor)
+
+class Histograma(Metrica):
+    tipo = 'histogram'
+    
+    def __init__(self, nome: str, ajuda: str, rotulos: Tuple[str, ...] = (), buckets: tuple = BUCKETS_LATENCIA):
+        super().__init__(nome, ajuda, rotulos)
+        self.buckets = buckets
+        # por série: contagem de cada bucket (sem acumular, o último é +Inf) seguida da soma
+        self._series: Dict[tuple, list] = {}
+    
+    def observar(self, valor: float, *valores_rotulos) -> None:
+        serie = self._series.get(valores_rotulos)
+        if serie is None:
+            serie = self._series[valores_rotulos] = [0] * (len(self.buckets) + 2)
+        
+        serie[bisect_left(self.buckets, valor)] += 1
+        serie[-1] += valor
+    
+    def amostras(self):
+        for valores_rotulos, serie in self._series.items():
+            rotulos = tuple(zip(self.rotulos, valores_rotulos))
+            acumulado = 0
+            for limite, contagem in zip(self.buckets + (float('inf'),), serie):
+                acumulado += contagem
+                yield '_bucket', rotulos + (('le', formatar_valor(limite)),), acumulado
+            yield '_count', rotulos, acumulado
+            yield '_sum', rotulos, serie[-1]
+
+class MetricaColetada(Metrica):
+    """Métrica lida na hora da exportação, a partir de `coletor()` -> [(valores dos rótulos, valor)]."""
+    
+    def __init__(self, nome: str, ajuda: str, tipo: str, coletor: Callable[[], Iterable[Tuple[tuple, float]]],
+                 rotulos: Tuple[str, ...] = ()):
+        super().__init__(nome, ajuda, rotulos)
+        self.tipo = tipo
+        self.coletor = coletor
+    
+    def amostras(self):
+        for valores_rotulos, valor in self.coletor():
+            yield '', tuple(zip(self.rotulos, valores_rotulos)), valor
+
+
+def formatar_valor(valor: float) -> str:
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+def escapar_rotulo(valor) -> str:
+    return str(valor).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def formatar_rotulos(rotulos: tuple) -> str:
+    if not rotulos:
+        return ''
+    return '{' + ','.join(f'{nome}="{escapar_rotulo(valor)}"' for nome, valor in rotulos) + '}'
+
+def exportar_prometheus() -> str:
+    return '\n'.join(metrica.exportar() for metrica in metricas) + '\n'
+
+
+requisicoes_http = Contador('http_requisicoes_total', 'Requisições HTTP atendidas', ('metodo', 'rota', 'status'))
+duracao_requisicao_http = Histograma('http_requisicao_duracao_segundos', 'Duração das requisições HTTP, até o fim do corpo',
+                                     ('metodo', 'rota'))
+requisicoes_em_andamento = Medidor('http_requisicoes_em_andamento', 'Requisições HTTP sendo atendidas agora')
+comandos_sql = Contador('db_comandos_total', 'Comandos SQL executados', ('operacao',))
+duracao_comando_sql = Histograma('db_comando_duracao_segundos', 'Duração dos comandos SQL no banco', ('operacao',))
+consultas_lentas = Contador('db_consultas_lentas_total', f'Comandos SQL acima de {DB_CONSULTA_LENTA_MS:g} ms', ('operacao',))
+comandos_por_requisicao = Histograma('db_comandos_por_requisicao', 'Comandos SQL executados por requisição HTTP',
+                                     ('rota',), buckets=BUCKETS_COMANDOS)
+tempo_sql_por_requisicao = Histograma('db_tempo_sql_por_requisicao_segundos', 'Tempo total em SQL por requisição HTTP',
+                                      ('rota',))
+
+
+class EstatisticasRequisicao:
+    """Acumula os comandos SQL da requisição em andamento (compartilhada via ContextVar)."""
+    
+    __slots__ = ('caminho', 'comandos', 'tempo_sql')
+    
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self.comandos = 0
+        self.tempo_sql = 0.0
+
+estatisticas_requisicao: ContextVar[Optional[EstatisticasRequisicao]] = ContextVar('estatisticas_requisicao', default=None)
+
+
+def operacao_sql(comando: str) -> str:
+    palavra = PRIMEIRA_PALAVRA.match(comando)
+    operacao = palavra.group(1).upper() if palavra else ''
+    return operacao if operacao in OPERACOES_SQL else 'OUTRO'
+
+def redigir_parametros(parametros) -> str:
+    """Descreve os parâmetros de um comando sem expor valores: só os tipos (ou a quantidade, em executemany)."""
+    if isinstance(parametros, dict):
+        return str({chave: type(valor).__name__ for chave, valor in parametros.items()})
+    if isinstance(parametros, (list, tuple)):
+        if parametros and isinstance(parametros[0], (list, tuple, dict)):
+            return f'<{len(parametros)} conjuntos de parâmetros>'
+        return str([type(valor).__name__ for valor in parametros])
+    return type(parametros).__name__
+
+def instrumentar_engine(engine) -> None:
+    """Cronometra cada comando executado por `engine` (síncrona; para AsyncEngine use `.sync_engine`)
+    e registra em log os que passam de DB_CONSULTA_LENTA_MS, sem os valores dos parâmetros."""
+    if not METRICAS_ATIVAS:
+        return
+    
+    @event.listens_for(engine, 'before_cursor_execute')
+    def iniciar_comando(conn, cursor, statement, parameters, context, executemany):
+        context._inicio_comando = time.perf_counter()
+    
+    @event.listens_for(engine, 'after_cursor_execute')
+    def finalizar_comando(conn, cursor, statement, parameters, context, executemany):
+        duracao = time.perf_counter() - context._inicio_comando
+        operacao = operacao_sql(statement)
+        comandos_sql.inc(operacao)
+        duracao_comando_sql.observar(duracao, operacao)
+        
+        estatisticas = estatisticas_requisicao.get()
+        if estatisticas is not None:
+            estatisticas.comandos += 1
+            estatisticas.tempo_sql += duracao
+        
+        if duracao * 1000 >= DB_CONSULTA_LENTA_MS:
+            consultas_lentas.inc(operacao)
+            logger.warning('Consulta lenta (%.1f ms) em %s: %s parametros=%s',
+                           duracao * 1000, estatisticas.caminho if estatisticas else '-',
+                           statement, redigir_parametros(parameters))
+
+def registrar_metricas_pool(engine) -> None:
+    def valor(chave: str):
+        return lambda: [((), estatisticas_pool(engine).get(chave, 0))]
+    
+    MetricaColetada('db_pool_conexoes', 'Conexões do pool por estado', 'gauge',
+                    lambda: [((estado,), estatisticas_pool(engine).get(estado, 0))
+                             for estado in ('em_uso', 'ociosas', 'overflow')],
+                    rotulos=('estado',))
+    MetricaColetada('db_pool_tamanho', 'Tamanho configurado do pool', 'gauge', valor('tamanho'))
+    MetricaColetada('db_pool_checkouts_total', 'Conexões retiradas do pool', 'counter', valor('checkouts'))
+    MetricaColetada('db_pool_timeouts_total', 'Checkouts que estouraram DB_POOL_TIMEOUT', 'counter', valor('timeouts'))
+    MetricaColetada('db_pool_espera_segundos_total', 'Tempo total esperando conexão livre', 'counter',
+                    valor('tempo_espera_total_s'))
+    MetricaColetada('db_pool_espera_max_segundos', 'Maior espera por conexão livre', 'gauge', valor('tempo_espera_max_s'))
+
+
+class MiddlewareMetricas:
+    """Middleware ASGI que mede duração e status de cada requisição HTTP por rota (o template,
+    como /contas-pagar-receber/{id_conta}, para não criar uma série por id) e o SQL que ela executou."""
+    
+    def __init__(self, app):
+        self.app = app
+        self._rotas = None
+    
+    def rota(self, scope) -> str:
+        if self._rotas is None:
+            self._rotas = {getattr(rota, 'endpoint', None): rota.path for rota in scope['app'].routes}
+        return self._rotas.get(scope.get('endpoint'), 'nao_encontrada')
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not METRICAS_ATIVAS:
+            await self.app(scope, receive, send)
+            return
+        
+        status = 500
+        
+        async def enviar(mensagem):
+            nonlocal status
+            if mensagem['type'] == 'http.response.start':
+                status = mensagem['status']
+            await send(mensagem)
+        
+        estatisticas = EstatisticasRequisicao(scope['path'])
+        token = estatisticas_requisicao.set(estatisticas)
+        requisicoes_em_andamento.inc()
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            duracao = time.perf_counter() - inicio
+            requisicoes_em_andamento.dec()
+            estatisticas_requisicao.reset(token)
+            
+            rota = self.rota(scope)
+            requisicoes_http.inc(scope['method'], rota, str(status))
+            duracao_requisicao_http.observar(duracao, scope['method'], rota)
+            comandos_por_requisicao.observar(estatisticas.comandos, rota)
+            tempo_sql_por_requisicao.observar(estatisticas.tempo_sql, rota)
@@ -0,0 +1,79 @@
+import os
+from datetime import date
+from typing import List, Set
+
+from sqlalchemy import text
+
+from shared.versoes import TABELA_CONTAS, chave_previsao, registrar_alteracao
+
+
+# tbl_contas é particionada por ano de data_previsao (tbl_contas_2024, ...), com tbl_contas_padrao
+# recebendo as datas de anos que ainda não têm partição. A manutenção cria as partições do ano
+# corrente e dos PARTICOES_ANOS_A_FRENTE seguintes, na inicialização e pelo manage.py.
+PARTICOES_ANOS_A_FRENTE = int(os.getenv('PARTICOES_ANOS_A_FRENTE', '2'))
+PARTICOES_CRIAR_NA_INICIALIZACAO = os.getenv('PARTICOES_CRIAR_NA_INICIALIZACAO', 'true').lower() == 'true'
+PARTICAO_PADRAO = 'tbl_contas_padrao'
+# chave do pg_advisory_xact_lock que serializa a manutenção entre workers
+TRAVA_PARTICOES = 7317001
+
+def nome_particao(ano: int) -> str:
+    return f'tbl_contas_{ano:04d}'
+
+async def anos_com_particao(db) -> Set[int]:
+    consulta = text("""
+        SELECT substring(filha.relname FROM '^tbl_contas_([0-9]{4})$')::integer
+        FROM pg_inherits
+        JOIN pg_class filha ON filha.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = 'tbl_contas'::regclass
+          AND filha.relname ~ '^tbl_contas_[0-9]{4}$'
+    """)
+    return {ano for ano, in await db.execute(consulta)}
+
+async def criar_particao_contas(db, ano: int) -> None:
+    """Cria a partição do ano levando para ela as contas que já estavam na partição padrão.
+    A tabela é montada fora do pai e anexada no fim: o ATTACH só bloqueia escritas na partição
+    padrão (que ele precisa varrer), não em tbl_contas inteira. Se a tabela do ano já existir,
+    desanexada por desanexar_particao_contas, ela é reanexada com o que tiver."""
+    particao = nome_particao(ano)
+    inicio, fim = f"'{ano:04d}-01-01'", f"'{ano + 1:04d}-01-01'"
+    
+    await db.execute(text(f'CREATE TABLE IF NOT EXISTS {particao} (LIKE tbl_contas INCLUDING DEFAULTS)'))
+    await db.execute(text(f'WITH movidas AS (DELETE FROM {PARTICAO_PADRAO} '
+                          f'WHERE data_previsao >= {inicio} AND data_previsao < {fim} RETURNING *) '
+                          f'INSERT INTO {particao} SELECT * FROM movidas'))
+    # com a restrição já validada o ATTACH não precisa varrer a partição nova
+    await db.execute(text(f'ALTER TABLE {particao} ADD CONSTRAINT {particao}_faixa '
+                          f'CHECK (data_previsao >= {inicio} AND data_previsao < {fim})'))
+    await db.execute(text(f'ALTER TABLE tbl_contas ATTACH PARTITION {particao} '
+                          f'FOR VALUES FROM ({inicio}) TO ({fim})'))
+    await db.execute(text(f'ALTER TABLE {particao} DROP CONSTRAINT {particao}_faixa'))
+
+async def garantir_particoes_contas(db, ano_inicial: int, ano_final: int) -> List[int]:
+    """Cria as partições que faltam entre ano_inicial e ano_final (inclusive) e retorna os anos criados.
+    O commit fica a cargo de quem chama."""
+    await db.execute(text('SELECT pg_advisory_xact_lock(:chave)'), {'chave': TRAVA_PARTICOES})
+    
+    existentes = await anos_com_particao(db)
+    criados = [ano for ano in range(ano_inicial, ano_final + 1) if ano not in existentes]
+    for ano in criados:
+        await criar_particao_contas(db, ano)
+    
+    return criados
+
+async def garantir_particoes_futuras(db) -> List[int]:
+    ano_atual = date.today().year
+    return await garantir_particoes_contas(db, ano_atual, ano_atual + PARTICOES_ANOS_A_FRENTE)
+
+async def desanexar_particao_contas(db, ano: int) -> str:
+    """Tira a partição do ano de tbl_contas, mantendo-a como tabela avulsa para arquivamento
+    (pg_dump, DROP...). As contas do ano deixam de aparecer em qualquer consulta; o resumo
+    mensal precisa ser reconstruído em seguida. Retorna o nome da tabela desanexada."""
+    particao = nome_particao(ano)
+    
+    await db.execute(text('SELECT pg_advisory_xact_lock(:chave)'), {'chave': TRAVA_PARTICOES})
+    # DETACH ... CONCURRENTLY não é permitido com partição padrão, então a operação bloqueia tbl_contas
+    # só pelo tempo de atualizar o catálogo
+    await db.execute(text(f'ALTER TABLE tbl_contas DETACH PARTITION {particao}'))
+    await registrar_alteracao(db, TABELA_CONTAS, chave_previsao(ano))
+    
+    return particao
@@ -0,0 +1,58 @@
+import time
+
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class EstatisticasPoolMixin:
+    """Mede quanto tempo os checkouts esperam por uma conexão livre no pool."""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.tempo_espera_total = 0.0
+        self.tempo_espera_max = 0.0
+    
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        except TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            espera = time.perf_counter() - inicio
+            self.checkouts += 1
+            self.tempo_espera_total += espera
+            self.tempo_espera_max = max(self.tempo_espera_max, espera)
+
+class PoolInstrumentado(EstatisticasPoolMixin, QueuePool):
+    pass
+
+class PoolAssincronoInstrumentado(EstatisticasPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def estatisticas_pool(engine) -> dict:
+    """Retorna o estado atual do pool de conexões de `engine` (síncrona ou assíncrona)."""
+    pool = engine.pool
+    estatisticas = {'classe': type(pool).__name__}
+    
+    if isinstance(pool, QueuePool):
+        estatisticas.update({
+            'tamanho': pool.size(),
+            'em_uso': pool.checkedout(),
+            'ociosas': pool.checkedin(),
+            'overflow': max(pool.overflow(), 0),
+        })
+    
+    if isinstance(pool, EstatisticasPoolMixin):
+        estatisticas.update({
+            'checkouts': pool.checkouts,
+            'timeouts': pool.timeouts,
+            'tempo_espera_total_s': round(pool.tempo_espera_total, 6),
+            'tempo_espera_max_s': round(pool.tempo_espera_max, 6),
+        })
+    
+    return estatisticas
@@ -0,0 +1,40 @@
+from contextlib import contextmanager
+from typing import List
+
+from sqlalchemy import event
+
+from shared.database import async_engine
+
+
+class ContadorQueries:
+    """Acumula os comandos SQL enviados ao banco enquanto o contador está ativo."""
+    
+    def __init__(self):
+        self.comandos: List[str] = []
+    
+    @property
+    def total(self) -> int:
+        return len(self.comandos)
+    
+    @property
+    def selects(self) -> int:
+        return len([c for c in self.comandos if c.lstrip().upper().startswith(('SELECT', 'WITH'))])
+
+
+@contextmanager
+def contar_queries(bind=async_engine.sync_engine):
+    """Conta os comandos executados em `bind` dentro do bloco `with`.
+    
+    Usado nos testes para garantir que um endpoint de listagem executa um número de SELECTs
+    que não cresce com o tamanho do resultado (sem N+1); ver tests/conftest.py."""
+    contador = ContadorQueries()
+    
+    def registrar_comando(conn, cursor, statement, parameters, context, executemany):
+        contador.comandos.append(statement)
+    
+    event.listen(bind, 'before_cursor_execute', registrar_comando)
+    try:
+        yield contador
+    finally:
+        event.remove(bind, 'before_cursor_execute', registrar_comando)
+
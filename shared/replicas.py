@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import os
+import re
+import time
+from itertools import count
+from typing import List, Optional
+
+from fastapi import Request
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from shared.database import AsyncSessionLocal, async_engines_replicas
+from shared.metricas import Contador
+
+
+# Leituras (GET/HEAD) vão para as réplicas de DB_REPLICAS, em rodízio, e escritas para o primário.
+# Depois de uma escrita o cliente recebe o LSN do commit (cookie e cabeçalho X-LSN-Escrita) e, por
+# DB_REPLICA_JANELA_S segundos, só lê de uma réplica que já tenha aplicado esse LSN; senão, do primário.
+DB_REPLICA_JANELA_S = int(os.getenv('DB_REPLICA_JANELA_S', '5'))
+# Por quanto tempo uma réplica que falhou ao conectar deixa de ser tentada
+DB_REPLICA_ESPERA_APOS_FALHA_S = float(os.getenv('DB_REPLICA_ESPERA_APOS_FALHA_S', '10'))
+COOKIE_LSN = 'lsn_escrita'
+CABECALHO_LSN = 'x-lsn-escrita'
+METODOS_LEITURA = {'GET', 'HEAD'}
+FORMATO_LSN = re.compile(r'^[0-9A-Fa-f]{1,8}/[0-9A-Fa-f]{1,8}$')
+
+logger = logging.getLogger(__name__)
+leituras_roteadas = Contador('db_leituras_roteadas_total', 'Requisições de leitura por destino (replica, '
+                             'primario_atraso quando nenhuma réplica alcançou a escrita do cliente, '
+                             'primario_falha quando nenhuma réplica respondeu)', ('destino',))
+indisponivel_ate = {endereco: 0.0 for endereco in async_engines_replicas}
+rodizio = count()
+
+@event.listens_for(Session, 'after_commit')
+def marcar_commit(session):
+    session.info['houve_commit'] = True
+
+def usa_replicas(request: Request) -> bool:
+    return bool(async_engines_replicas) and request.method in METODOS_LEITURA
+
+def lsn_da_requisicao(request: Request) -> Optional[str]:
+    lsn = request.headers.get(CABECALHO_LSN) or request.cookies.get(COOKIE_LSN)
+    return lsn if lsn and FORMATO_LSN.match(lsn) else None
+
+def replicas_disponiveis() -> List[str]:
+    agora = time.monotonic()
+    enderecos = list(async_engines_replicas)
+    inicio = next(rodizio) % len(enderecos)
+    
+    return [endereco for endereco in enderecos[inicio:] + enderecos[:inicio] if indisponivel_ate[endereco] <= agora]
+
+async def abrir_sessao_replica(lsn: Optional[str]):
+    """Retorna uma sessão numa réplica que já tenha aplicado `lsn` (o da última escrita do cliente,
+    quando houver), ou None quando nenhuma serve e a leitura deve ir ao primário. Uma réplica que
+    não conecta fica de fora por DB_REPLICA_ESPERA_APOS_FALHA_S segundos."""
+    destino = 'primario_falha'
+    for endereco in replicas_disponiveis():
+        db = AsyncSessionLocal(bind=async_engines_replicas[endereco])
+        db.info['replica'] = endereco
+        try:
+            if lsn is None:
+                await db.connection()
+                leituras_roteadas.inc('replica')
+                return db
+            # pg_last_wal_replay_lsn() é NULL fora de recuperação: um primário nunca passa por réplica
+            if await db.scalar(text('SELECT pg_last_wal_replay_lsn() >= CAST(CAST(:lsn AS text) AS pg_lsn)'), {'lsn': lsn}):
+                leituras_roteadas.inc('replica')
+                return db
+            destino = 'primario_atraso'
+        except (OSError, asyncio.TimeoutError, DBAPIError):
+            logger.warning('Réplica %s indisponível, fora do rodízio por %g s', endereco,
+                           DB_REPLICA_ESPERA_APOS_FALHA_S, exc_info=True)
+            indisponivel_ate[endereco] = time.monotonic() + DB_REPLICA_ESPERA_APOS_FALHA_S
+        await db.close()
+    
+    leituras_roteadas.inc(destino)
+    return None
+
+def cabecalhos_lsn(lsn: str) -> list:
+    cookie = f'{COOKIE_LSN}={lsn}; Max-Age={DB_REPLICA_JANELA_S}; Path=/; HttpOnly; SameSite=lax'
+    return [(b'set-cookie', cookie.encode()), (CABECALHO_LSN.encode(), lsn.encode())]
+
+
+class MiddlewareLeituraDasEscritas:
+    """Middleware ASGI que, quando a requisição fez commit no primário, devolve ao cliente o LSN
+    atual do primário (posterior ao commit) antes de enviar a resposta. Sem réplicas não faz nada."""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not async_engines_replicas:
+            await self.app(scope, receive, send)
+            return
+        
+        async def enviar(mensagem):
+            if mensagem['type'] == 'http.response.start':
+                # a sessão do primário é guardada por get_async_db em request.state
+                db = scope.get('state', {}).get('db_primario')
+                if db is not None and db.info.get('houve_commit'):
+                    lsn = await db.scalar(text('SELECT pg_current_wal_lsn()::text'))
+                    mensagem['headers'] = [*mensagem.get('headers', []), *cabecalhos_lsn(lsn)]
+            await send(mensagem)
+        
+        await self.app(scope, receive, enviar)
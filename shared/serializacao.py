@@ -0,0 +1,42 @@
+import json
+import os
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from pydantic.json import decimal_encoder
+
+
+# Quando ativo, as listagens montam dicts direto das colunas selecionadas e os codificam com orjson,
+# sem validar cada linha pelo response_model. A saída é a mesma, byte a byte, do caminho padrão.
+SERIALIZACAO_RAPIDA_ATIVA = os.getenv('SERIALIZACAO_RAPIDA_ATIVA', 'false').lower() == 'true'
+
+def codificar_decimal(valor: Any):
+    """Converte Decimal como o jsonable_encoder do FastAPI (inteiro sem casas decimais, senão float).
+    
+    Floats que o json da biblioteca padrão escreveria em notação científica (1e-05, 1e+16) são
+    formatados de outro jeito pelo orjson; nesses casos o TypeError faz a resposta voltar para o json."""
+    if not isinstance(valor, Decimal):
+        raise TypeError
+    
+    numero = decimal_encoder(valor)
+    if isinstance(numero, float) and numero != 0 and not 1e-4 <= abs(numero) < 1e16:
+        raise TypeError
+    
+    return numero
+
+def codificar_json(conteudo: Any) -> bytes:
+    try:
+        return orjson.dumps(conteudo, default=codificar_decimal)
+    except orjson.JSONEncodeError:
+        # mesma codificação do caminho padrão (jsonable_encoder + JSONResponse)
+        return json.dumps(jsonable_encoder(conteudo), ensure_ascii=False, allow_nan=False, indent=None,
+                          separators=(',', ':')).encode('utf-8')
+
+class RespostaJSONRapida(Response):
+    media_type = 'application/json'
+    
+    def render(self, content: Any) -> bytes:
+        return codificar_json(content)
@@ -0,0 +1,8 @@
+from uvicorn.workers import UvicornWorker
+
+
+class WorkerUvicorn(UvicornWorker):
+    """Worker do gunicorn com uvloop e httptools fixos: com "auto" a ausência deles passaria
+    despercebida e o worker cairia no asyncio e no parser h11, bem mais lentos."""
+    
+    CONFIG_KWARGS = {'loop': 'uvloop', 'http': 'httptools'}
@@ -0,0 +1,35 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class TarefaPeriodica:
+    """Executa `executar()` a cada `intervalo_s` segundos em segundo plano, no loop do worker, da
+    inicialização ao encerramento da aplicação. Uma falha é registrada em log e a tarefa segue no
+    próximo intervalo."""
+    
+    def __init__(self, nome: str, intervalo_s: float, executar: Callable[[], Awaitable]):
+        self.nome = nome
+        self.intervalo_s = intervalo_s
+        self.executar = executar
+        self._tarefa: Optional[asyncio.Task] = None
+    
+    def iniciar(self) -> None:
+        self._tarefa = asyncio.ensure_future(self._repetir())
+    
+    async def parar(self) -> None:
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            await asyncio.gather(self._tarefa, return_exceptions=True)
+            self._tarefa = None
+    
+    async def _repetir(self) -> None:
+        while True:
+            await asyncio.sleep(self.intervalo_s)
+            try:
+                await self.executar()
+            except Exception:
+                logger.exception('Falha na tarefa periódica %s', self.nome)
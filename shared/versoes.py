@@ -0,0 +1,52 @@
+from typing import Optional
+
+from fastapi import Request, Response
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from models.versao_dados_model import VersaoDados
+
+
+TABELA_CONTAS = 'tbl_contas'
+TABELA_FORNECEDORES = 'tbl_fornecedor_cliente'
+
+def chave_previsao(ano: int) -> str:
+    return f'previsao:{ano}'
+
+async def registrar_alteracao(db, *chaves: str) -> None:
+    """Incrementa a versão de cada chave na transação da escrita, de modo que a nova versão
+    fique visível junto com os dados no commit. As chaves são ordenadas para que escritas
+    concorrentes travem as linhas sempre na mesma ordem."""
+    comando = insert(VersaoDados).values([{'chave': chave, 'versao': 1} for chave in sorted(set(chaves))])
+    comando = comando.on_conflict_do_update(
+        index_elements=[VersaoDados.chave],
+        set_={'versao': VersaoDados.versao + 1}
+    )
+    await db.execute(comando)
+
+async def etag_das_versoes(db, *chaves: str) -> str:
+    consulta = select(VersaoDados.chave, VersaoDados.versao).where(VersaoDados.chave.in_(chaves))
+    versoes = dict((await db.execute(consulta)).all())
+    
+    return 'W/"' + '.'.join(str(versoes.get(chave, 0)) for chave in chaves) + '"'
+
+def cabecalhos_cache(etag: str) -> dict:
+    """Só o cache do próprio cliente guarda a resposta, e revalida pelo ETag a cada uso: um proxy
+    compartilhado serviria a um cliente uma listagem anterior à sua própria escrita, quebrando o
+    read-your-writes das réplicas."""
+    return {
+        'ETag': etag,
+        'Cache-Control': 'private, max-age=0, must-revalidate',
+    }
+
+def resposta_se_nao_modificado(request: Request, etag: str) -> Optional[Response]:
+    """Retorna um 304 quando o If-None-Match do cliente contém `etag` (comparação fraca)."""
+    if_none_match = request.headers.get('if-none-match')
+    if not if_none_match:
+        return None
+    
+    tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+    if '*' in tags or etag.removeprefix('W/') in tags:
+        return Response(status_code=304, headers=cabecalhos_cache(etag))
+    
+    return None
@@ -0,0 +1,81 @@
+import os
+from datetime import date
+
+import httpx
+import pytest
+from dotenv import load_dotenv
+
+
+# Os testes que usam o banco configurado para a aplicação (variáveis DB_* ou .env), pela fixture
+# `banco`, são pulados sem ele.
+# Sem banco a aplicação nem é importável (shared.database cria as engines na importação), por isso
+# os módulos dela só são importados dentro das fixtures e dos testes.
+# Os dados criados ficam em anos distantes, uma conta por mês, e são removidos ao fim de cada teste.
+load_dotenv()
+BANCO_CONFIGURADO = all(os.getenv(variavel) for variavel in ('DB_USER', 'DB_HOST', 'DB_PORT', 'DB_NAME'))
+ANO_TESTES = 2150
+
+@pytest.fixture
+def anyio_backend():
+    return 'asyncio'
+
+@pytest.fixture
+def banco():
+    if not BANCO_CONFIGURADO:
+        pytest.skip('Banco de dados não configurado (DB_USER/DB_HOST/DB_PORT/DB_NAME)')
+
+@pytest.fixture
+async def cliente(banco, monkeypatch):
+    import main
+    from shared.database import async_engine, async_engines_replicas
+    
+    # testa as rotas, não o controle de admissão
+    monkeypatch.setattr('shared.admissao.ADMISSAO_ATIVA', False)
+    async with httpx.AsyncClient(app=main.app, base_url='http://teste') as cliente:
+        yield cliente
+    
+    # cada teste roda num loop novo, e as conexões do asyncpg ficam presas ao loop que as abriu
+    await async_engine.dispose()
+    for engine_replica in async_engines_replicas.values():
+        await engine_replica.dispose()
+
+@pytest.fixture
+async def criar_fornecedor_com_contas(cliente):
+    """Cria um fornecedor com `quantidade` contas (importadas em lote, uma por mês a partir de
+    ANO_TESTES, abaixo do limite mensal, com os `valores` em rodízio) e retorna o id dele."""
+    criados = []
+    
+    async def criar(quantidade: int, valores=('10.50',)) -> int:
+        resposta = await cliente.post('/fornecedor-cliente', json={'nome': 'Fornecedor de teste'})
+        assert resposta.status_code == 200, resposta.text
+        id_fornecedor = resposta.json()['id']
+        criados.append(id_fornecedor)
+        
+        contas = [{'desc': f'Conta de teste nº {i}', 'valor': valores[i % len(valores)], 'tipo': ('pagar', 'receber')[i % 2],
+                   'id_fornecedor_cliente': id_fornecedor, 'data_previsao': date(ANO_TESTES + i // 12, i % 12 + 1, 10).isoformat()}
+                  for i in range(quantidade)]
+        importacao = (await cliente.post('/contas-pagar-receber/bulk', json=contas)).json()
+        assert importacao['inseridas'] == quantidade, importacao['erros']
+        return id_fornecedor
+    
+    yield criar
+    
+    for id_fornecedor in criados:
+        for conta in (await cliente.get(f'/fornecedor-cliente/{id_fornecedor}/contas-pagar-receber')).json():
+            await cliente.delete(f"/contas-pagar-receber/{conta['id']}")
+        await cliente.delete(f'/fornecedor-cliente/{id_fornecedor}')
+
+@pytest.fixture
+async def contar_selects(cliente):
+    """Faz um GET e retorna o JSON da resposta e quantos SELECTs ele executou, em qualquer engine
+    (primário ou réplica)."""
+    from sqlalchemy.engine import Engine
+    from shared.query_counter import contar_queries
+    
+    async def executar(caminho: str, **params):
+        with contar_queries(Engine) as contador:
+            resposta = await cliente.get(caminho, params=params)
+        assert resposta.status_code == 200, resposta.text
+        return resposta.json(), contador.selects
+    
+    return executar
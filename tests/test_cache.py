@@ -0,0 +1,41 @@
+import asyncio
+
+import asyncpg
+import pytest
+
+
+pytestmark = pytest.mark.anyio
+
+async def aguardar_invalidacoes(cache, quantidade: int, limite_s: float = 5) -> None:
+    for _ in range(int(limite_s / 0.05)):
+        if cache.invalidacoes >= quantidade:
+            return
+        await asyncio.sleep(0.05)
+
+async def test_ouvintes_de_workers_diferentes_invalidam_um_ao_outro(banco):
+    from shared.cache import CANAL_INVALIDACAO, BackendMemoriaLRU, Cache, OuvinteInvalidacao, caches
+    from shared.database import DATABASE_URL
+    
+    # dois workers no mesmo processo: o cache é um só, então cada aviso deve ser aplicado uma vez
+    # (pelo outro ouvinte) e ignorado por quem o publicou
+    cache = Cache('teste_invalidacao', BackendMemoriaLRU(10, 60))
+    ouvintes = [OuvinteInvalidacao(), OuvinteInvalidacao()]
+    conexao = await asyncpg.connect(DATABASE_URL)
+    try:
+        for ouvinte in ouvintes:
+            await ouvinte.iniciar()
+        assert ouvintes[0].id_processo != ouvintes[1].id_processo
+        
+        for invalidacoes, ouvinte in enumerate(ouvintes, start=1):
+            await cache.gravar(1, 'valor')
+            await conexao.execute('SELECT pg_notify($1, $2)', CANAL_INVALIDACAO, ouvinte.aviso(cache.nome, 1))
+            await aguardar_invalidacoes(cache, invalidacoes)
+            await asyncio.sleep(0.2)
+            
+            assert cache.invalidacoes == invalidacoes
+            assert await cache.obter(1) is None
+    finally:
+        for ouvinte in ouvintes:
+            await ouvinte.parar()
+        await conexao.close()
+        caches.pop(cache.nome, None)
@@ -0,0 +1,99 @@
+import asyncio
+import tracemalloc
+from urllib.parse import urlencode
+
+import pytest
+from sqlalchemy import text
+
+
+pytestmark = pytest.mark.anyio
+
+# Contas semeadas direto no banco (sem passar pelo limite mensal), em anos que os outros testes não usam.
+# Por lotes de TAMANHO_LOTE_STREAMING o pico fica perto de 2 MB; com as linhas todas lidas antes de enviar,
+# perto de 30 MB. A exportação de milhões de contas, pelo RSS do servidor, fica em benchmarks/exportacao.py.
+CONTAS_SEMEADAS = 50_000
+MEMORIA_MAXIMA_MB = 8
+ANO_SEMEADURA = 2300
+
+@pytest.fixture
+async def fornecedor_semeado(cliente):
+    from shared.database import AsyncSessionLocal
+    
+    async with AsyncSessionLocal() as db:
+        id_fornecedor = await db.scalar(text("INSERT INTO tbl_fornecedor_cliente (nome) VALUES ('Fornecedor exportado') RETURNING id"))
+        await db.execute(text("""
+            INSERT INTO tbl_contas ("desc", valor, tipo, data_previsao, id_fornecedor_cliente, esta_baixada)
+            SELECT 'Conta exportada ' || n, n % 1000 + 0.5, CASE WHEN n % 2 = 0 THEN 'pagar' ELSE 'receber' END,
+                   make_date(:ano, 1, 1) + n % 3650, :id_fornecedor, false
+            FROM generate_series(1, :quantidade) n
+        """), {'ano': ANO_SEMEADURA, 'id_fornecedor': id_fornecedor, 'quantidade': CONTAS_SEMEADAS})
+        await db.commit()
+    
+    yield id_fornecedor
+    
+    async with AsyncSessionLocal() as db:
+        await db.execute(text('DELETE FROM tbl_contas WHERE id_fornecedor_cliente = :id'), {'id': id_fornecedor})
+        await db.execute(text('DELETE FROM tbl_fornecedor_cliente WHERE id = :id'), {'id': id_fornecedor})
+        await db.commit()
+
+async def exportar(params: dict, desconectar_no_primeiro_bloco: bool = False) -> dict:
+    """Chama GET /contas-pagar-receber/export direto pelo ASGI, contando e descartando os blocos
+    (o transporte ASGI do httpx guardaria a resposta inteira)."""
+    import main
+    
+    desconectado = asyncio.Event()
+    resultado = {'status': None, 'linhas': 0, 'bytes': 0}
+    escopo = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+              'path': '/contas-pagar-receber/export', 'raw_path': b'/contas-pagar-receber/export', 'root_path': '',
+              'query_string': urlencode(params).encode(), 'headers': [], 'client': ('teste', 1), 'server': ('teste', 80)}
+    pedido_enviado = False
+    
+    async def receber():
+        nonlocal pedido_enviado
+        if not pedido_enviado:
+            pedido_enviado = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await desconectado.wait()
+        return {'type': 'http.disconnect'}
+    
+    async def enviar(mensagem):
+        if mensagem['type'] == 'http.response.start':
+            resultado['status'] = mensagem['status']
+        elif mensagem.get('body'):
+            resultado['linhas'] += mensagem['body'].count(b'\n')
+            resultado['bytes'] += len(mensagem['body'])
+            if desconectar_no_primeiro_bloco:
+                desconectado.set()
+    
+    await main.app(escopo, receber, enviar)
+    return resultado
+
+async def consultas_abertas_em_contas() -> int:
+    from shared.database import AsyncSessionLocal
+    
+    consulta = text("SELECT count(*) FROM pg_stat_activity "
+                    "WHERE pid <> pg_backend_pid() AND state <> 'idle' AND query ILIKE '%FROM tbl_contas%'")
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(consulta)
+
+@pytest.mark.parametrize('formato', ['csv', 'ndjson'])
+async def test_exportacao_abaixo_do_teto_de_memoria(fornecedor_semeado, formato):
+    tracemalloc.start()
+    try:
+        inicial, _ = tracemalloc.get_traced_memory()
+        resultado = await exportar({'formato': formato, 'id_fornecedor_cliente': fornecedor_semeado})
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    
+    assert resultado['status'] == 200
+    # o CSV tem uma linha de cabeçalho
+    assert resultado['linhas'] == CONTAS_SEMEADAS + (formato == 'csv')
+    assert (pico - inicial) / 2 ** 20 < MEMORIA_MAXIMA_MB, f"pico de {(pico - inicial) / 2 ** 20:.1f} MB para {resultado['bytes'] / 2 ** 20:.1f} MB exportados"
+
+async def test_exportacao_encerra_a_consulta_quando_o_cliente_desconecta(fornecedor_semeado):
+    resultado = await exportar({'formato': 'ndjson', 'id_fornecedor_cliente': fornecedor_semeado},
+                               desconectar_no_primeiro_bloco=True)
+    
+    assert 0 < resultado['linhas'] < CONTAS_SEMEADAS
+    assert await consultas_abertas_em_contas() == 0
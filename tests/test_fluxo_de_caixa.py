@@ -0,0 +1,24 @@
+from datetime import date, timedelta
+
+import pytest
+
+
+pytestmark = pytest.mark.anyio
+
+INICIO = date(2150, 1, 1)
+
+@pytest.mark.parametrize('granularidade', ['dia', 'semana', 'mes'])
+async def test_janela_acima_do_maximo_e_rejeitada(cliente, granularidade):
+    from routers.contas_pagar_receber_router import JANELA_MAXIMA_FLUXO_DE_CAIXA, GranularidadeEnum
+    
+    janela_maxima = JANELA_MAXIMA_FLUXO_DE_CAIXA[GranularidadeEnum(granularidade)]
+    params = {'inicio': INICIO.isoformat(), 'granularidade': granularidade}
+    
+    no_limite = await cliente.get('/contas-pagar-receber/fluxo-de-caixa',
+                                  params={**params, 'fim': (INICIO + janela_maxima - timedelta(days=1)).isoformat()})
+    assert no_limite.status_code == 200
+    
+    acima = await cliente.get('/contas-pagar-receber/fluxo-de-caixa',
+                              params={**params, 'fim': (INICIO + janela_maxima).isoformat()})
+    assert acima.status_code == 422
+    assert str(janela_maxima.days) in acima.json()['message']
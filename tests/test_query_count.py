@@ -0,0 +1,31 @@
+import pytest
+
+
+pytestmark = pytest.mark.anyio
+
+# com 1 e com 12 contas a listagem deve executar os mesmos SELECTs (fornecedor junto, sem N+1)
+TAMANHOS = (1, 12)
+
+async def selects_por_tamanho(criar_fornecedor_com_contas, contar_selects, caminho) -> dict:
+    selects = {}
+    for tamanho in TAMANHOS:
+        id_fornecedor = await criar_fornecedor_com_contas(tamanho)
+        url = caminho.format(id_fornecedor=id_fornecedor)
+        # a primeira chamada aquece os caches (versões para o ETag, fornecedor), que também fazem SELECTs
+        await contar_selects(url, id_fornecedor_cliente=id_fornecedor)
+        contas, selects[tamanho] = await contar_selects(url, id_fornecedor_cliente=id_fornecedor)
+        
+        assert len(contas) == tamanho
+        assert all(conta['fornecedor_cliente']['id'] == id_fornecedor for conta in contas)
+    return selects
+
+async def test_listar_contas_sem_n_mais_1(criar_fornecedor_com_contas, contar_selects):
+    selects = await selects_por_tamanho(criar_fornecedor_com_contas, contar_selects, '/contas-pagar-receber')
+    
+    assert len(set(selects.values())) == 1, selects
+
+async def test_contas_do_fornecedor_sem_n_mais_1(criar_fornecedor_com_contas, contar_selects):
+    selects = await selects_por_tamanho(criar_fornecedor_com_contas, contar_selects,
+                                        '/fornecedor-cliente/{id_fornecedor}/contas-pagar-receber')
+    
+    assert len(set(selects.values())) == 1, selects
@@ -0,0 +1,102 @@
+import asyncio
+import os
+import time
+from datetime import date
+
+import asyncpg
+import httpx
+import pytest
+
+
+pytestmark = pytest.mark.anyio
+
+# O primário é o de DB_HOST/DB_PORT e a réplica, a primeira de DB_REPLICAS: uma segunda instância
+# local em streaming replication (por exemplo criada com `pg_basebackup -R`), com pg_wal_replay_pause
+# permitido ao usuário DB_USER. Sem DB_REPLICAS os testes que precisam dela são pulados.
+REPLICAS = [endereco.strip() for endereco in os.getenv('DB_REPLICAS', '').split(',') if endereco.strip()]
+REPLICA_FORA_DO_AR = '127.0.0.1:1'
+# no ano dos dados de teste (ver tests/conftest.py)
+DATA_PREVISAO = date(2150, 1, 20)
+
+@pytest.fixture
+async def replica(banco):
+    if not REPLICAS:
+        pytest.skip('Nenhuma réplica configurada (DB_REPLICAS)')
+    
+    host, porta = REPLICAS[0].rsplit(':', 1)
+    conexao = await asyncpg.connect(host=host, port=int(porta), user=os.getenv('DB_USER'),
+                                    password=os.getenv('DB_PASSWORD'), database=os.getenv('DB_NAME'))
+    yield conexao
+    
+    await conexao.execute('SELECT pg_wal_replay_resume()')
+    await conexao.close()
+
+@pytest.fixture
+async def conta_criada(cliente):
+    conta = {'desc': 'Conta de teste da réplica', 'valor': '10.00', 'tipo': 'pagar', 'data_previsao': DATA_PREVISAO.isoformat()}
+    criadas = []
+    
+    async def criar() -> httpx.Response:
+        resposta = await cliente.post('/contas-pagar-receber', json=conta)
+        assert resposta.status_code == 201, resposta.text
+        criadas.append(resposta.json()['id'])
+        return resposta
+    
+    yield criar
+    
+    for id_conta in criadas:
+        await cliente.delete(f'/contas-pagar-receber/{id_conta}')
+
+def leituras_por_destino() -> dict:
+    from shared.replicas import leituras_roteadas
+    return {dict(rotulos)['destino']: valor for _, rotulos, valor in leituras_roteadas.amostras()}
+
+async def destino_da_leitura(cliente: httpx.AsyncClient, caminho: str, **kw):
+    """Faz o GET e retorna (status, destino contado em db_leituras_roteadas_total)."""
+    antes = leituras_por_destino()
+    resposta = await cliente.get(caminho, **kw)
+    destinos = [destino for destino, valor in leituras_por_destino().items() if valor > antes.get(destino, 0)]
+    
+    return resposta.status_code, destinos[0] if len(destinos) == 1 else destinos
+
+async def aguardar_replica_alcancar(replica, lsn: str, limite_s: float = 30) -> None:
+    fim = time.monotonic() + limite_s
+    while not await replica.fetchval('SELECT pg_last_wal_replay_lsn() >= $1::text::pg_lsn', lsn):
+        assert time.monotonic() < fim, f'a réplica não chegou a {lsn}'
+        await asyncio.sleep(0.05)
+
+async def test_le_as_proprias_escritas_com_a_replica_atrasada(cliente, replica, conta_criada):
+    import main
+    
+    await replica.execute('SELECT pg_wal_replay_pause()')
+    escrita = await conta_criada()
+    caminho = f"/contas-pagar-receber/{escrita.json()['id']}"
+    lsn = escrita.headers['x-lsn-escrita']
+    
+    # o mesmo cliente manda o LSN pelo cookie; outro (como num outro worker), pelo cabeçalho
+    assert await destino_da_leitura(cliente, caminho) == (200, 'primario_atraso')
+    async with httpx.AsyncClient(app=main.app, base_url='http://teste') as outro_cliente:
+        assert await destino_da_leitura(outro_cliente, caminho, headers={'X-LSN-Escrita': lsn}) == (200, 'primario_atraso')
+        # sem o LSN a leitura vai à réplica, que ainda não tem a conta
+        assert await destino_da_leitura(outro_cliente, caminho) == (404, 'replica')
+        
+        await replica.execute('SELECT pg_wal_replay_resume()')
+        await aguardar_replica_alcancar(replica, lsn)
+        assert await destino_da_leitura(outro_cliente, caminho, headers={'X-LSN-Escrita': lsn}) == (200, 'replica')
+
+async def test_replica_fora_do_ar_le_do_primario(cliente, conta_criada, monkeypatch):
+    from shared.database import async_engines_replicas, criar_engine_replica
+    from shared.replicas import indisponivel_ate
+    
+    caminho = f"/contas-pagar-receber/{(await conta_criada()).json()['id']}"
+    for endereco in list(async_engines_replicas):
+        monkeypatch.delitem(async_engines_replicas, endereco)
+        monkeypatch.delitem(indisponivel_ate, endereco)
+    monkeypatch.setitem(async_engines_replicas, REPLICA_FORA_DO_AR, criar_engine_replica(REPLICA_FORA_DO_AR))
+    monkeypatch.setitem(indisponivel_ate, REPLICA_FORA_DO_AR, 0.0)
+    cliente.cookies.clear()
+    
+    assert await destino_da_leitura(cliente, caminho) == (200, 'primario_falha')
+    # fora do rodízio por DB_REPLICA_ESPERA_APOS_FALHA_S; enquanto isso as leituras vão direto ao primário
+    assert indisponivel_ate[REPLICA_FORA_DO_AR] > time.monotonic()
+    assert await destino_da_leitura(cliente, caminho) == (200, 'primario_falha')
@@ -0,0 +1,60 @@
+import json
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+
+from shared.serializacao import codificar_json
+
+
+# Decimal com e sem casas, muito pequeno/grande (o orjson os escreveria diferente do json) e em notação científica
+VALORES = ['100', '100.00', '19.90', '0.01', '0.00001', '1234567.891', '12345678901234567', '1E+3']
+
+def codificacao_padrao(conteudo) -> bytes:
+    # a mesma do response_model: jsonable_encoder + JSONResponse.render
+    return json.dumps(jsonable_encoder(conteudo), ensure_ascii=False, allow_nan=False, indent=None,
+                      separators=(',', ':')).encode('utf-8')
+
+@pytest.mark.parametrize('valor', VALORES)
+def test_codificar_json_igual_ao_caminho_padrao(valor):
+    conteudo = [{'valor': Decimal(valor), 'desc': 'conta ç ã 😀 "aspas"', 'data_previsao': date(2024, 2, 29),
+                 'data_baixa': None, 'esta_baixada': False, 'fornecedor_cliente': {'id': 1, 'nome': 'Fornecedor'}}]
+    
+    assert codificar_json(conteudo) == codificacao_padrao(conteudo)
+
+async def paginas(cliente, caminho: str, params: dict) -> list:
+    """Corpos das páginas seguindo X-Proximo-Cursor, e os cursores, até a última."""
+    paginas = []
+    while True:
+        resposta = await cliente.get(caminho, params=params)
+        assert resposta.status_code == 200, resposta.text
+        cursor = resposta.headers.get('x-proximo-cursor')
+        paginas.append((resposta.content, cursor))
+        if cursor is None:
+            return paginas
+        params = {**params, 'after': cursor}
+
+@pytest.mark.anyio
+@pytest.mark.parametrize('caminho, paginado', [
+    ('/contas-pagar-receber', True),
+    ('/fornecedor-cliente', False),
+    ('/fornecedor-cliente/{id_fornecedor}/contas-pagar-receber', False),
+])
+async def test_listagem_rapida_com_os_mesmos_bytes(cliente, criar_fornecedor_com_contas, monkeypatch, caminho, paginado):
+    id_fornecedor = await criar_fornecedor_com_contas(len(VALORES), valores=VALORES)
+    contas = (await cliente.get(f'/fornecedor-cliente/{id_fornecedor}/contas-pagar-receber')).json()
+    for conta in contas[::3]:
+        assert (await cliente.post(f"/contas-pagar-receber/{conta['id']}/baixar")).status_code == 200
+    
+    respostas = {}
+    for rapida in (False, True):
+        monkeypatch.setattr('routers.contas_pagar_receber_router.SERIALIZACAO_RAPIDA_ATIVA', rapida)
+        monkeypatch.setattr('routers.fornecedor_cliente_router.SERIALIZACAO_RAPIDA_ATIVA', rapida)
+        monkeypatch.setattr('routers.fornecedor_cliente_vs_contas_pagar_receber_router.SERIALIZACAO_RAPIDA_ATIVA', rapida)
+        # na listagem de contas, páginas de 3: a primeira só com valores que o orjson codifica, as demais
+        # com os que fazem a página inteira voltar para o json
+        params = {'id_fornecedor_cliente': id_fornecedor, 'limit': 3} if paginado else {}
+        respostas[rapida] = await paginas(cliente, caminho.format(id_fornecedor=id_fornecedor), params)
+    
+    assert respostas[True] == respostas[False]